@@ -0,0 +1,70 @@
+"""One cold start of the evaluation API, timed from a fresh interpreter.
+
+Run by the `cold_start` suite of `benchmarks.run` in a new process per
+sample; prints one JSON line with the timings in seconds:
+
+- `import_s`: importing `src.web.api`
+- `first_response_s`: import, app startup and the first response (`/ready`)
+- `ready_s`: import, app startup and the warmup, until `/ready` returns 200
+- `first_evaluation_s`: the first triage `/evaluate` after that, with a fake model
+
+Benchmark helpers are imported after the app and their import time is not
+counted. Connections are not pre-opened unless OPENAI_BASE_URL points to a
+backend (such as `benchmarks.fake_backend`).
+"""
+import time
+
+start = time.perf_counter()
+
+import os  # noqa: E402
+
+from src.packaging_evaluation.configuration import HISTORY_CONFIG, WARMUP_CONFIG  # noqa: E402
+
+WARMUP_CONFIG["open_connections"] = bool(os.environ.get("OPENAI_BASE_URL"))
+HISTORY_CONFIG["path"] = None
+
+from src.web import api  # noqa: E402
+
+imported = time.perf_counter()
+
+import asyncio  # noqa: E402
+import json  # noqa: E402
+
+import httpx  # noqa: E402
+
+from benchmarks.fakes import FakeChatModel  # noqa: E402
+
+# Leave out the time spent importing the benchmark's own helpers
+offset = time.perf_counter() - imported
+
+
+def elapsed() -> float:
+    return time.perf_counter() - start - offset
+
+
+async def main():
+    timings = {"import_s": imported - start}
+    async with api.app.router.lifespan_context(api.app):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://cold-start") as client:
+            response = await client.get("/ready")
+            timings["first_response_s"] = elapsed()
+            while response.status_code != 200:
+                if not any(step["status"] in ("pending", "running") for step in response.json()["steps"].values()):
+                    raise SystemExit(f"Warmup failed: {response.json()}")
+                await asyncio.sleep(0.005)
+                response = await client.get("/ready")
+            timings["ready_s"] = elapsed()
+
+            # Replace the clients created by the warmup so no request leaves the process
+            api.tools.llm = FakeChatModel()
+            api.tools.small_llm = api.tools.llm
+            evaluation_start = time.perf_counter()
+            response = await client.post("/evaluate", json={"packaging_concept": "A PET bottle.", "mode": "triage"})
+            response.raise_for_status()
+            timings["first_evaluation_s"] = time.perf_counter() - evaluation_start
+    print(json.dumps(timings))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
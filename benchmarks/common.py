@@ -0,0 +1,117 @@
+"""Shared timing, statistics and reporting helpers for the benchmarks."""
+import asyncio
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linearly interpolated percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(latencies: List[float], wall_time: float, errors: int = 0) -> Dict[str, float]:
+    """Summarize per-operation latencies (seconds) into a report dict."""
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "wall_time_s": round(wall_time, 4),
+        "throughput_per_s": round(len(latencies) / wall_time, 2) if wall_time > 0 else 0.0,
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 50), 3),
+        "p95_ms": round(1000 * percentile(latencies, 95), 3),
+        "p99_ms": round(1000 * percentile(latencies, 99), 3),
+        "max_ms": round(1000 * max(latencies), 3) if latencies else 0.0,
+    }
+
+
+async def run_concurrently(
+    operation: Callable[[int], Awaitable[Any]],
+    iterations: int,
+    concurrency: int
+) -> Tuple[List[float], float, int]:
+    """Run `operation(i)` `iterations` times with bounded concurrency.
+
+    Returns the per-call latencies, total wall time and number of errors.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def timed(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await operation(i)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(iterations)))
+    return latencies, time.perf_counter() - start, errors
+
+
+def time_sync(operation: Callable[[int], Any], iterations: int) -> Tuple[List[float], float]:
+    """Time a synchronous operation `iterations` times."""
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        op_start = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - op_start)
+    return latencies, time.perf_counter() - start
+
+
+def environment_info() -> Dict[str, Any]:
+    """Describe where the benchmark ran, for comparing result files."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git_commit": commit,
+    }
+
+
+def save_results(results: Dict[str, Any], path: str) -> None:
+    """Write benchmark results to a JSON file."""
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def find_regressions(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    metric: str = "p95_ms"
+) -> List[str]:
+    """List suites whose metric got worse than the baseline by more than `tolerance`."""
+    regressions = []
+    for name, suite in results.get("suites", {}).items():
+        previous: Optional[Dict[str, Any]] = baseline.get("suites", {}).get(name)
+        if not previous or metric not in previous or metric not in suite:
+            continue
+        if previous[metric] > 0 and suite[metric] > previous[metric] * (1 + tolerance):
+            regressions.append(
+                f"{name}: {metric} {suite[metric]:.3f} vs baseline {previous[metric]:.3f} "
+                f"(+{100 * (suite[metric] / previous[metric] - 1):.1f}%)"
+            )
+    return regressions
@@ -0,0 +1,263 @@
+"""Local fake OpenAI and Supabase backend for end-to-end load tests.
+
+Serves the endpoints the application reaches over HTTP, so a real
+`uvicorn` worker can be driven without any external service:
+
+- `POST /v1/chat/completions`: structured output for `response_format`
+  JSON schemas or forced tool calls, generated deterministically from the
+  schema and the request, after a configurable latency; JSON schema
+  responses can be streamed (`stream: true`) in small chunks
+- `GET /v1/models`: the models the application uses (listed by its warmup)
+- `POST /v1/embeddings`: hashed bag-of-words embeddings
+- `/rest/v1/knowledge_base` and `/rest/v1/rpc/match_knowledge`: an
+  in-memory PostgREST stand-in for the `knowledge_base` table
+
+Usage:
+
+    python -m benchmarks.fake_backend --port 9000 --latency 0.8 --jitter 0.4
+
+    OPENAI_BASE_URL=http://localhost:9000/v1 OPENAI_API_KEY=fake \\
+    SUPABASE_URL=http://localhost:9000 SUPABASE_KEY=fake \\
+        uvicorn src.web.api:app --port 8000
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from benchmarks.fakes import WORDS, FakeEmbeddings, LocalSupabase, seeded_rng
+
+STRING_WORDS = 12
+LIST_LENGTH = 3
+# Streamed responses: characters per chunk, and the share of the latency spent before the first chunk
+STREAM_CHUNK_CHARS = 16
+STREAM_FIRST_CHUNK_SHARE = 0.2
+
+
+def _resolve(schema: Dict[str, Any], root: Dict[str, Any]) -> Dict[str, Any]:
+    """Follow a local `$ref` such as `#/$defs/Component`."""
+    while "$ref" in schema:
+        node: Any = root
+        for part in schema["$ref"].lstrip("#/").split("/"):
+            node = node[part]
+        schema = node
+    return schema
+
+
+def fake_from_json_schema(schema: Dict[str, Any], rng, root: Optional[Dict[str, Any]] = None, name: str = "value") -> Any:
+    """Generate a value valid against a (pydantic-generated) JSON schema."""
+    root = root or schema
+    schema = _resolve(schema, root)
+    if "anyOf" in schema:
+        options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+        return fake_from_json_schema(options[0], rng, root, name)
+    if "enum" in schema:
+        return schema["enum"][0]
+
+    kind = schema.get("type", "string")
+    if kind == "object":
+        return {
+            key: fake_from_json_schema(value, rng, root, key)
+            for key, value in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        return [fake_from_json_schema(schema.get("items", {}), rng, root, name) for _ in range(LIST_LENGTH)]
+    if kind == "boolean":
+        return True
+    if kind == "integer":
+        return rng.randint(1, 10)
+    if kind == "number":
+        return round(rng.uniform(0.5, 1.0), 2)
+    return f"{name.replace('_', ' ')}: " + " ".join(rng.choice(WORDS) for _ in range(STRING_WORDS))
+
+
+def create_app(latency: float = 0.0, jitter: float = 0.0, embedding_latency: float = 0.0,
+               overrides: Optional[Dict[str, Dict[str, Any]]] = None) -> FastAPI:
+    """Build the fake backend app."""
+    app = FastAPI(title="Fake model and database backend")
+    embeddings: Dict[int, FakeEmbeddings] = {}
+    store = LocalSupabase()
+    overrides = overrides or {}
+
+    def _completion(body: Dict[str, Any], message: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": f"chatcmpl-{hashlib.sha1(json.dumps(message, sort_keys=True).encode()).hexdigest()[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop", "logprobs": None}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    async def _stream(body: Dict[str, Any], content: str, delay: float):
+        """Server-sent chat completion chunks, spreading the latency over the content."""
+        chunks = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+        await asyncio.sleep(delay * STREAM_FIRST_CHUNK_SHARE)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(delay * (1 - STREAM_FIRST_CHUNK_SHARE) / len(chunks))
+            delta = {"role": "assistant", "content": chunk} if i == 0 else {"content": chunk}
+            yield "data: " + json.dumps({
+                "id": "chatcmpl-stream",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "gpt-4o"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+            }) + "\n\n"
+        yield "data: " + json.dumps({
+            "id": "chatcmpl-stream",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }) + "\n\ndata: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        seed = hashlib.sha256(json.dumps(body.get("messages"), sort_keys=True).encode()).hexdigest()
+        rng = seeded_rng("chat", seed)
+        delay = latency + (rng.uniform(0, jitter) if jitter else 0.0)
+
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            spec = response_format["json_schema"]
+            content = fake_from_json_schema(spec["schema"], rng)
+            content.update(overrides.get(spec.get("name", ""), {}))
+            if body.get("stream"):
+                return StreamingResponse(_stream(body, json.dumps(content), delay), media_type="text/event-stream")
+            await asyncio.sleep(delay)
+            message = {"role": "assistant", "content": json.dumps(content)}
+            return _completion(body, message)
+
+        await asyncio.sleep(delay)
+
+        if body.get("tools"):
+            function = body["tools"][0]["function"]
+            choice = body.get("tool_choice")
+            if isinstance(choice, dict):
+                wanted = choice["function"]["name"]
+                function = next(t["function"] for t in body["tools"] if t["function"]["name"] == wanted)
+            arguments = fake_from_json_schema(function["parameters"], rng)
+            arguments.update(overrides.get(function["name"], {}))
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": f"call_{seed[:24]}",
+                    "type": "function",
+                    "function": {"name": function["name"], "arguments": json.dumps(arguments)},
+                }],
+            }
+            return _completion(body, message)
+
+        text = " ".join(rng.choice(WORDS) for _ in range(STRING_WORDS))
+        return _completion(body, {"role": "assistant", "content": text})
+
+    @app.get("/v1/models")
+    async def list_models():
+        # Listed by the API's startup warmup to open connections
+        return {
+            "object": "list",
+            "data": [{"id": model, "object": "model", "created": 0, "owned_by": "fake"}
+                     for model in ("gpt-4o", "gpt-4o-mini", "text-embedding-ada-002")],
+        }
+
+    @app.post("/v1/embeddings")
+    async def create_embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        # Token-id inputs (as sent by tiktoken-enabled clients) are embedded by their ids
+        texts = [text if isinstance(text, str) else " ".join(map(str, text)) for text in inputs]
+        dimensions = body.get("dimensions") or 1536
+        if dimensions not in embeddings:
+            embeddings[dimensions] = FakeEmbeddings(dimensions=dimensions, latency=embedding_latency)
+        vectors = await embeddings[dimensions].aembed_documents(texts)
+        return {
+            "object": "list",
+            "data": [{"object": "embedding", "index": i, "embedding": vector} for i, vector in enumerate(vectors)],
+            "model": body.get("model", "text-embedding-ada-002"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+
+    def _filters(request: Request) -> List[tuple]:
+        filters = []
+        for column, value in request.query_params.items():
+            if column in ("select", "on_conflict", "columns", "order", "limit", "offset"):
+                continue
+            if value.startswith("eq."):
+                filters.append((column, [value[3:]]))
+            elif value.startswith("in.(") and value.endswith(")"):
+                filters.append((column, [item.strip('"') for item in value[4:-1].split(",")]))
+        return filters
+
+    @app.post("/rest/v1/rpc/{function}")
+    async def rpc(function: str, request: Request):
+        params = await request.json()
+        try:
+            return store.rpc(function, params).execute().data
+        except ValueError as e:
+            return JSONResponse({"message": str(e)}, status_code=404)
+
+    @app.post("/rest/v1/{table}")
+    async def insert(table: str, request: Request):
+        body = await request.json()
+        query = store.table(table)
+        upsert = "merge-duplicates" in request.headers.get("prefer", "")
+        try:
+            data = (query.upsert(body) if upsert else query.insert(body)).execute().data
+        except ValueError as e:
+            return JSONResponse({"code": "23505", "message": str(e)}, status_code=409)
+        if "return=minimal" in request.headers.get("prefer", ""):
+            return Response(status_code=201)
+        return JSONResponse(data, status_code=201)
+
+    @app.get("/rest/v1/{table}")
+    async def select(table: str, request: Request):
+        select = request.query_params.get("select", "*")
+        query = store.table(table).select(*select.split(","))
+        for column, values in _filters(request):
+            query = query.in_(column, values)
+        if "order" in request.query_params:
+            column, direction = request.query_params["order"].split(".")[:2]
+            query = query.order(column, desc=direction == "desc")
+        if "limit" in request.query_params:
+            offset = int(request.query_params.get("offset", 0))
+            query = query.range(offset, offset + int(request.query_params["limit"]) - 1)
+        return query.execute().data
+
+    @app.delete("/rest/v1/{table}")
+    async def delete(table: str, request: Request):
+        query = store.table(table).delete()
+        for column, values in _filters(request):
+            query = query.in_(column, values)
+        return query.execute().data
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per chat completion")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random seconds per chat completion")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Seconds per embeddings request")
+    parser.add_argument("--iterate-reflection", action="store_true",
+                        help="Let reflection request iterations (worst-case three rounds)")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    overrides = {} if args.iterate_reflection else {"ReflectionNotes": {"requires_iteration": False}}
+    app = create_app(args.latency, args.jitter, args.embedding_latency, overrides)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""Deterministic stand-ins for the chat model, embeddings and Supabase clients.
+
+The fakes implement only the surface the application uses, so they can be
+swapped in for `tools.llm` and passed to `VectorStoreClient` without any
+network access or API keys.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import typing
+import uuid
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+# Vocabulary used to give fake strings a realistic length and shape
+WORDS = [
+    "bottle", "cap", "label", "sleeve", "PET", "HDPE", "LDPE", "PP", "barrier",
+    "seal", "closure", "moulding", "extrusion", "filling", "line", "speed",
+    "supplier", "tooling", "recyclable", "laminate", "print", "carton", "tray",
+    "film", "adhesive", "thermoforming", "coating", "strength", "cost", "risk",
+]
+
+
+def seeded_rng(*parts: str) -> random.Random:
+    """Create a random generator seeded from the given strings."""
+    digest = hashlib.sha256("\x00".join(parts).encode("utf-8")).digest()
+    return random.Random(digest)
+
+
+def _fake_value(annotation: Any, name: str, rng: random.Random, list_length: int, string_words: int) -> Any:
+    """Generate a value matching a field annotation."""
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+
+    if origin is typing.Union:
+        # Optional[X] and friends: use the first non-None option
+        options = [arg for arg in args if arg is not type(None)]
+        return _fake_value(options[0], name, rng, list_length, string_words)
+    if origin in (list, List):
+        item_type = args[0] if args else str
+        return [
+            _fake_value(item_type, f"{name}_{i}", rng, list_length, string_words)
+            for i in range(list_length)
+        ]
+    if origin in (dict, Dict):
+        return {"agent": name, "content": " ".join(rng.choice(WORDS) for _ in range(string_words))}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _fake_fields(annotation, rng, list_length, string_words)
+    if annotation is bool:
+        return True
+    if annotation is int:
+        return rng.randint(1, 10)
+    if annotation is float:
+        return round(rng.uniform(0.5, 1.0), 2)
+    words = " ".join(rng.choice(WORDS) for _ in range(string_words))
+    return f"{name.replace('_', ' ')}: {words}"
+
+
+def _fake_fields(schema: Type[BaseModel], rng: random.Random, list_length: int, string_words: int) -> Dict[str, Any]:
+    """Generate raw field values for every field of a pydantic model."""
+    return {
+        field_name: _fake_value(field.annotation, field_name, rng, list_length, string_words)
+        for field_name, field in schema.model_fields.items()
+    }
+
+
+def build_fake_instance(
+    schema: Type[BaseModel],
+    seed: str = "",
+    overrides: Optional[Dict[str, Any]] = None,
+    list_length: int = 3,
+    string_words: int = 12
+) -> BaseModel:
+    """Build a schema-valid instance whose content depends only on the seed."""
+    rng = seeded_rng(schema.__name__, seed)
+    values = _fake_fields(schema, rng, list_length, string_words)
+    values.update(overrides or {})
+    return schema(**values)
+
+
+class FakeChatModel:
+    """Chat model stand-in returning deterministic structured output.
+
+    Every call sleeps for `latency` seconds (plus up to `jitter` seconds of
+    seeded noise) to emulate the model round-trip. `overrides` maps a schema
+    name to field values forced on every instance of that schema, e.g.
+    `{"ReflectionNotes": {"requires_iteration": False}}`.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        list_length: int = 3,
+        string_words: int = 12,
+        overrides: Optional[Dict[str, Dict[str, Any]]] = None
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.list_length = list_length
+        self.string_words = string_words
+        self.overrides = overrides or {}
+        self.calls = 0
+
+    def with_structured_output(self, schema: Type[BaseModel], **kwargs) -> "FakeStructuredModel":
+        """Mirror `ChatOpenAI.with_structured_output`."""
+        return FakeStructuredModel(self, schema)
+
+    async def wait(self, seed: str) -> None:
+        """Sleep for the configured (seeded) latency."""
+        delay = self.latency
+        if self.jitter:
+            delay += seeded_rng("jitter", seed).uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class FakeStructuredModel:
+    """Structured-output runnable produced by `FakeChatModel`."""
+
+    def __init__(self, model: FakeChatModel, schema: Type[BaseModel]):
+        self.model = model
+        self.schema = schema
+
+    async def ainvoke(self, messages: Any, config: Optional[dict] = None, **kwargs) -> BaseModel:
+        """Return a schema instance seeded from the request messages."""
+        self.model.calls += 1
+        seed = hashlib.sha256(json.dumps(messages, default=str, sort_keys=True).encode("utf-8")).hexdigest()
+        await self.model.wait(seed)
+        return build_fake_instance(
+            self.schema,
+            seed=seed,
+            overrides=self.model.overrides.get(self.schema.__name__),
+            list_length=self.model.list_length,
+            string_words=self.model.string_words
+        )
+
+
+class MeteredChatModel:
+    """Wraps any chat model and counts structured calls and time spent in them."""
+
+    def __init__(self, model: Any):
+        self.model = model
+        self.calls = 0
+        self.seconds = 0.0
+
+    def with_structured_output(self, schema: Type[BaseModel], **kwargs) -> "_MeteredRunnable":
+        return _MeteredRunnable(self, self.model.with_structured_output(schema, **kwargs))
+
+
+class _MeteredRunnable:
+    def __init__(self, meter: MeteredChatModel, runnable: Any):
+        self.meter = meter
+        self.runnable = runnable
+
+    async def ainvoke(self, messages: Any, *args, **kwargs) -> Any:
+        start = time.perf_counter()
+        try:
+            return await self.runnable.ainvoke(messages, *args, **kwargs)
+        finally:
+            self.meter.calls += 1
+            self.meter.seconds += time.perf_counter() - start
+
+
+@lru_cache(maxsize=65536)
+def _token_vector(token: str, dimensions: int) -> tuple:
+    """Deterministic random direction for a single token."""
+    rng = seeded_rng("token", token)
+    return tuple(rng.gauss(0.0, 1.0) for _ in range(dimensions))
+
+
+class FakeEmbeddings:
+    """Embeddings stand-in built from hashed bag-of-words vectors.
+
+    Texts sharing words get similar vectors, so similarity search behaves
+    plausibly while staying fully deterministic.
+    """
+
+    def __init__(self, dimensions: int = 1536, latency: float = 0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.calls = 0
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single text."""
+        vector = [0.0] * self.dimensions
+        for token in text.lower().split() or [""]:
+            for i, value in enumerate(_token_vector(token, self.dimensions)):
+                vector[i] += value
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts."""
+        return [self.embed_query(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a single text after the configured latency."""
+        self.calls += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        return self.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts after a single round-trip of latency."""
+        self.calls += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        return self.embed_documents(texts)
+
+
+class _Result:
+    """Mimics the response object returned by supabase `execute()`."""
+
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+
+
+class _TableQuery:
+    """The subset of the supabase query builder used by `VectorStoreClient`."""
+
+    def __init__(self, rows: Dict[str, Dict[str, Any]], lock: threading.Lock):
+        self.rows = rows
+        self.lock = lock
+        self.operation = "select"
+        self.payload: Any = None
+        self.columns: Optional[tuple] = None
+        self.filters: List[tuple] = []
+        self.ordering: Optional[tuple] = None
+        self.window = (0, None)
+
+    def insert(self, data: Any) -> "_TableQuery":
+        self.operation, self.payload = "insert", data
+        return self
+
+    def upsert(self, data: Any, **options) -> "_TableQuery":
+        self.operation, self.payload = "upsert", data
+        return self
+
+    def select(self, *columns: str) -> "_TableQuery":
+        self.operation = "select"
+        if columns and columns != ("*",):
+            self.columns = columns
+        return self
+
+    def delete(self) -> "_TableQuery":
+        self.operation = "delete"
+        return self
+
+    def eq(self, column: str, value: Any) -> "_TableQuery":
+        self.filters.append((column, [value]))
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> "_TableQuery":
+        self.filters.append((column, list(values)))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "_TableQuery":
+        self.ordering = (column, desc)
+        return self
+
+    def limit(self, size: int) -> "_TableQuery":
+        self.window = (self.window[0], size)
+        return self
+
+    def range(self, start: int, end: int) -> "_TableQuery":
+        self.window = (start, end - start + 1)
+        return self
+
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        return all(row.get(column) in values for column, values in self.filters)
+
+    def execute(self) -> _Result:
+        # The client runs queries in threads, so they must not interleave
+        with self.lock:
+            return self._execute()
+
+    def _execute(self) -> _Result:
+        if self.operation in ("insert", "upsert"):
+            records = self.payload if isinstance(self.payload, list) else [self.payload]
+            stored = []
+            for record in records:
+                # knowledge_base.id is a uuid column
+                try:
+                    uuid.UUID(str(record["id"]))
+                except ValueError:
+                    raise ValueError(f"invalid input syntax for type uuid: {record['id']!r}") from None
+                if self.operation == "insert" and record["id"] in self.rows:
+                    raise ValueError(f"duplicate key value violates unique constraint: {record['id']}")
+                # Upserts only replace the columns sent, like PostgREST
+                self.rows[record["id"]] = {**self.rows.get(record["id"], {}), **copy.deepcopy(record)}
+                stored.append(copy.deepcopy(self.rows[record["id"]]))
+            return _Result(stored)
+
+        matching = [row for row in self.rows.values() if self._matches(row)]
+        if self.ordering is not None:
+            column, desc = self.ordering
+            matching.sort(key=lambda row: row.get(column), reverse=desc)
+        offset, size = self.window
+        matching = matching[offset:offset + size if size is not None else None]
+        if self.operation == "delete":
+            for row in matching:
+                del self.rows[row["id"]]
+        if self.columns is not None:
+            matching = [{column: row.get(column) for column in self.columns} for row in matching]
+        return _Result(copy.deepcopy(matching))
+
+
+class _RpcCall:
+    """A pending RPC call against the local store."""
+
+    def __init__(self, function, params: Dict[str, Any], lock: threading.Lock):
+        self.function = function
+        self.params = params
+        self.lock = lock
+
+    def execute(self) -> _Result:
+        with self.lock:
+            return _Result(self.function(**self.params))
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    norm = (math.sqrt(sum(v * v for v in a)) or 1.0) * (math.sqrt(sum(v * v for v in b)) or 1.0)
+    return sum(x * y for x, y in zip(a, b)) / norm
+
+
+class LocalSupabase:
+    """In-memory replacement for the supabase client and `knowledge_base` table."""
+
+    def __init__(self):
+        self.tables: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> _TableQuery:
+        return _TableQuery(self.tables.setdefault(name, {}), self._lock)
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> _RpcCall:
+        functions = {
+            "match_knowledge": self._match_knowledge,
+            "match_knowledge_exact": self._match_knowledge,
+            "match_knowledge_compact": self._match_knowledge_compact
+        }
+        if name not in functions:
+            raise ValueError(f"Unknown RPC function: {name}")
+        return _RpcCall(functions[name], params, self._lock)
+
+    def _match_knowledge(
+        self,
+        query_embedding: List[float],
+        match_threshold: float,
+        match_count: int,
+        ef_search: int = 40
+    ) -> List[Dict[str, Any]]:
+        """Exact cosine similarity search, mirroring the SQL `match_knowledge` function (without an index)."""
+        scored = []
+        for row in self.tables.get("knowledge_base", {}).values():
+            embedding = row.get("embedding")
+            if not embedding:
+                continue
+            similarity = _cosine(query_embedding, embedding)
+            if similarity > match_threshold:
+                scored.append((similarity, row))
+        return self._matches(scored, match_count)
+
+    def _match_knowledge_compact(
+        self,
+        query_embedding: List[float],
+        storage: str,
+        match_threshold: float,
+        match_count: int,
+        candidate_count: int,
+        rescore: bool,
+        ef_search: int = 40
+    ) -> List[Dict[str, Any]]:
+        """Search on float16 or binary vectors, mirroring the SQL `match_knowledge_compact` function."""
+        from src.packaging_evaluation.vector_store.quantization import binary_quantize, to_float16
+
+        candidates = []
+        query_bits = binary_quantize(query_embedding)
+        for row in self.tables.get("knowledge_base", {}).values():
+            if storage == "float16" and row.get("embedding_half"):
+                similarity = _cosine(to_float16(query_embedding), to_float16(row["embedding_half"]))
+            elif storage == "binary" and row.get("embedding_bits"):
+                distance = sum(a != b for a, b in zip(query_bits, row["embedding_bits"]))
+                similarity = math.cos(math.pi * distance / len(query_embedding))
+            else:
+                continue
+            candidates.append((similarity, row))
+        candidates.sort(key=lambda item: item[0], reverse=True)
+
+        # Re-rank the best candidates at full precision
+        scored = []
+        for similarity, row in candidates[:candidate_count]:
+            if rescore and row.get("embedding"):
+                similarity = _cosine(query_embedding, row["embedding"])
+            if similarity > match_threshold:
+                scored.append((similarity, row))
+        return self._matches(scored, match_count)
+
+    @staticmethod
+    def _matches(scored: List[tuple], match_count: int) -> List[Dict[str, Any]]:
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [
+            {
+                "id": row["id"],
+                "type": row["type"],
+                "content": row["content"],
+                "metadata": copy.deepcopy(row["metadata"]),
+                "similarity": similarity
+            }
+            for similarity, row in scored[:match_count]
+        ]
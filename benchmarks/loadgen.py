@@ -0,0 +1,334 @@
+"""Open-loop load generator for the evaluation and knowledge-base APIs.
+
+Sends `/evaluate`, `/search` and `/upload` requests with Poisson arrivals at
+one or more target rates, and reports throughput, latency percentiles, error
+rates and event-loop lag (of the servers, via their `/metrics` endpoints, and
+of the generator itself) for every reporting interval.
+
+Each request comes from one of `--clients` virtual users, identified to the
+admission control of the evaluation API by `X-Client-Id`. Identical concepts
+are coalesced into one run by the API; `--unique-concepts` makes every
+`/evaluate` request distinct so each one is scheduled. Requests rejected or
+shed with 429 are reported separately from errors.
+
+Typical setup, with every external dependency served locally:
+
+    python -m benchmarks.fake_backend --port 9000 --latency 0.8 --jitter 0.4
+    OPENAI_BASE_URL=http://localhost:9000/v1 OPENAI_API_KEY=fake \\
+        uvicorn src.web.api:app --port 8000
+    OPENAI_BASE_URL=http://localhost:9000/v1 OPENAI_API_KEY=fake \\
+    SUPABASE_URL=http://localhost:9000 SUPABASE_KEY=fake \\
+        uvicorn src.packaging_evaluation.vector_store.api:app --port 8001
+
+    python -m benchmarks.loadgen --api-url http://localhost:8000 \\
+        --kb-url http://localhost:8001 --rate 1,2,4,8 --stage-duration 30 \\
+        --mix evaluate=0.7,search=0.25,upload=0.05
+
+`OpenAIEmbeddings` tokenizes with tiktoken, which downloads its encoding on
+first use; on an offline machine point `TIKTOKEN_CACHE_DIR` at a cached copy.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import environment_info, percentile, save_results
+from benchmarks.fakes import WORDS
+from src.packaging_evaluation.metrics import EventLoopLagMonitor
+
+DEFAULT_CONCEPTS = [
+    "A 500ml PET bottle with a PP flip-top cap and an LDPE shrink sleeve.",
+    "A mono-material PP thermoformed tray with a peelable PP lidding film for chilled ready meals.",
+    "A folding carton with a paper-based barrier coating replacing a PE-lined liquid carton.",
+    "A refillable HDPE pouch with a spout and a child-resistant closure for detergent.",
+    "An aluminium aerosol can with a recycled-content PP actuator and a tamper-evident cap.",
+]
+
+DEFAULT_QUERIES = [
+    "PET bottle blow moulding cycle time",
+    "PP flip-top cap hinge fatigue",
+    "LDPE shrink sleeve shrink tunnel temperature",
+    "barrier coating oxygen transmission rate",
+    "thermoforming line speed for PP trays",
+    "ISO 11607 seal strength test",
+]
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse `evaluate=0.7,search=0.3` into normalized weights."""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    unknown = set(weights) - {"evaluate", "search", "upload"}
+    if unknown:
+        raise ValueError(f"Unknown endpoints in mix: {', '.join(sorted(unknown))}")
+    total = sum(weights.values())
+    return {name: weight / total for name, weight in weights.items()}
+
+
+class Workload:
+    """Request payloads drawn at random from the configured concept/document mix."""
+
+    def __init__(self, args, rng: random.Random):
+        self.rng = rng
+        self.concepts: List[Dict[str, Any]] = [{"packaging_concept": c, "concept_images": []} for c in DEFAULT_CONCEPTS]
+        if args.concepts:
+            with open(args.concepts) as f:
+                self.concepts = [json.loads(line) for line in f if line.strip()]
+
+        self.queries = DEFAULT_QUERIES
+        if args.queries:
+            self.queries = [line.strip() for line in Path(args.queries).read_text().splitlines() if line.strip()]
+
+        self.documents: List[tuple] = []
+        if args.documents:
+            for path in sorted(Path(args.documents).rglob("*")):
+                if path.suffix.lower() in (".txt", ".pdf"):
+                    self.documents.append((path.name, path.read_bytes()))
+        if not self.documents:
+            for i in range(5):
+                text = " ".join(rng.choice(WORDS) for _ in range(args.document_words))
+                self.documents.append((f"loadgen_{i}.txt", text.encode("utf-8")))
+
+    def evaluate(self, unique: bool = False) -> Dict[str, Any]:
+        body = self.rng.choice(self.concepts)
+        if unique:
+            # A distinct concept is not coalesced with requests already in flight
+            body = {**body, "packaging_concept": f"{body['packaging_concept']} (loadgen {self.rng.getrandbits(64):016x})"}
+        return body
+
+    def search(self) -> Dict[str, Any]:
+        return {"query": self.rng.choice(self.queries), "limit": 5}
+
+    def upload(self) -> tuple:
+        name, content = self.rng.choice(self.documents)
+        # Unique names so concurrent uploads do not collide in the upload directory
+        return f"{self.rng.getrandbits(32):08x}_{name}", content
+
+
+class LoadGenerator:
+    """Drives the APIs and collects per-request and per-interval measurements."""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.mix = parse_mix(args.mix)
+        self.workload = Workload(args, self.rng)
+        self.records: List[Dict[str, Any]] = []
+        self.server_metrics: List[Dict[str, Any]] = []
+        self.client_lag: List[Dict[str, Any]] = []
+        self.in_flight = 0
+        self.dropped = 0
+        self.start = 0.0
+        self.lag_monitor = EventLoopLagMonitor(interval=0.05)
+
+    async def _request(self, client: httpx.AsyncClient, endpoint: str):
+        self.in_flight += 1
+        issued = time.perf_counter()
+        status: Optional[int] = None
+        error: Optional[str] = None
+        coalesced = False
+        # Each virtual user is a separate client for the per-client admission limit
+        headers = {"X-Client-Id": f"loadgen-{self.rng.randrange(self.args.clients)}"}
+        try:
+            if endpoint == "evaluate":
+                response = await client.post(
+                    f"{self.args.api_url}/evaluate",
+                    json=self.workload.evaluate(self.args.unique_concepts),
+                    headers=headers
+                )
+                coalesced = response.headers.get("X-Coalesced") == "true"
+            elif endpoint == "search":
+                response = await client.get(f"{self.args.kb_url}/search", params=self.workload.search(), headers=headers)
+            else:
+                name, content = self.workload.upload()
+                response = await client.post(
+                    f"{self.args.kb_url}/upload",
+                    params={"agent_type": "technical"},
+                    files={"file": (name, content)},
+                    headers=headers
+                )
+            status = response.status_code
+            if status >= 400:
+                error = f"HTTP {status}"
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+        finally:
+            self.in_flight -= 1
+        finished = time.perf_counter()
+        self.records.append({
+            "endpoint": endpoint,
+            "issued_s": issued - self.start,
+            "finished_s": finished - self.start,
+            "latency_s": finished - issued,
+            "status": status,
+            "error": error,
+            "coalesced": coalesced,
+        })
+
+    async def _arrivals(self, client: httpx.AsyncClient, tasks: List[asyncio.Task]):
+        endpoints = list(self.mix)
+        weights = [self.mix[name] for name in endpoints]
+        for rate in self.args.rate:
+            stage_end = time.perf_counter() + self.args.stage_duration
+            while time.perf_counter() < stage_end:
+                await asyncio.sleep(self.rng.expovariate(rate))
+                if self.in_flight >= self.args.max_in_flight:
+                    self.dropped += 1
+                    continue
+                endpoint = self.rng.choices(endpoints, weights)[0]
+                tasks.append(asyncio.create_task(self._request(client, endpoint)))
+
+    async def _poll_metrics(self, client: httpx.AsyncClient):
+        targets = {}
+        if "evaluate" in self.mix:
+            targets["api"] = self.args.api_url
+        if any(name in self.mix for name in ("search", "upload")):
+            targets["kb"] = self.args.kb_url
+        while True:
+            await asyncio.sleep(self.args.interval)
+            elapsed = time.perf_counter() - self.start
+            sample: Dict[str, Any] = {"t_s": round(elapsed, 2), "in_flight": self.in_flight}
+            for name, url in targets.items():
+                try:
+                    response = await client.get(f"{url}/metrics", timeout=self.args.interval)
+                    sample[name] = response.json()
+                except (httpx.HTTPError, ValueError) as e:
+                    sample[name] = {"error": type(e).__name__}
+            self.server_metrics.append(sample)
+            self.client_lag.append({"t_s": round(elapsed, 2), **self.lag_monitor.snapshot(recent=int(self.args.interval / 0.05))})
+            self._print_interval(sample)
+
+    def _print_interval(self, sample: Dict[str, Any]):
+        t = sample["t_s"]
+        window = [r for r in self.records if t - self.args.interval <= r["finished_s"] < t]
+        ok = [r for r in window if r["error"] is None]
+        rejected = sum(1 for r in window if r["status"] == 429)
+        lags = ", ".join(
+            f"{name} lag max={sample[name].get('event_loop_lag', {}).get('recent_max_ms', '?')}ms"
+            for name in ("api", "kb") if name in sample
+        )
+        print(
+            f"t={t:7.1f}s done={len(window):4d} ok/s={len(ok) / self.args.interval:6.2f} "
+            f"429s={rejected:3d} errors={len(window) - len(ok) - rejected:3d} p95={1000 * percentile([r['latency_s'] for r in ok], 95):8.1f}ms "
+            f"in_flight={sample['in_flight']:4d} {lags}",
+            file=sys.stderr
+        )
+
+    async def run(self) -> Dict[str, Any]:
+        limits = httpx.Limits(max_connections=self.args.max_in_flight, max_keepalive_connections=self.args.max_in_flight)
+        async with httpx.AsyncClient(timeout=self.args.timeout, limits=limits) as client:
+            self.lag_monitor.start()
+            self.start = time.perf_counter()
+            poller = asyncio.create_task(self._poll_metrics(client))
+            tasks: List[asyncio.Task] = []
+            await self._arrivals(client, tasks)
+            if tasks:
+                await asyncio.gather(*tasks)
+            poller.cancel()
+            await self.lag_monitor.stop()
+        return self.report(time.perf_counter() - self.start)
+
+    def report(self, duration: float) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint in self.mix:
+            records = [r for r in self.records if r["endpoint"] == endpoint]
+            ok = [r["latency_s"] for r in records if r["error"] is None]
+            # Admission control rejections and shedding (429) are load shed by design, not failures
+            rejected = sum(1 for r in records if r["status"] == 429)
+            errors: Dict[str, int] = {}
+            for r in records:
+                if r["error"] and r["status"] != 429:
+                    errors[r["error"]] = errors.get(r["error"], 0) + 1
+            endpoints[endpoint] = {
+                "requests": len(records),
+                "succeeded": len(ok),
+                "rejected_429": rejected,
+                "rejection_rate": round(rejected / len(records), 4) if records else 0.0,
+                "coalesced": sum(1 for r in records if r["coalesced"]),
+                "error_rate": round(sum(errors.values()) / len(records), 4) if records else 0.0,
+                "errors": errors,
+                "throughput_per_s": round(len(ok) / duration, 3) if duration else 0.0,
+                "p50_ms": round(1000 * percentile(ok, 50), 1),
+                "p95_ms": round(1000 * percentile(ok, 95), 1),
+                "p99_ms": round(1000 * percentile(ok, 99), 1),
+            }
+
+        timeline = []
+        bucket = self.args.interval
+        for i in range(int(duration // bucket) + 1):
+            window = [r for r in self.records if i * bucket <= r["finished_s"] < (i + 1) * bucket]
+            ok = [r["latency_s"] for r in window if r["error"] is None]
+            rejected = sum(1 for r in window if r["status"] == 429)
+            timeline.append({
+                "t_s": round((i + 1) * bucket, 2),
+                "completed": len(window),
+                "throughput_per_s": round(len(ok) / bucket, 3),
+                "rejected_429": rejected,
+                "errors": len(window) - len(ok) - rejected,
+                "p50_ms": round(1000 * percentile(ok, 50), 1),
+                "p95_ms": round(1000 * percentile(ok, 95), 1),
+                "p99_ms": round(1000 * percentile(ok, 99), 1),
+            })
+
+        return {
+            "environment": environment_info(),
+            "config": {k: v for k, v in vars(self.args).items() if k != "output"},
+            "duration_s": round(duration, 2),
+            "dropped_arrivals": self.dropped,
+            "endpoints": endpoints,
+            "timeline": timeline,
+            "server_metrics": self.server_metrics,
+            "client_event_loop_lag": self.client_lag,
+        }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-url", default="http://localhost:8000", help="Evaluation API (src.web.api)")
+    parser.add_argument("--kb-url", default="http://localhost:8001", help="Knowledge-base API (vector_store.api)")
+    parser.add_argument("--rate", default="1", help="Arrival rate(s) in requests/s, e.g. 1,2,4,8 for stepped stages")
+    parser.add_argument("--stage-duration", type=float, default=60.0, help="Seconds per rate stage")
+    parser.add_argument("--mix", default="evaluate=1", help="Endpoint weights, e.g. evaluate=0.7,search=0.25,upload=0.05")
+    parser.add_argument("--concepts", help="JSONL file of /evaluate request bodies")
+    parser.add_argument("--unique-concepts", action="store_true",
+                        help="Make every /evaluate concept distinct, so requests are not coalesced into shared runs")
+    parser.add_argument("--clients", type=int, default=100, help="Virtual users, each with its own X-Client-Id")
+    parser.add_argument("--queries", help="Text file of search queries, one per line")
+    parser.add_argument("--documents", help="Directory of .txt/.pdf files to upload")
+    parser.add_argument("--document-words", type=int, default=2000, help="Size of synthetic upload documents")
+    parser.add_argument("--interval", type=float, default=5.0, help="Reporting interval in seconds")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Arrivals beyond this are dropped and counted")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="loadgen_results.json")
+    args = parser.parse_args(argv)
+    args.rate = [float(rate) for rate in args.rate.split(",")]
+    return args
+
+
+async def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = await LoadGenerator(args).run()
+    save_results(results, args.output)
+    for endpoint, summary in results["endpoints"].items():
+        print(
+            f"{endpoint}: {summary['succeeded']}/{summary['requests']} ok "
+            f"({summary['throughput_per_s']}/s) p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms "
+            f"p99={summary['p99_ms']}ms 429s={summary['rejected_429']} ({summary['rejection_rate']:.2%}) "
+            f"coalesced={summary['coalesced']} error_rate={summary['error_rate']:.2%}",
+            file=sys.stderr
+        )
+    print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,859 @@
+"""Offline benchmark suite for the packaging evaluation system.
+
+Runs the LangGraph pipeline, the `/evaluate` endpoint, state validation and
+serialization, document chunking and vector store ingestion/search against
+deterministic fakes, and reports throughput and latency percentiles.
+
+Usage (from the repository root):
+
+    python -m benchmarks.run --suites all --iterations 50 --concurrency 8 \\
+        --llm-latency 0.05 --output bench_results.json
+
+    # Fail (exit code 1) if any suite's p95 regressed more than 20%
+    python -m benchmarks.run --baseline bench_baseline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict
+
+# Model clients are replaced by fakes before any call, but creating one (as the
+# API's startup warmup does) needs a key to exist.
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from benchmarks.common import (
+    environment_info,
+    find_regressions,
+    run_concurrently,
+    save_results,
+    summarize,
+    time_sync,
+)
+from benchmarks.fakes import (
+    WORDS,
+    FakeChatModel,
+    FakeEmbeddings,
+    LocalSupabase,
+    MeteredChatModel,
+    build_fake_instance,
+)
+
+SUITES = [
+    "pipeline", "api", "state", "serialization", "chunking", "ingestion", "library", "catalog", "search", "hybrid",
+    "search_cache", "quantization", "ann", "history", "cold_start"
+]
+
+CONCEPT = (
+    "A 500ml PET bottle with a PP flip-top cap, an LDPE shrink sleeve printed in "
+    "six colours and a tamper-evident band, filled on an existing high-speed line."
+)
+
+
+def _fake_image(size_kb: int) -> str:
+    """A data URI of roughly the requested size."""
+    payload = base64.b64encode(os.urandom(size_kb * 768)).decode()
+    return f"data:image/png;base64,{payload}"
+
+
+def _install_llm(args) -> MeteredChatModel:
+    """Replace the shared chat model used by every node.
+
+    Uses the fake model, or replays recorded responses with `--cassette`;
+    either way calls are metered so orchestration overhead can be attributed.
+    """
+    from src.packaging_evaluation import tools
+    from src.packaging_evaluation.configuration import AGENT_CONFIG, CASCADE_CONFIG, REFLECTION_GATE_CONFIG
+
+    if args.cassette:
+        from src.packaging_evaluation.cassette import Cassette, ReplayChatModel
+
+        model = ReplayChatModel(Cassette(args.cassette, latency_scale=args.cassette_latency_scale))
+    else:
+        overrides = {} if args.iterate_reflection else {"ReflectionNotes": {"requires_iteration": False}}
+        model = FakeChatModel(latency=args.llm_latency, jitter=args.llm_jitter, overrides=overrides)
+    tools.llm = MeteredChatModel(model)
+    # Cascaded nodes try the small model first; serve it from the same source
+    if args.cascade:
+        CASCADE_CONFIG["enabled"] = True
+    if CASCADE_CONFIG["enabled"]:
+        tools.small_llm = tools.llm
+    if args.pipelined:
+        AGENT_CONFIG["operations"]["pipelined"] = True
+    if args.reflection_gate:
+        REFLECTION_GATE_CONFIG["enabled"] = True
+    return tools.llm
+
+
+def _with_overhead(summary: Dict[str, Any], model: MeteredChatModel) -> Dict[str, Any]:
+    """Attribute the part of the mean latency not spent waiting on the model."""
+    runs = max(summary["count"], 1)
+    summary["model_calls_per_run"] = round(model.calls / runs, 2)
+    summary["model_ms_per_run"] = round(1000 * model.seconds / runs, 3)
+    summary["overhead_ms_mean"] = round(summary["mean_ms"] - summary["model_ms_per_run"], 3)
+    return summary
+
+
+async def bench_pipeline(args) -> Dict[str, Any]:
+    """Full `graph.py` pipeline with human feedback pre-approved."""
+    from src.packaging_evaluation import tools
+    from src.packaging_evaluation.cascade import cascade_stats
+    from src.packaging_evaluation.graph import graph
+    from src.packaging_evaluation.state import PackagingEvaluationState, UserFeedback
+
+    model = _install_llm(args)
+    app = graph.compile()
+    images = [_fake_image(args.image_kb)] * args.images
+
+    async def run(i: int):
+        state = PackagingEvaluationState(
+            packaging_concept=f"{CONCEPT} Variant {i}.",
+            concept_images=images,
+            user_feedback=UserFeedback(is_correct=True, feedback_notes=[], suggested_changes=[])
+        )
+        await app.ainvoke(state)
+
+    latencies, wall, errors = await run_concurrently(run, args.iterations, args.concurrency)
+    summary = _with_overhead(summarize(latencies, wall, errors), model)
+    summary["model_cascade"] = cascade_stats.snapshot()
+    summary["reflection_gate"] = dict(tools.reflection_gate_stats)
+    return summary
+
+
+async def bench_api(args) -> Dict[str, Any]:
+    """`/evaluate` through the ASGI stack (runs until human feedback is requested)."""
+    import httpx
+    from src.packaging_evaluation.configuration import HISTORY_CONFIG
+
+    # Keep benchmark evaluations out of the evaluation history file
+    HISTORY_CONFIG["path"] = None
+    from src.web.api import app
+
+    model = _install_llm(args)
+    payload = {"packaging_concept": CONCEPT, "concept_images": [_fake_image(args.image_kb)] * args.images}
+    response_bytes = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def run(i: int):
+            response = await client.post(
+                "/evaluate",
+                json={**payload, "packaging_concept": f"{CONCEPT} Variant {i}."}
+            )
+            response.raise_for_status()
+            response_bytes.append(len(response.content))
+
+        latencies, wall, errors = await run_concurrently(run, args.iterations, args.concurrency)
+
+    summary = _with_overhead(summarize(latencies, wall, errors), model)
+    summary["response_bytes_mean"] = round(sum(response_bytes) / len(response_bytes)) if response_bytes else 0
+    return summary
+
+
+async def bench_state(args) -> Dict[str, Any]:
+    """Validation and serialization cost of a fully populated state."""
+    from src.packaging_evaluation.state import PackagingEvaluationState, message_from
+
+    state = build_fake_instance(PackagingEvaluationState, seed="state", list_length=args.list_length)
+    state.concept_images = [_fake_image(args.image_kb)] * args.images
+    dumped = state.model_dump()
+    encoded = state.model_dump_json()
+
+    operations = {
+        "validate": lambda i: PackagingEvaluationState.model_validate(dumped),
+        "dump": lambda i: state.model_dump(),
+        "dump_json": lambda i: state.model_dump_json(),
+        "validate_json": lambda i: PackagingEvaluationState.model_validate_json(encoded),
+        "copy": lambda i: state.model_copy(deep=True),
+        "apply": lambda i: state.apply({"current_node": "operations", "messages": [message_from("bench", "Step")]}),
+    }
+    details = {}
+    for name, operation in operations.items():
+        latencies, wall = time_sync(operation, args.iterations)
+        details[name] = summarize(latencies, wall)
+
+    # Top-level figures are for a full JSON round trip, as done per API call
+    latencies, wall = time_sync(
+        lambda i: PackagingEvaluationState.model_validate_json(state.model_dump_json()),
+        args.iterations
+    )
+    summary = summarize(latencies, wall)
+    summary["state_json_bytes"] = len(encoded)
+    summary["operations"] = details
+    return summary
+
+
+async def bench_serialization(args) -> Dict[str, Any]:
+    """Size and encode/decode time of a full state per serializer, against pydantic's JSON path."""
+    from src.packaging_evaluation.serialization import DEFAULT_SERIALIZER, SERIALIZERS, compress, decompress, zstandard
+    from src.packaging_evaluation.state import PackagingEvaluationState
+
+    state = build_fake_instance(PackagingEvaluationState, seed="state", list_length=args.list_length)
+    state.concept_images = [_fake_image(args.image_kb)] * args.images
+
+    # Baseline: the path FastAPI responses and model_validate_json take today
+    formats = {
+        "pydantic_json": (
+            lambda: state.model_dump_json().encode("utf-8"),
+            lambda payload: PackagingEvaluationState.model_validate_json(payload)
+        )
+    }
+    for name, serializer in SERIALIZERS.items():
+        formats[name] = (
+            lambda serializer=serializer: serializer.encode(state.model_dump()),
+            lambda payload, serializer=serializer: PackagingEvaluationState.model_validate(serializer.decode(payload))
+        )
+        if zstandard is not None:
+            formats[f"{name}+zstd"] = (
+                lambda serializer=serializer: compress(serializer.encode(state.model_dump())),
+                lambda payload, serializer=serializer: PackagingEvaluationState.model_validate(
+                    serializer.decode(decompress(payload)))
+            )
+
+    details = {}
+    for name, (encode, decode) in formats.items():
+        payload = encode()
+        encode_latencies, encode_wall = time_sync(lambda i: encode(), args.iterations)
+        decode_latencies, decode_wall = time_sync(lambda i: decode(payload), args.iterations)
+        details[name] = {
+            "bytes": len(payload),
+            "encode": summarize(encode_latencies, encode_wall),
+            "decode": summarize(decode_latencies, decode_wall),
+        }
+
+    # Top-level figures are for the default serializer's encode, as done per API response
+    summary = dict(details[DEFAULT_SERIALIZER.name]["encode"])
+    summary["formats"] = details
+    return summary
+
+
+def _write_document(directory: str, words: int) -> str:
+    """Write a synthetic text document and return its path."""
+    rng = random.Random(words)
+    text = " ".join(f"{rng.choice(WORDS)}{rng.randint(1, 99)}" for _ in range(words))
+    path = Path(directory) / "benchmark_document.txt"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def _document_metadata(path: str):
+    from src.packaging_evaluation.vector_store.document_processor import DocumentMetadata
+
+    return DocumentMetadata(
+        filename=Path(path).name,
+        file_type=".txt",
+        file_size=Path(path).stat().st_size,
+        agent_type="technical"
+    )
+
+
+async def bench_chunking(args) -> Dict[str, Any]:
+    """`DocumentProcessor` chunking of a synthetic text document."""
+    from src.packaging_evaluation.vector_store.document_processor import DocumentProcessor
+
+    processor = DocumentProcessor()
+    with tempfile.TemporaryDirectory() as directory:
+        path = _write_document(directory, args.document_words)
+        metadata = _document_metadata(path)
+        chunks = len(processor.process_document(path, metadata))
+        latencies, wall = time_sync(lambda i: processor.process_document(path, metadata), args.iterations)
+
+    summary = summarize(latencies, wall)
+    summary["chunks_per_document"] = chunks
+    summary["words_per_s"] = round(args.document_words * args.iterations / wall) if wall > 0 else 0
+    return summary
+
+
+def _entry_id(name: str) -> str:
+    """A knowledge base id (knowledge_base.id is a uuid column) derived from a readable name."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, name))
+
+
+async def _store_and_entries(args):
+    """Vector store client over an empty local store, plus one document's chunks."""
+    from src.packaging_evaluation.vector_store.client import VectorStoreClient
+    from src.packaging_evaluation.vector_store.document_processor import DocumentProcessor
+
+    client = VectorStoreClient(
+        supabase=LocalSupabase(),
+        embeddings=FakeEmbeddings(dimensions=args.dimensions, latency=args.embedding_latency)
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        path = _write_document(directory, args.document_words)
+        entries = DocumentProcessor().process_document(path, _document_metadata(path))
+    return client, entries
+
+
+async def bench_ingestion(args) -> Dict[str, Any]:
+    """`VectorStoreClient.add_knowledge_entry` for every chunk of a document."""
+    client, entries = await _store_and_entries(args)
+
+    async def run(i: int):
+        entry = entries[i % len(entries)].model_copy(update={"id": _entry_id(f"{entries[i % len(entries)].id}-{i}")})
+        await client.add_knowledge_entry(entry)
+
+    latencies, wall, errors = await run_concurrently(run, args.iterations, args.concurrency)
+    return summarize(latencies, wall, errors)
+
+
+async def bench_library(args) -> Dict[str, Any]:
+    """Pipelined ingestion of `--library-files` text files, against the `/upload` per-file loop."""
+    from src.packaging_evaluation.vector_store.client import VectorStoreClient
+    from src.packaging_evaluation.vector_store.document_processor import DocumentProcessor
+    from src.packaging_evaluation.vector_store.ingest import ingest_library
+
+    def new_client() -> VectorStoreClient:
+        return VectorStoreClient(
+            supabase=LocalSupabase(),
+            embeddings=FakeEmbeddings(dimensions=args.dimensions, latency=args.embedding_latency)
+        )
+
+    with tempfile.TemporaryDirectory() as directory:
+        rng = random.Random("library")
+        paths = []
+        for i in range(args.library_files):
+            path = Path(directory) / "library" / f"document_{i:04d}.txt"
+            path.parent.mkdir(exist_ok=True)
+            path.write_text(" ".join(f"{rng.choice(WORDS)}{rng.randint(1, 99)}" for _ in range(2000)), encoding="utf-8")
+            paths.append(str(path))
+        processor = DocumentProcessor(chunk_overlap=20)
+
+        # What `/upload` does per file: parse, then embed and insert chunk by chunk
+        client = new_client()
+        start = time.perf_counter()
+        latencies = []
+        for path in paths:
+            file_start = time.perf_counter()
+            for entry in processor.process_document(path, _document_metadata(path)):
+                await client.add_knowledge_entry(entry)
+            latencies.append(time.perf_counter() - file_start)
+        details = {"upload_loop": summarize(latencies, time.perf_counter() - start)}
+        details["upload_loop"]["files_per_s"] = details["upload_loop"]["throughput_per_s"]
+
+        # The pipeline, then a resumed run with every file in the manifest
+        client = new_client()
+        manifest = str(Path(directory) / "manifest.jsonl")
+        for name in ("pipeline", "resume"):
+            counts = await ingest_library(
+                Path(directory) / "library", client, manifest=manifest, chunk_overlap=20,
+                embed_concurrency=args.concurrency
+            )
+            details[name] = {**summarize([counts["seconds"]], counts["seconds"]), **counts}
+
+    # Top-level figures are for the pipeline
+    summary = {**details["pipeline"], "operations": details}
+    summary["speedup"] = round(
+        details["pipeline"]["files_per_s"] / details["upload_loop"]["files_per_s"], 2
+    ) if details["upload_loop"]["files_per_s"] else 0.0
+    return summary
+
+
+async def bench_catalog(args) -> Dict[str, Any]:
+    """Bulk catalog import of `--catalog-size` machine specs, against one `add_machine` call per spec."""
+    from src.packaging_evaluation.vector_store.catalog import import_catalog
+    from src.packaging_evaluation.vector_store.client import VectorStoreClient
+    from src.packaging_evaluation.vector_store.models import MachineSpec
+
+    rng = random.Random("catalog")
+    records = [
+        (i, {
+            "id": f"M-{i:05d}",
+            "name": f"Machine {i}",
+            "type": rng.choice(["printer", "cutter", "folder", "filler", "labeller"]),
+            "capabilities": [rng.choice(WORDS) for _ in range(4)],
+            "constraints": [rng.choice(WORDS) for _ in range(3)],
+            "specifications": " ".join(rng.choice(WORDS) for _ in range(60)),
+        })
+        for i in range(args.catalog_size)
+    ]
+
+    def new_client() -> VectorStoreClient:
+        return VectorStoreClient(
+            supabase=LocalSupabase(),
+            embeddings=FakeEmbeddings(dimensions=args.dimensions, latency=args.embedding_latency)
+        )
+
+    # The per-spec loop this replaces, on the same specs
+    client = new_client()
+    specs = [MachineSpec(**{**record, "id": str(uuid.uuid5(uuid.NAMESPACE_URL, record["id"]))}) for _, record in records]
+
+    async def add(i: int):
+        await client.add_machine(specs[i])
+
+    latencies, wall, errors = await run_concurrently(add, len(specs), args.concurrency)
+    details = {"add_machine": summarize(latencies, wall, errors)}
+    details["add_machine"]["records_per_s"] = details["add_machine"]["throughput_per_s"]
+
+    # A first import, then a refresh of the unchanged catalog
+    client = new_client()
+    for name in ("import", "reimport"):
+        counts = await import_catalog(iter(records), client, kind="machine", concurrency=args.concurrency)
+        details[name] = {**summarize([counts["seconds"]], counts["seconds"]), **counts}
+
+    # Top-level figures are for the first import
+    summary = {**details["import"], "operations": details}
+    summary["speedup"] = round(
+        details["import"]["records_per_s"] / details["add_machine"]["records_per_s"], 2
+    ) if details["add_machine"]["records_per_s"] else 0.0
+    return summary
+
+
+async def bench_search(args) -> Dict[str, Any]:
+    """`VectorStoreClient.search_similar` over the ingested chunks."""
+    client, entries = await _store_and_entries(args)
+    for entry in entries:
+        await client.add_knowledge_entry(entry)
+    queries = [" ".join(entry.content.split()[:6]) for entry in entries]
+
+    async def run(i: int):
+        await client.search_similar(queries[i % len(queries)], limit=5)
+
+    latencies, wall, errors = await run_concurrently(run, args.iterations, args.concurrency)
+    summary = summarize(latencies, wall, errors)
+    summary["indexed_entries"] = len(entries)
+    return summary
+
+
+async def bench_hybrid(args) -> Dict[str, Any]:
+    """Vector, keyword and hybrid search for identifiers (resin grades) in `--corpus-size` chunks.
+
+    Reports the share of queries whose chunk is in the top 5 and the latency
+    of each mode. Fake embeddings are bag-of-words, so vector search gets no
+    help from meaning here; the keyword figures are the ones to compare.
+    """
+    from src.packaging_evaluation.vector_store.client import VectorStoreClient
+    from src.packaging_evaluation.vector_store.models import KnowledgeEntry
+
+    rng = random.Random("hybrid")
+    client = VectorStoreClient(
+        supabase=LocalSupabase(),
+        embeddings=FakeEmbeddings(dimensions=args.dimensions, latency=args.embedding_latency)
+    )
+    identifiers = {}
+    entries = []
+    for i in range(args.corpus_size):
+        identifier = (
+            f"{rng.choice(['HD', 'LL', 'PP', 'PET'])}{rng.randint(1000, 9999)}-"
+            f"{rng.choice('ABCDEFGH')}{rng.choice('ABCDEFGH')}"
+        )
+        entry_id = _entry_id(f"chunk-{i}")
+        identifiers[entry_id] = identifier
+        text = " ".join(rng.choice(WORDS) for _ in range(30))
+        entries.append(KnowledgeEntry(id=entry_id, type="document", content=f"{text} grade {identifier}", metadata={}))
+    client.write_knowledge_entries(entries, client.embeddings.embed_documents([entry.content for entry in entries]))
+    queries = [(entry_id, f"datasheet {identifiers[entry_id]}") for entry_id in rng.sample(sorted(identifiers), args.recall_queries)]
+
+    details = {}
+    for mode, search in (
+        ("vector", client.search_similar),
+        ("keyword", client.search_keyword),
+        ("hybrid", client.search_hybrid),
+    ):
+        hits, latencies = 0, []
+        start = time.perf_counter()
+        for entry_id, query in queries:
+            query_start = time.perf_counter()
+            results = await search(query, 5)
+            latencies.append(time.perf_counter() - query_start)
+            hits += entry_id in [result.id for result in results]
+        details[mode] = summarize(latencies, time.perf_counter() - start)
+        details[mode]["hit_rate_at_5"] = round(hits / len(queries), 4)
+
+    # Top-level figures are for hybrid search
+    summary = dict(details["hybrid"])
+    summary["operations"] = details
+    return summary
+
+
+async def bench_search_cache(args) -> Dict[str, Any]:
+    """`/search` handler for a skewed mix of `--cache-queries` distinct queries, without and with the result cache.
+
+    One entry is written every `--cache-write-every` searches, invalidating
+    the cache as an ingest would. Cache hits are also reported on their own.
+    """
+    from src.packaging_evaluation.configuration import SEARCH_CACHE_CONFIG
+    from src.packaging_evaluation.vector_store import api
+    from src.packaging_evaluation.vector_store.client import VectorStoreClient
+    from src.packaging_evaluation.vector_store.models import KnowledgeEntry
+
+    rng = random.Random("search_cache")
+    texts = [" ".join(rng.choice(WORDS) for _ in range(30)) for _ in range(args.corpus_size)]
+    pool = [" ".join(rng.sample(rng.choice(texts).split(), 4)) for _ in range(args.cache_queries)]
+    # Popular queries recur far more often than the rest (Zipf-like)
+    queries = rng.choices(pool, weights=[1 / rank for rank in range(1, len(pool) + 1)], k=args.iterations)
+
+    async def run(cached: bool):
+        SEARCH_CACHE_CONFIG["enabled"] = cached
+        client = VectorStoreClient(
+            supabase=LocalSupabase(),
+            embeddings=FakeEmbeddings(dimensions=args.dimensions, latency=args.embedding_latency)
+        )
+        client.write_knowledge_entries(
+            [
+                KnowledgeEntry(id=_entry_id(f"chunk-{i}"), type="document", content=text, metadata={})
+                for i, text in enumerate(texts)
+            ],
+            client.embeddings.embed_documents(texts)
+        )
+        api.vector_store = client
+        latencies, hit_latencies = [], []
+        start = time.perf_counter()
+        for i, query in enumerate(queries):
+            if i and i % args.cache_write_every == 0:
+                entry = KnowledgeEntry(id=_entry_id(f"new-{i}"), type="document", content=rng.choice(texts), metadata={})
+                await client.upsert_knowledge_entries([entry], skip_unchanged=False)
+            hits = client.search_cache.hits if cached else 0
+            query_start = time.perf_counter()
+            await api.search_documents(query, limit=5, mode="hybrid")
+            latencies.append(time.perf_counter() - query_start)
+            if cached and client.search_cache.hits > hits:
+                hit_latencies.append(latencies[-1])
+        summary = summarize(latencies, time.perf_counter() - start)
+        return summary, hit_latencies, client.search_cache.stats() if cached else None
+
+    default_client, enabled = api.vector_store, SEARCH_CACHE_CONFIG["enabled"]
+    try:
+        uncached, _, _ = await run(False)
+        cached, hit_latencies, stats = await run(True)
+    finally:
+        api.vector_store, SEARCH_CACHE_CONFIG["enabled"] = default_client, enabled
+
+    # Top-level figures are for the cached searches
+    summary = dict(cached)
+    summary.update({key: stats[key] for key in ("hit_rate", "invalidations")})
+    summary["operations"] = {
+        "uncached": uncached,
+        "cached": cached,
+        "hit": summarize(hit_latencies, sum(hit_latencies)),
+    }
+    return summary
+
+
+async def bench_quantization(args) -> Dict[str, Any]:
+    """Recall@k and storage of shortened and compact embeddings, against exact full-size float32 search.
+
+    Shortened embeddings are the full fake embeddings truncated and renormalized,
+    as the embedding model's `dimensions` option does. Fake embeddings are not
+    trained for shortening, so their recall understates the real model's.
+    """
+    from src.packaging_evaluation.vector_store.client import VectorStoreClient
+    from src.packaging_evaluation.vector_store.models import KnowledgeEntry
+    from src.packaging_evaluation.vector_store.quantization import BINARY, FLOAT16, FLOAT32, bytes_per_vector, recall_at_k
+
+    k = 10
+    rng = random.Random("quantization")
+    texts = [" ".join(f"{rng.choice(WORDS)}{rng.randint(1, 20)}" for _ in range(30)) for _ in range(args.corpus_size)]
+    queries = [" ".join(rng.sample(rng.choice(texts).split(), 6)) for _ in range(args.recall_queries)]
+    embeddings = FakeEmbeddings(dimensions=args.dimensions)
+    vectors = embeddings.embed_documents(texts)
+    query_vectors = embeddings.embed_documents(queries)
+    entries = [
+        KnowledgeEntry(id=_entry_id(f"chunk-{i}"), type="document", content=text, metadata={})
+        for i, text in enumerate(texts)
+    ]
+
+    def shorten(vector, dimensions):
+        norm = math.sqrt(sum(v * v for v in vector[:dimensions])) or 1.0
+        return [v / norm for v in vector[:dimensions]]
+
+    async def search(storage, rescore, dimensions):
+        client = VectorStoreClient(supabase=LocalSupabase(), embeddings=embeddings, storage=storage, rescore=rescore)
+        client.write_knowledge_entries(entries, [shorten(vector, dimensions) for vector in vectors])
+        results, latencies = [], []
+        for vector in query_vectors:
+            start = time.perf_counter()
+            found = await client.search_by_embedding(shorten(vector, dimensions), k, match_threshold=-1.0)
+            latencies.append(time.perf_counter() - start)
+            results.append([entry.id for entry in found])
+        return results, latencies
+
+    exact, _ = await search(FLOAT32, False, args.dimensions)
+    details = {}
+    for dimensions in (args.dimensions, args.dimensions // 4):
+        for storage, rescore in ((FLOAT32, False), (FLOAT16, False), (FLOAT16, True), (BINARY, False), (BINARY, True)):
+            results, latencies = await search(storage, rescore, dimensions)
+            name = f"{storage}{'_rescored' if rescore else ''}_{dimensions}d"
+            details[name] = summarize(latencies, sum(latencies))
+            details[name][f"recall_at_{k}"] = recall_at_k(exact, results, k)
+            details[name]["bytes_per_vector"] = bytes_per_vector(dimensions, storage, rescore)
+
+    # Top-level figures are for binary search with rescoring at full size
+    summary = dict(details[f"{BINARY}_rescored_{args.dimensions}d"])
+    summary["operations"] = details
+    return summary
+
+
+def _ann_benchmark(psycopg, database_url: str, args) -> Dict[str, Any]:
+    from src.packaging_evaluation.configuration import ANN_CONFIG
+    from src.packaging_evaluation.vector_store.quantization import recall_at_k
+
+    k = 10
+    dimensions = args.dimensions
+    rng = random.Random("ann")
+    queries = []
+    for _ in range(args.recall_queries):
+        vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+        queries.append("[" + ",".join(f"{v:.6f}" for v in vector) + "]")
+
+    def search(conn, query):
+        return [row[0] for row in conn.execute(
+            "select id from ann_benchmark order by embedding <=> %s::vector limit %s", (query, k)
+        ).fetchall()]
+
+    def timed(conn):
+        results, latencies = [], []
+        start = time.perf_counter()
+        for query in queries:
+            query_start = time.perf_counter()
+            results.append(search(conn, query))
+            latencies.append(time.perf_counter() - query_start)
+        return results, summarize(latencies, time.perf_counter() - start)
+
+    details = {}
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        conn.execute("create extension if not exists vector")
+        conn.execute("drop table if exists ann_benchmark")
+        conn.execute(f"create unlogged table ann_benchmark (id bigint primary key, embedding vector({dimensions}))")
+        # The index exists before the rows, so it is built incrementally on insert, as for the knowledge base
+        conn.execute(
+            f"create index on ann_benchmark using hnsw (embedding vector_cosine_ops) "
+            f"with (m = {args.hnsw_m}, ef_construction = {args.hnsw_ef_construction})"
+        )
+        try:
+            loaded = 0
+            for size in sorted(int(size) for size in args.ann_sizes.split(",")):
+                # Random vectors are generated in the database rather than sent over the network
+                start = time.perf_counter()
+                conn.execute(
+                    "insert into ann_benchmark select i, (select array_agg(random() - 0.5) "
+                    "from generate_series(1, %s) where i is not null)::vector from generate_series(%s, %s) i",
+                    (dimensions, loaded + 1, size)
+                )
+                insert_per_s = round((size - loaded) / (time.perf_counter() - start), 1)
+                loaded = size
+
+                # Exact search scans the table, ignoring the index
+                conn.execute("set enable_indexscan = off")
+                exact, details[f"{size}_exact"] = timed(conn)
+                conn.execute("reset enable_indexscan")
+                for ef_search in (int(ef) for ef in args.ef_search.split(",")):
+                    conn.execute(f"set hnsw.ef_search = {ef_search}")
+                    found, summary = timed(conn)
+                    summary[f"recall_at_{k}"] = recall_at_k(exact, found, k)
+                    summary["insert_per_s"] = insert_per_s
+                    details[f"{size}_hnsw_ef{ef_search}"] = summary
+        finally:
+            conn.execute("drop table if exists ann_benchmark")
+
+    # Top-level figures are for the largest size at the configured ef_search, if measured
+    name = f"{loaded}_hnsw_ef{ANN_CONFIG['ef_search'] or 40}"
+    summary = dict(details.get(name, details[f"{loaded}_exact"]))
+    summary["operations"] = details
+    return summary
+
+
+async def bench_ann(args) -> Dict[str, Any]:
+    """HNSW against exact search in pgvector: QPS and recall@10 at each of `--ann-sizes` vectors.
+
+    Needs psycopg and a Postgres database with pgvector (`--database-url` or
+    DATABASE_URL). Vectors go to a scratch table that is dropped afterwards.
+    They are random, which is a hard case for ANN recall compared with real
+    embeddings.
+    """
+    database_url = args.database_url or os.environ.get("DATABASE_URL")
+    if not database_url:
+        return {"skipped": "no --database-url or DATABASE_URL"}
+    try:
+        import psycopg
+    except ImportError:
+        return {"skipped": "psycopg is not installed"}
+    return await asyncio.to_thread(_ann_benchmark, psycopg, database_url, args)
+
+
+async def bench_history(args) -> Dict[str, Any]:
+    """Evaluation history queries and exports over `--history-size` stored evaluations."""
+    from src.packaging_evaluation.history import EvaluationHistory, HistoryFilter
+    from src.packaging_evaluation.state import PackagingEvaluationState
+
+    rng = random.Random("history")
+    template = build_fake_instance(PackagingEvaluationState, seed="history", list_length=4)
+    materials = ["PET", "HDPE", "PP", "LDPE film", "Corrugated board", "Aluminium", "Glass", "Molded pulp"]
+    history = EvaluationHistory()
+
+    # Vary the indexed fields; the rest of each state is shared
+    start = time.perf_counter()
+    for first in range(0, args.history_size, 1000):
+        batch = []
+        for _ in range(first, min(first + 1000, args.history_size)):
+            score = rng.randint(1, 10)
+            batch.append((template.model_copy(update={
+                "components": [
+                    component.model_copy(update={"material": rng.choice(materials)})
+                    for component in template.components
+                ],
+                "final_evaluation": template.final_evaluation.model_copy(
+                    update={"feasibility_score": score, "go_decision": score > 6}
+                ),
+                "reused_from": None,
+            }), None))
+        history.add_many(batch)
+    insert_wall = time.perf_counter() - start
+
+    ids = [record["id"] for record in history.query(limit=100)]
+    queries = {
+        "query_score": lambda i: history.query(HistoryFilter(min_score=8, go_decision=True)),
+        "query_material": lambda i: history.query(HistoryFilter(material="ldpe")),
+        "summary": lambda i: history.summary(HistoryFilter(material="pet", min_score=5)),
+        "get": lambda i: history.get(ids[i % len(ids)]),
+    }
+    details = {}
+    for name, operation in queries.items():
+        latencies, wall = time_sync(operation, args.iterations)
+        details[name] = summarize(latencies, wall)
+
+    # Top-level figures are for a full JSONL export
+    latencies, wall = time_sync(lambda i: sum(len(chunk) for chunk in history.export_jsonl()), 3)
+    summary = summarize(latencies, wall)
+    summary["stored_evaluations"] = args.history_size
+    summary["insert_per_s"] = round(args.history_size / insert_wall) if insert_wall > 0 else 0
+    summary["export_rows_per_s"] = round(3 * args.history_size / wall) if wall > 0 else 0
+    summary["operations"] = details
+    history.close()
+    return summary
+
+
+async def bench_cold_start(args) -> Dict[str, Any]:
+    """Import time and time to first response of the API, each sample in a fresh interpreter."""
+    samples = []
+    start = time.perf_counter()
+    for _ in range(args.cold_starts):
+        result = await asyncio.to_thread(
+            subprocess.run,
+            [sys.executable, "-m", "benchmarks.cold_start"],
+            capture_output=True, text=True, check=True,
+            env={**os.environ, "PYTHONPATH": str(Path(__file__).resolve().parent.parent)}
+        )
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    wall = time.perf_counter() - start
+
+    # Top-level figures are for the time to the first response, as seen by a load balancer
+    summary = summarize([sample["first_response_s"] for sample in samples], wall)
+    summary["phases"] = {
+        phase: summarize([sample[phase] for sample in samples], wall)
+        for phase in ("import_s", "ready_s", "first_evaluation_s")
+    }
+    return summary
+
+
+BENCHMARKS = {
+    "pipeline": bench_pipeline,
+    "api": bench_api,
+    "state": bench_state,
+    "serialization": bench_serialization,
+    "chunking": bench_chunking,
+    "ingestion": bench_ingestion,
+    "library": bench_library,
+    "catalog": bench_catalog,
+    "search": bench_search,
+    "hybrid": bench_hybrid,
+    "search_cache": bench_search_cache,
+    "quantization": bench_quantization,
+    "ann": bench_ann,
+    "history": bench_history,
+    "cold_start": bench_cold_start,
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", default="all", help=f"Comma-separated subset of {', '.join(SUITES)} or 'all'")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per fake model call")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="Extra random seconds per fake model call")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Seconds per fake embedding call")
+    parser.add_argument("--iterate-reflection", action="store_true",
+                        help="Let reflection request iterations (worst-case three rounds)")
+    parser.add_argument("--cascade", action="store_true", help="Enable the model cascade (CASCADE_CONFIG)")
+    parser.add_argument("--pipelined", action="store_true", help="Pipeline the operations sub-analyses (AGENT_CONFIG)")
+    parser.add_argument("--reflection-gate", action="store_true", help="Enable the reflection gate (REFLECTION_GATE_CONFIG)")
+    parser.add_argument("--cassette", help="Replay model responses from a recorded cassette instead of the fake model")
+    parser.add_argument("--cassette-latency-scale", type=float, default=1.0,
+                        help="Multiplier for replayed latencies (0 disables sleeping)")
+    parser.add_argument("--images", type=int, default=1, help="Images per concept")
+    parser.add_argument("--image-kb", type=int, default=256, help="Approximate size of each image")
+    parser.add_argument("--list-length", type=int, default=8, help="List length in the synthetic state")
+    parser.add_argument("--document-words", type=int, default=20000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--library-files", type=int, default=50, help="Files ingested by the library suite")
+    parser.add_argument("--catalog-size", type=int, default=1000, help="Specs imported by the catalog suite")
+    parser.add_argument("--corpus-size", type=int, default=1000, help="Chunks searched by the hybrid, search_cache and quantization suites")
+    parser.add_argument("--recall-queries", type=int, default=20, help="Queries measured by the hybrid and quantization suites")
+    parser.add_argument("--cache-queries", type=int, default=50, help="Distinct queries of the search_cache suite")
+    parser.add_argument("--cache-write-every", type=int, default=100,
+                        help="Searches between writes that invalidate the cache in the search_cache suite")
+    parser.add_argument("--database-url", help="Postgres database with pgvector, for the ann suite")
+    parser.add_argument("--ann-sizes", default="100000,1000000,5000000", help="Vector counts measured by the ann suite")
+    parser.add_argument("--ef-search", default="40,100,200", help="HNSW ef_search values measured by the ann suite")
+    parser.add_argument("--hnsw-m", type=int, default=16)
+    parser.add_argument("--hnsw-ef-construction", type=int, default=64)
+    parser.add_argument("--history-size", type=int, default=20000, help="Evaluations stored by the history suite")
+    parser.add_argument("--cold-starts", type=int, default=5, help="API processes started by the cold_start suite")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative p95 regression")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None) -> int:
+    args = parse_args(argv)
+    suites = SUITES if args.suites == "all" else [s.strip() for s in args.suites.split(",")]
+
+    # Keyword indexes and search caches of the benchmark stores stay in memory
+    from src.packaging_evaluation.configuration import HYBRID_SEARCH_CONFIG, SEARCH_CACHE_CONFIG
+
+    HYBRID_SEARCH_CONFIG["path"] = None
+    SEARCH_CACHE_CONFIG["path"] = None
+
+    results = {
+        "environment": environment_info(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "database_url")},
+        "suites": {}
+    }
+    for name in suites:
+        if name not in BENCHMARKS:
+            raise SystemExit(f"Unknown suite: {name}")
+        print(f"Running {name}...", file=sys.stderr)
+        results["suites"][name] = await BENCHMARKS[name](args)
+        summary = results["suites"][name]
+        print(
+            f"  {name}: p50={summary.get('p50_ms', 0):.2f}ms p95={summary.get('p95_ms', 0):.2f}ms "
+            f"p99={summary.get('p99_ms', 0):.2f}ms throughput={summary.get('throughput_per_s', '-')}/s "
+            f"errors={summary.get('errors', 0)}",
+            file=sys.stderr
+        )
+
+    save_results(results, args.output)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
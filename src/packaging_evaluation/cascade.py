@@ -0,0 +1,83 @@
+"""Model cascade: try a smaller model first and escalate to the larger one when needed."""
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel, Field, create_model
+
+# Reasons for escalating to the larger model
+ERROR = "error"
+LOW_CONFIDENCE = "low_confidence"
+VALIDATION = "validation"
+
+
+class CascadeStats:
+    """Per-node counts of cascaded calls and of escalations by reason."""
+
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self.escalations: Dict[str, Counter] = {}
+
+    def record(self, node: str, reason: Optional[str]):
+        self.calls[node] += 1
+        if reason is not None:
+            self.escalations.setdefault(node, Counter())[reason] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        stats = {}
+        for node, calls in self.calls.items():
+            reasons = self.escalations.get(node, Counter())
+            escalated = sum(reasons.values())
+            stats[node] = {
+                "calls": calls,
+                "escalations": escalated,
+                "escalation_rate": round(escalated / calls, 4),
+                "reasons": dict(reasons),
+            }
+        return stats
+
+
+cascade_stats = CascadeStats()
+
+
+@lru_cache(maxsize=None)
+def with_confidence(schema: Type[BaseModel]) -> Type[BaseModel]:
+    """The schema extended with a self-reported confidence field."""
+    return create_model(
+        f"{schema.__name__}WithConfidence",
+        __base__=schema,
+        confidence=(float, Field(description="Your confidence that this answer is complete and correct (0.0-1.0)"))
+    )
+
+
+async def cascade_invoke(
+    node: str,
+    schema: Type[BaseModel],
+    messages: List[Any],
+    small: Any,
+    large: Any,
+    min_confidence: float,
+    validate: Optional[Callable[[BaseModel], Optional[str]]] = None,
+    stats: CascadeStats = cascade_stats
+) -> BaseModel:
+    """Structured call that only uses the large model if the small one falls short.
+
+    The small model's answer is escalated when it fails to parse, reports a
+    confidence below `min_confidence`, or `validate` returns a problem.
+    """
+    reason = None
+    try:
+        answer = await small.with_structured_output(with_confidence(schema)).ainvoke(messages)
+    except Exception:
+        reason = ERROR
+    else:
+        result = schema.model_validate(answer.model_dump(exclude={"confidence"}))
+        if not 0.0 <= answer.confidence <= 1.0 or answer.confidence < min_confidence:
+            reason = LOW_CONFIDENCE
+        elif validate is not None and validate(result):
+            reason = VALIDATION
+
+    stats.record(node, reason)
+    if reason is None:
+        return result
+    return await large.with_structured_output(schema).ainvoke(messages)
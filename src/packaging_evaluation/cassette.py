@@ -0,0 +1,287 @@
+"""Record/replay transport for chat model and embedding calls.
+
+In record mode every structured chat call made by the nodes in `tools.py` and
+every embedding call made by `VectorStoreClient` is appended, with its
+timing, to a JSONL cassette. In replay mode the cassette is served by local
+stand-ins that sleep for the recorded (optionally scaled) latency, so load
+tests run against identical model behavior without calling OpenAI.
+
+Configured through environment variables:
+
+- `LLM_CASSETTE_MODE`: `off` (default), `record` or `replay`
+- `LLM_CASSETTE_PATH`: cassette file to record into, or a file or directory
+  of `*.jsonl` cassettes to replay (default `cassettes/cassette.jsonl`)
+- `LLM_CASSETTE_LATENCY_SCALE`: multiplier for replayed latencies
+  (default 1.0, 0 disables sleeping)
+- `LLM_CASSETTE_STRICT`: when `true`, replaying a request that was never
+  recorded raises instead of falling back to another recording of the same
+  schema
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Type
+
+from pydantic import BaseModel
+
+DEFAULT_CASSETTE_PATH = "cassettes/cassette.jsonl"
+
+
+def request_key(kind: str, name: str, payload: Any) -> str:
+    """Stable digest identifying a request."""
+    encoded = json.dumps({"kind": kind, "name": name, "payload": payload}, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CassetteMiss(LookupError):
+    """Raised in strict replay mode for a request missing from the cassette."""
+
+
+class CassetteWriter:
+    """Appends recorded interactions to a JSONL file."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, name: str, payload: Any, response: Any, latency: float) -> None:
+        """Append a single interaction."""
+        line = json.dumps({
+            "kind": kind,
+            "name": name,
+            "key": request_key(kind, name, payload),
+            "request": payload,
+            "response": response,
+            "latency": round(latency, 6),
+            "recorded_at": datetime.utcnow().isoformat()
+        }, default=str)
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class Cassette:
+    """Recorded interactions loaded for replay."""
+
+    def __init__(self, path: str, latency_scale: float = 1.0, strict: bool = False):
+        self.latency_scale = latency_scale
+        self.strict = strict
+        self.hits = 0
+        self.misses = 0
+        self._by_key: Dict[str, Iterator[dict]] = {}
+        self._by_name: Dict[str, Iterator[dict]] = {}
+
+        by_key: Dict[str, List[dict]] = defaultdict(list)
+        by_name: Dict[str, List[dict]] = defaultdict(list)
+        for entry in self._read(Path(path)):
+            by_key[entry["key"]].append(entry)
+            by_name[f"{entry['kind']}:{entry['name']}"].append(entry)
+        # Repeated identical requests cycle through every recorded response
+        self._by_key = {key: itertools.cycle(entries) for key, entries in by_key.items()}
+        self._by_name = {name: itertools.cycle(entries) for name, entries in by_name.items()}
+        self.size = sum(len(entries) for entries in by_key.values())
+
+    @staticmethod
+    def _read(path: Path) -> Iterator[dict]:
+        files = sorted(path.glob("*.jsonl")) if path.is_dir() else [path]
+        for file in files:
+            with file.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def lookup(self, kind: str, name: str, payload: Any) -> dict:
+        """Find the recording for a request, falling back to any recording of the same schema."""
+        entries = self._by_key.get(request_key(kind, name, payload))
+        if entries is not None:
+            self.hits += 1
+            return next(entries)
+        self.misses += 1
+        entries = self._by_name.get(f"{kind}:{name}")
+        if self.strict or entries is None:
+            raise CassetteMiss(f"No recorded {kind} response for {name}")
+        return next(entries)
+
+    async def wait(self, entry: dict) -> None:
+        """Sleep for the recorded latency, scaled."""
+        delay = entry["latency"] * self.latency_scale
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class RecordingStructuredModel:
+    """Wraps a structured-output runnable and records each call."""
+
+    def __init__(self, runnable: Any, schema: Type[BaseModel], writer: CassetteWriter):
+        self.runnable = runnable
+        self.schema = schema
+        self.writer = writer
+
+    async def ainvoke(self, messages: Any, *args, **kwargs) -> BaseModel:
+        start = time.perf_counter()
+        result = await self.runnable.ainvoke(messages, *args, **kwargs)
+        self.writer.record("chat", self.schema.__name__, messages, result.model_dump(), time.perf_counter() - start)
+        return result
+
+
+class RecordingChatModel:
+    """Wraps a chat model so structured calls are written to a cassette."""
+
+    def __init__(self, model: Any, writer: CassetteWriter):
+        self.model = model
+        self.writer = writer
+
+    def with_structured_output(self, schema: Type[BaseModel], **kwargs) -> RecordingStructuredModel:
+        return RecordingStructuredModel(self.model.with_structured_output(schema, **kwargs), schema, self.writer)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.model, name)
+
+
+class ReplayStructuredModel:
+    """Serves structured responses for one schema from a cassette."""
+
+    def __init__(self, cassette: Cassette, schema: Type[BaseModel]):
+        self.cassette = cassette
+        self.schema = schema
+
+    async def ainvoke(self, messages: Any, *args, **kwargs) -> BaseModel:
+        entry = self.cassette.lookup("chat", self.schema.__name__, messages)
+        await self.cassette.wait(entry)
+        return self.schema.model_validate(entry["response"])
+
+
+class ReplayChatModel:
+    """Local stand-in for `ChatOpenAI` backed by a cassette."""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+
+    def with_structured_output(self, schema: Type[BaseModel], **kwargs) -> ReplayStructuredModel:
+        return ReplayStructuredModel(self.cassette, schema)
+
+
+class RecordingEmbeddings:
+    """Wraps an embeddings client so every call is written to a cassette."""
+
+    def __init__(self, embeddings: Any, writer: CassetteWriter):
+        self.embeddings = embeddings
+        self.writer = writer
+
+    def embed_query(self, text: str) -> List[float]:
+        start = time.perf_counter()
+        vector = self.embeddings.embed_query(text)
+        self.writer.record("embedding", "query", text, vector, time.perf_counter() - start)
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        vectors = self.embeddings.embed_documents(texts)
+        self.writer.record("embedding", "documents", texts, vectors, time.perf_counter() - start)
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        start = time.perf_counter()
+        vector = await self.embeddings.aembed_query(text)
+        self.writer.record("embedding", "query", text, vector, time.perf_counter() - start)
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        vectors = await self.embeddings.aembed_documents(texts)
+        self.writer.record("embedding", "documents", texts, vectors, time.perf_counter() - start)
+        return vectors
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.embeddings, name)
+
+
+class ReplayEmbeddings:
+    """Local stand-in for `OpenAIEmbeddings` backed by a cassette."""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.cassette.lookup("embedding", "query", text)["response"]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        try:
+            return self.cassette.lookup("embedding", "documents", texts)["response"]
+        except CassetteMiss:
+            return [self.embed_query(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        entry = self.cassette.lookup("embedding", "query", text)
+        await self.cassette.wait(entry)
+        return entry["response"]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        try:
+            entry = self.cassette.lookup("embedding", "documents", texts)
+        except CassetteMiss:
+            return [await self.aembed_query(text) for text in texts]
+        await self.cassette.wait(entry)
+        return entry["response"]
+
+
+def cassette_mode() -> str:
+    """The configured cassette mode: off, record or replay."""
+    mode = os.getenv("LLM_CASSETTE_MODE", "off").lower()
+    if mode not in ("off", "record", "replay"):
+        raise ValueError(f"LLM_CASSETTE_MODE must be off, record or replay, got {mode!r}")
+    return mode
+
+
+_writers: Dict[str, CassetteWriter] = {}
+_cassettes: Dict[str, Cassette] = {}
+
+
+def _writer() -> CassetteWriter:
+    path = os.getenv("LLM_CASSETTE_PATH", DEFAULT_CASSETTE_PATH)
+    if path not in _writers:
+        _writers[path] = CassetteWriter(path)
+    return _writers[path]
+
+
+def _cassette() -> Cassette:
+    path = os.getenv("LLM_CASSETTE_PATH", DEFAULT_CASSETTE_PATH)
+    if path not in _cassettes:
+        _cassettes[path] = Cassette(
+            path,
+            latency_scale=float(os.getenv("LLM_CASSETTE_LATENCY_SCALE", "1.0")),
+            strict=os.getenv("LLM_CASSETTE_STRICT", "false").lower() == "true"
+        )
+    return _cassettes[path]
+
+
+def wrap_chat_model(factory: Callable[[], Any]) -> Any:
+    """Build the chat model, recording or replaying it according to the environment.
+
+    `factory` is only called when a real model is needed, so replay mode
+    works without OpenAI credentials.
+    """
+    mode = cassette_mode()
+    if mode == "replay":
+        return ReplayChatModel(_cassette())
+    if mode == "record":
+        return RecordingChatModel(factory(), _writer())
+    return factory()
+
+
+def wrap_embeddings(factory: Callable[[], Any]) -> Any:
+    """Build the embeddings client, recording or replaying it according to the environment."""
+    mode = cassette_mode()
+    if mode == "replay":
+        return ReplayEmbeddings(_cassette())
+    if mode == "record":
+        return RecordingEmbeddings(factory(), _writer())
+    return factory()
@@ -0,0 +1,106 @@
+"""Memoized component-level technical assessments, shared across evaluations."""
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.packaging_evaluation.state import Component, ComponentAssessment
+
+
+def _normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^\w\s%.-]", " ", text.lower()).split())
+
+
+def component_signature(component: Component) -> str:
+    """Stable signature of a component's name, material, function and requirements."""
+    key = {
+        "name": _normalize(component.name),
+        "material": _normalize(component.material),
+        "function": _normalize(component.function),
+        "requirements": sorted(_normalize(requirement) for requirement in component.requirements),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ComponentAssessmentStore:
+    """Component assessments keyed by component signature, optionally persisted to JSONL.
+
+    Assessments older than `max_age` seconds (if set) expire and are redone.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age: Optional[float] = None):
+        self.path = Path(path) if path else None
+        self.max_age = max_age
+        # Signature -> (assessment, time stored)
+        self.assessments: Dict[str, Tuple[ComponentAssessment, float]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        if self.path and self.path.exists():
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.assessments[record["signature"]] = (
+                            ComponentAssessment(**record["assessment"]),
+                            record["stored_at"]
+                        )
+
+    def get(self, component: Component) -> Optional[ComponentAssessment]:
+        """The stored assessment for a component, renamed to the component's name."""
+        signature = component_signature(component)
+        stored = self.assessments.get(signature)
+        if stored is not None and self.max_age is not None and time.time() - stored[1] > self.max_age:
+            del self.assessments[signature]
+            self.expired += 1
+            stored = None
+        if stored is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return stored[0].model_copy(update={"component_name": component.name})
+
+    def put(self, component: Component, assessment: ComponentAssessment):
+        """Store the assessment of a component, replacing any earlier one."""
+        signature = component_signature(component)
+        stored_at = time.time()
+        self.assessments[signature] = (assessment, stored_at)
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps({
+                    "signature": signature,
+                    "assessment": assessment.model_dump(),
+                    "stored_at": stored_at
+                }) + "\n")
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.assessments),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def match_assessments(
+    components: List[Component],
+    assessments: List[ComponentAssessment]
+) -> Dict[int, ComponentAssessment]:
+    """Pair components (by index) with the model's assessments of the same name.
+
+    Components the model renamed are left unpaired: they are not stored, and
+    assessed again by the next evaluation, rather than risk storing another
+    component's assessment under their signature.
+    """
+    by_name = {_normalize(a.component_name): a for a in assessments}
+    return {
+        i: by_name[_normalize(component.name)]
+        for i, component in enumerate(components)
+        if _normalize(component.name) in by_name
+    }
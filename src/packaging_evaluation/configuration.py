@@ -1,4 +1,8 @@
 """Configuration for the packaging evaluation system."""
+import os
+
+# Directory of the local SQLite files below, relative to the working directory unless absolute
+DATA_DIR = os.environ.get("PACKAGING_DATA_DIR", "data")
 
 # Agent configuration
 AGENT_CONFIG = {
@@ -8,7 +12,8 @@ AGENT_CONFIG = {
     },
     "concept_breaker": {
         "model": "gpt-4o",
-        "temperature": 0.2
+        "temperature": 0.2,
+        "cascade": {"min_confidence": 0.7}
     },
     "technical_feasibility": {
         "model": "gpt-4o",
@@ -18,16 +23,26 @@ AGENT_CONFIG = {
     "operations": {
         "model": "gpt-4o",
         "temperature": 0.2,
-        "use_rag": True
+        "use_rag": True,
+        "cascade": {"min_confidence": 0.7},
+        # Run the component-only sub-analyses concurrently with technical_feasibility
+        # and merge them with the technical results without another model call.
+        # Opt-in: lower latency for three extra model calls per evaluation
+        "pipelined": False
     },
     "reflection": {
         "model": "gpt-4o",
-        "temperature": 0.2
+        "temperature": 0.2,
+        "cascade": {"min_confidence": 0.7}
     },
     "final_score": {
         "model": "gpt-4o",
         "temperature": 0.2
     },
+    "triage": {
+        "model": "gpt-4o",
+        "temperature": 0.2
+    },
     "human_feedback": {
         "model": "gpt-4o",
         "temperature": 0.1
@@ -43,3 +58,119 @@ GRAPH_CONFIG = {
     "max_iterations": 10,
     "timeout": 300  # seconds
 }
+
+# Index of completed evaluations, used to reuse results for near-duplicate concepts
+EVALUATION_INDEX_CONFIG = {
+    "enabled": False,
+    "path": None,  # JSONL file to persist the index to; in-memory only if None
+    "similarity_threshold": 0.95,  # cosine similarity of the concept text embeddings
+    "default_mode": "off"  # "off", "reuse" (return the prior evaluation) or "seed" (reuse its components)
+}
+
+# Memoized component-level technical assessments, keyed by component signature
+COMPONENT_STORE_CONFIG = {
+    "enabled": True,
+    "path": None,  # JSONL file to persist assessments to; in-memory only if None
+    "max_age": 7 * 24 * 3600  # seconds before a stored assessment expires and is redone; never if None
+}
+
+# Admission control for /evaluate
+SCHEDULER_CONFIG = {
+    "max_concurrent": 16,  # evaluations running at once, across all clients
+    "reserved_interactive": 4,  # slots batch traffic can never take
+    "per_client_limit": 4,  # evaluations running at once per client
+    "max_queue": 64,  # waiting evaluations before requests are shed with 429
+    "default_priority": "interactive"  # "interactive" or "batch"
+}
+
+# Single-call triage evaluations, used to screen large concept backlogs
+TRIAGE_CONFIG = {
+    "escalate_scores": [4, 6],  # borderline scores (inclusive) that always get a full evaluation
+    "min_confidence": 0.6,  # escalate less confident triage results
+    "concurrency": 16  # concurrent evaluations in batch triage
+}
+
+# Model cascade for the nodes with a "cascade" policy in AGENT_CONFIG: the small
+# model answers first and the node's model is only called when it falls short.
+# Opt-in, as it changes which model writes the accepted answers
+CASCADE_CONFIG = {
+    "enabled": False,
+    "small_model": "gpt-4o-mini",
+    "temperature": 0.2
+}
+
+# Deterministic pre-check that skips the reflection model call for consistent,
+# unambiguous assessments. Opt-in, as skipped reviews can miss blind spots
+REFLECTION_GATE_CONFIG = {
+    "enabled": False,
+    "require_agreement": True,  # technical and operational overall_feasible must agree
+    "min_technical_score": 0.8,  # every component's technical_score must reach this
+    "max_challenges": 0,  # most technical challenges listed across all components
+    "max_production_changes": 2  # most production changes in the operational assessment
+}
+
+# Background work at API startup: create the model clients, import langchain and
+# open connections before traffic arrives; /ready reports when it is done
+WARMUP_CONFIG = {
+    "enabled": True,
+    "open_connections": True,  # list models to open connections to the model API ahead of the first call
+    "connections": 4,  # connections opened per model API client
+    "timeout": 30.0  # seconds per warmup step
+}
+
+# Indexed store of completed evaluations, queried through /evaluations
+HISTORY_CONFIG = {
+    "enabled": True,
+    "path": os.path.join(DATA_DIR, "evaluation_history.db"),  # SQLite file; in-memory only if None
+    "export_batch_size": 1000  # rows read and written per export batch
+}
+
+# Embedding model and storage in the knowledge base (see vector_store/quantization.py);
+# shortened dimensions need a text-embedding-3 model and compact storage migration 002
+EMBEDDING_CONFIG = {
+    "model": "text-embedding-ada-002",
+    "dimensions": None,  # shorten embeddings to this many dimensions; None keeps the model's
+    "storage": "float32",  # "float32" (vector), "float16" (halfvec) or "binary" (bit)
+    "rescore": True,  # keep full-precision vectors and rescore the compact search's candidates
+    "rescore_candidates": 4  # candidates ranked on compact vectors per result
+}
+
+# Approximate nearest-neighbour search on the HNSW indexes of migration 003
+ANN_CONFIG = {
+    # Candidates kept per search: higher is slower with better recall. Needs migration 003;
+    # if None it is not sent and the database default applies (40 after migration 003)
+    "ef_search": None
+}
+
+# Local keyword (BM25) index kept alongside the vector store, and hybrid /search
+HYBRID_SEARCH_CONFIG = {
+    "keyword_index": True,  # index entries locally as they are written
+    "path": os.path.join(DATA_DIR, "keyword_index.db"),  # SQLite file; in-memory only if None
+    "default_mode": "hybrid",  # /search mode: "vector", "keyword" or "hybrid"; "vector" until the index is built
+    "build_on_start": True,  # rebuild the index from the knowledge base when the API starts with an unbuilt one
+    "candidates": 20,  # results taken from each retriever before fusion
+    "rrf_k": 60  # reciprocal rank fusion constant: higher values flatten the rank weights
+}
+
+# Cache of /search results (vector_store/search_cache.py)
+SEARCH_CACHE_CONFIG = {
+    "enabled": True,
+    "max_entries": 1024,  # searches whose results are kept, least recently used evicted first
+    "path": os.path.join(DATA_DIR, "search_cache.db")  # SQLite file sharing results and the knowledge base version between processes; in-process only if None
+}
+
+# Bulk import of machine, material and process specs (vector_store/catalog.py)
+CATALOG_IMPORT_CONFIG = {
+    "batch_size": 100,  # specs embedded in one call and upserted in one request
+    "concurrency": 4  # batches in flight at once
+}
+
+# Bulk ingestion of a document library (vector_store/ingest.py)
+INGEST_CONFIG = {
+    "manifest": "ingest_manifest.jsonl",  # ingested files by content hash, for resuming
+    "parse_workers": 4,  # processes parsing and chunking files
+    "embed_batch_size": 256,  # chunks per embedding call
+    "embed_concurrency": 4,  # embedding calls in flight at once
+    "write_batch_size": 500,  # chunks per upsert request
+    "progress_interval": 5.0  # seconds between progress reports
+}
@@ -0,0 +1,161 @@
+"""Index of completed evaluations for reusing results on near-duplicate concepts."""
+import hashlib
+import math
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from src.packaging_evaluation.cassette import wrap_embeddings
+from src.packaging_evaluation.state import (
+    PackagingEvaluationState,
+    Component,
+    TechnicalAssessment,
+    OperationalAssessment,
+    ReflectionNotes,
+    FinalEvaluation
+)
+
+# Near-duplicate handling modes
+OFF = "off"
+REUSE = "reuse"
+SEED = "seed"
+MODES = (OFF, REUSE, SEED)
+
+
+def image_digest(image: str) -> str:
+    """Digest of a concept image (URL or base64 data URI)."""
+    return hashlib.sha256(image.encode("utf-8")).hexdigest()
+
+
+class IndexedEvaluation(BaseModel):
+    """A completed evaluation stored in the index."""
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    packaging_concept: str
+    image_digests: List[str] = Field(default_factory=list)
+    embedding: List[float]
+    components: List[Component]
+    technical_assessment: Optional[TechnicalAssessment] = None
+    operational_assessment: Optional[OperationalAssessment] = None
+    reflection_notes: Optional[ReflectionNotes] = None
+    final_evaluation: FinalEvaluation
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+def _norm(vector: List[float]) -> float:
+    return math.sqrt(sum(v * v for v in vector)) or 1.0
+
+
+class EvaluationIndex:
+    """Completed evaluations indexed by concept embedding and image digests.
+
+    A submission matches a prior evaluation when its images are exactly the
+    same set and its concept text embedding is at least `threshold` cosine
+    similar, which catches rewordings of the same concept.
+    """
+
+    def __init__(self, path: Optional[str] = None, embeddings: Optional[Any] = None):
+        self.path = Path(path) if path else None
+        self._embeddings = embeddings
+        self.entries: List[IndexedEvaluation] = []
+        self._norms: List[float] = []
+        if self.path and self.path.exists():
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._append(IndexedEvaluation.model_validate_json(line))
+
+    @property
+    def embeddings(self) -> Any:
+        if self._embeddings is None:
+            from langchain_openai import OpenAIEmbeddings
+
+            self._embeddings = wrap_embeddings(OpenAIEmbeddings)
+        return self._embeddings
+
+    def _append(self, entry: IndexedEvaluation):
+        self.entries.append(entry)
+        self._norms.append(_norm(entry.embedding))
+
+    async def find_similar(
+        self,
+        packaging_concept: str,
+        concept_images: List[str],
+        threshold: float
+    ) -> Optional[Tuple[IndexedEvaluation, float]]:
+        """The most similar prior evaluation above the threshold, with its similarity."""
+        digests = sorted(image_digest(image) for image in concept_images)
+        candidates = [i for i, entry in enumerate(self.entries) if entry.image_digests == digests]
+        if not candidates:
+            return None
+
+        query = await self.embeddings.aembed_query(packaging_concept)
+        query_norm = _norm(query)
+        best, best_similarity = None, threshold
+        for i in candidates:
+            entry = self.entries[i]
+            similarity = sum(a * b for a, b in zip(query, entry.embedding)) / (query_norm * self._norms[i])
+            if similarity >= best_similarity:
+                best, best_similarity = entry, similarity
+        return (best, best_similarity) if best is not None else None
+
+    async def add(self, state: PackagingEvaluationState) -> IndexedEvaluation:
+        """Index a completed evaluation."""
+        if state.final_evaluation is None:
+            raise ValueError("Only completed evaluations can be indexed")
+        entry = IndexedEvaluation(
+            packaging_concept=state.packaging_concept,
+            image_digests=sorted(image_digest(image) for image in state.concept_images),
+            embedding=await self.embeddings.aembed_query(state.packaging_concept),
+            components=state.components,
+            technical_assessment=state.technical_assessment,
+            operational_assessment=state.operational_assessment,
+            reflection_notes=state.reflection_notes,
+            final_evaluation=state.final_evaluation
+        )
+        self._append(entry)
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(entry.model_dump_json() + "\n")
+        return entry
+
+
+def apply_prior_evaluation(
+    state: PackagingEvaluationState,
+    prior: IndexedEvaluation,
+    similarity: float,
+    mode: str
+) -> PackagingEvaluationState:
+    """Short-circuit the pipeline with a prior evaluation of a near-identical concept.
+
+    `reuse` completes the state with the prior results; `seed` only takes its
+    components, skipping image analysis and concept breakdown so the run
+    continues at human feedback.
+    """
+    state.components = [component.model_copy() for component in prior.components]
+
+    if mode == REUSE:
+        state.reused_from = prior.id
+        state.technical_assessment = prior.technical_assessment
+        state.operational_assessment = prior.operational_assessment
+        state.reflection_notes = prior.reflection_notes
+        state.final_evaluation = prior.final_evaluation
+        state.evaluation_score = prior.final_evaluation.feasibility_score
+        state.final_recommendation = prior.final_evaluation.executive_summary
+        state.process_complete = True
+        state.current_node = "final_score"
+        state.add_message("evaluation_index",
+                         f"Reused the evaluation of a near-identical concept (similarity {similarity:.3f}). "
+                         f"Score: {prior.final_evaluation.feasibility_score}/10. "
+                         f"Go decision: {prior.final_evaluation.go_decision}")
+    elif mode == SEED:
+        state.add_message("evaluation_index",
+                         f"Seeded {len(state.components)} components from evaluation {prior.id} of a "
+                         f"near-identical concept (similarity {similarity:.3f}); skipping concept breakdown.")
+        state.current_node = "human_feedback"
+    else:
+        raise ValueError(f"Unknown near-duplicate mode: {mode}")
+    return state
@@ -12,7 +12,9 @@ from src.packaging_evaluation.tools import (
     final_score
 )
 
-# Initialize the graph
+# Initialize the graph. Nodes return only the fields they changed; the
+# reducers annotated on the state (appending messages, keeping assessments)
+# become the channel reducers that merge them
 graph = StateGraph(PackagingEvaluationState)
 
 # Add all nodes
@@ -0,0 +1,401 @@
+"""Indexed history of completed evaluations, for queries and bulk export.
+
+Evaluations are stored in SQLite, with the fields used for portfolio
+analytics (score, go decision, date, component materials) in indexed
+columns and the full state as JSON. Exports stream rows in batches to JSONL
+or, when `pyarrow` is installed, Parquet:
+
+    python -m src.packaging_evaluation.history export evaluations.parquet \\
+        --format parquet --min-score 7 --material pet
+    python -m src.packaging_evaluation.history summary --since 2025-01-01
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from src.packaging_evaluation.configuration import HISTORY_CONFIG
+from src.packaging_evaluation.serialization import SERIALIZERS, dump_model, load_model
+from src.packaging_evaluation.state import PackagingEvaluationState
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Evaluation modes, as recorded in the `mode` column
+FULL = "full"
+TRIAGE = "triage"
+REUSED = "reused"
+
+# Export formats
+JSONL = "jsonl"
+PARQUET = "parquet"
+EXPORT_FORMATS = (JSONL, PARQUET)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    id TEXT PRIMARY KEY,
+    run_id TEXT,
+    created_at TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    packaging_concept TEXT NOT NULL,
+    feasibility_score INTEGER,
+    go_decision INTEGER,
+    technical_feasible INTEGER,
+    operational_feasible INTEGER,
+    escalate INTEGER NOT NULL,
+    reused_from TEXT,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS components (
+    evaluation_id TEXT NOT NULL REFERENCES evaluations(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    material TEXT NOT NULL,
+    material_key TEXT NOT NULL,
+    PRIMARY KEY (evaluation_id, position)
+);
+CREATE INDEX IF NOT EXISTS evaluations_score ON evaluations (feasibility_score);
+CREATE INDEX IF NOT EXISTS evaluations_go_decision ON evaluations (go_decision);
+CREATE INDEX IF NOT EXISTS evaluations_created_at ON evaluations (created_at);
+CREATE INDEX IF NOT EXISTS components_material ON components (material_key);
+"""
+
+# Summary columns returned by queries and exports, in order
+COLUMNS = (
+    "id", "run_id", "created_at", "mode", "packaging_concept", "feasibility_score", "go_decision",
+    "technical_feasible", "operational_feasible", "escalate", "reused_from"
+)
+BOOLEAN_COLUMNS = ("go_decision", "technical_feasible", "operational_feasible", "escalate")
+
+# States are stored as JSON text, readable by SQLite's JSON functions and exports
+STATE_SERIALIZER = SERIALIZERS.get("orjson", SERIALIZERS["json"])
+
+# Separates materials aggregated by group_concat; cannot appear in model output
+MATERIAL_SEPARATOR = "\x1f"
+
+
+def material_key(material: str) -> str:
+    """Case-insensitive key of a component material, used for material queries."""
+    return " ".join(material.lower().split())
+
+
+class HistoryFilter(BaseModel):
+    """Filters for evaluation history queries; all given filters must match."""
+    min_score: Optional[int] = Field(default=None, description="Lowest feasibility score (1-10)")
+    max_score: Optional[int] = Field(default=None, description="Highest feasibility score (1-10)")
+    go_decision: Optional[bool] = None
+    since: Optional[datetime] = Field(default=None, description="Evaluated at or after this time (UTC)")
+    until: Optional[datetime] = Field(default=None, description="Evaluated before this time (UTC)")
+    material: Optional[str] = Field(default=None, description="A component material starting with this (case-insensitive)")
+    mode: Optional[str] = Field(default=None, description="full, triage or reused")
+
+
+def _timestamp(value: datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="seconds")
+
+
+def _where(filters: HistoryFilter) -> Tuple[str, List[Any]]:
+    """SQL condition and parameters for the filters, over `evaluations e`."""
+    conditions, params = [], []
+    if filters.min_score is not None:
+        conditions.append("e.feasibility_score >= ?")
+        params.append(filters.min_score)
+    if filters.max_score is not None:
+        conditions.append("e.feasibility_score <= ?")
+        params.append(filters.max_score)
+    if filters.go_decision is not None:
+        conditions.append("e.go_decision = ?")
+        params.append(int(filters.go_decision))
+    if filters.since is not None:
+        conditions.append("e.created_at >= ?")
+        params.append(_timestamp(filters.since))
+    if filters.until is not None:
+        conditions.append("e.created_at < ?")
+        params.append(_timestamp(filters.until))
+    if filters.material:
+        # A range over the material index matches every key with the prefix
+        prefix = material_key(filters.material)
+        conditions.append(
+            "e.id IN (SELECT evaluation_id FROM components WHERE material_key >= ? AND material_key < ?)"
+        )
+        params.extend([prefix, prefix + "\uffff"])
+    if filters.mode is not None:
+        conditions.append("e.mode = ?")
+        params.append(filters.mode)
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+
+def _row(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    """Summary dict of a query row: the summary columns followed by the aggregated materials."""
+    record = dict(zip(COLUMNS, row))
+    for column in BOOLEAN_COLUMNS:
+        if record[column] is not None:
+            record[column] = bool(record[column])
+    materials = row[len(COLUMNS)]
+    record["materials"] = materials.split(MATERIAL_SEPARATOR) if materials else []
+    return record
+
+
+class EvaluationHistory:
+    """Completed evaluations in SQLite, in memory only if `path` is None.
+
+    Writes go through one connection guarded by a lock; exports open their
+    own connection so a long export does not hold up new evaluations.
+    Methods are blocking: call them from a thread in async code.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # A named shared-cache database lets exports open a second connection to memory
+        self._uri = f"file:{path}" if path else f"file:history-{uuid.uuid4().hex}?mode=memory&cache=shared"
+        self._lock = threading.Lock()
+        self._connection = self._connect()
+        with self._lock:
+            if path:
+                self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+        connection.execute("PRAGMA foreign_keys=ON")
+        return connection
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def add(self, state: PackagingEvaluationState, run_id: Optional[str] = None) -> str:
+        """Store a completed evaluation, returning its id."""
+        return self.add_many([(state, run_id)])[0]
+
+    def add_many(self, evaluations: List[Tuple[PackagingEvaluationState, Optional[str]]]) -> List[str]:
+        """Store completed evaluations in one transaction, returning their ids."""
+        created_at = _timestamp(datetime.utcnow())
+        rows, components, ids = [], [], []
+        for state, run_id in evaluations:
+            if state.final_evaluation is None:
+                raise ValueError("Only completed evaluations can be stored")
+            evaluation_id = uuid.uuid4().hex
+            ids.append(evaluation_id)
+            if state.reused_from is not None:
+                mode = REUSED
+            elif state.current_node == TRIAGE:
+                mode = TRIAGE
+            else:
+                mode = FULL
+            technical, operational = state.technical_assessment, state.operational_assessment
+            rows.append((
+                evaluation_id,
+                run_id,
+                created_at,
+                mode,
+                state.packaging_concept,
+                state.final_evaluation.feasibility_score,
+                int(state.final_evaluation.go_decision),
+                int(technical.overall_feasible) if technical is not None else None,
+                int(operational.overall_feasible) if operational is not None else None,
+                int(state.escalate),
+                state.reused_from,
+                # Images are large and already summarized by the image analysis
+                dump_model(state, STATE_SERIALIZER, exclude={"concept_images"}).decode("utf-8")
+            ))
+            components.extend(
+                (evaluation_id, position, component.name, component.material, material_key(component.material))
+                for position, component in enumerate(state.components)
+            )
+
+        with self._lock, self._connection:
+            self._connection.executemany(f"INSERT INTO evaluations VALUES ({', '.join('?' * 12)})", rows)
+            self._connection.executemany("INSERT INTO components VALUES (?, ?, ?, ?, ?)", components)
+        return ids
+
+    def get(self, evaluation_id: str) -> Optional[PackagingEvaluationState]:
+        """The stored state of an evaluation (without its images)."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT state FROM evaluations WHERE id = ?", (evaluation_id,)
+            ).fetchone()
+        return load_model(PackagingEvaluationState, row[0].encode("utf-8"), STATE_SERIALIZER) if row else None
+
+    def _select(self, filters: HistoryFilter, extra: str = "") -> Tuple[str, List[Any]]:
+        where, params = _where(filters)
+        materials = (
+            f"(SELECT group_concat(material, '{MATERIAL_SEPARATOR}') FROM components c "
+            "WHERE c.evaluation_id = e.id)"
+        )
+        columns = ", ".join(f"e.{column}" for column in COLUMNS)
+        return f"SELECT {columns}, {materials}{extra} FROM evaluations e{where} ORDER BY e.created_at DESC, e.id", params
+
+    def query(self, filters: HistoryFilter = HistoryFilter(), limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Summaries of the matching evaluations, newest first."""
+        sql, params = self._select(filters)
+        with self._lock:
+            rows = self._connection.execute(f"{sql} LIMIT ? OFFSET ?", [*params, limit, offset]).fetchall()
+        return [_row(row) for row in rows]
+
+    def summary(self, filters: HistoryFilter = HistoryFilter(), top_materials: int = 10) -> Dict[str, Any]:
+        """Portfolio figures for the matching evaluations."""
+        where, params = _where(filters)
+        with self._lock:
+            count, mean_score, go_rate = self._connection.execute(
+                f"SELECT count(*), avg(e.feasibility_score), avg(e.go_decision) FROM evaluations e{where}", params
+            ).fetchone()
+            scores = self._connection.execute(
+                f"SELECT e.feasibility_score, count(*) FROM evaluations e{where} "
+                "GROUP BY e.feasibility_score ORDER BY e.feasibility_score", params
+            ).fetchall()
+            # Each evaluation counts once per material, however many components use it
+            materials = self._connection.execute(
+                "SELECT material_key, count(*) AS evaluations, avg(feasibility_score) FROM ("
+                "SELECT DISTINCT c.material_key, e.id, e.feasibility_score "
+                f"FROM components c JOIN evaluations e ON e.id = c.evaluation_id{where}"
+                ") GROUP BY material_key ORDER BY evaluations DESC, material_key LIMIT ?",
+                [*params, top_materials]
+            ).fetchall()
+        return {
+            "evaluations": count,
+            "mean_score": round(mean_score, 3) if mean_score is not None else None,
+            "go_rate": round(go_rate, 4) if go_rate is not None else None,
+            "scores": {score: n for score, n in scores},
+            "materials": [
+                {"material": material, "evaluations": n, "mean_score": round(score, 3)}
+                for material, n, score in materials
+            ],
+        }
+
+    def rows(
+        self,
+        filters: HistoryFilter = HistoryFilter(),
+        include_state: bool = False,
+        batch_size: int = HISTORY_CONFIG["export_batch_size"]
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Batches of matching evaluation summaries (and states), read on a separate connection."""
+        sql, params = self._select(filters, ", e.state" if include_state else "")
+        connection = self._connect()
+        try:
+            cursor = connection.execute(sql, params)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                records = []
+                for row in batch:
+                    record = _row(row)
+                    if include_state:
+                        record["state"] = json.loads(row[-1])
+                    records.append(record)
+                yield records
+        finally:
+            connection.close()
+
+    def export_jsonl(self, filters: HistoryFilter = HistoryFilter(), include_state: bool = False) -> Iterator[bytes]:
+        """Matching evaluations as JSONL, one chunk per batch."""
+        for records in self.rows(filters, include_state):
+            yield "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+
+    def export_parquet(self, output: BinaryIO, filters: HistoryFilter = HistoryFilter(), include_state: bool = False) -> int:
+        """Write matching evaluations to a Parquet file, one row group per batch; returns the row count."""
+        if pyarrow is None:
+            raise RuntimeError("Parquet export requires pyarrow: pip install pyarrow")
+        fields = [
+            ("id", pyarrow.string()),
+            ("run_id", pyarrow.string()),
+            ("created_at", pyarrow.timestamp("s", tz="UTC")),
+            ("mode", pyarrow.string()),
+            ("packaging_concept", pyarrow.string()),
+            ("feasibility_score", pyarrow.int8()),
+            ("go_decision", pyarrow.bool_()),
+            ("technical_feasible", pyarrow.bool_()),
+            ("operational_feasible", pyarrow.bool_()),
+            ("escalate", pyarrow.bool_()),
+            ("reused_from", pyarrow.string()),
+            ("materials", pyarrow.list_(pyarrow.string())),
+        ]
+        if include_state:
+            # Nested states vary too much for a fixed schema; kept as JSON text
+            fields.append(("state", pyarrow.string()))
+        schema = pyarrow.schema(fields)
+
+        count = 0
+        with pyarrow.parquet.ParquetWriter(output, schema) as writer:
+            for records in self.rows(filters, include_state):
+                for record in records:
+                    record["created_at"] = datetime.fromisoformat(record["created_at"]).replace(tzinfo=timezone.utc)
+                    if include_state:
+                        record["state"] = json.dumps(record["state"])
+                writer.write_table(pyarrow.Table.from_pylist(records, schema=schema))
+                count += len(records)
+        return count
+
+
+def _filters(args) -> HistoryFilter:
+    return HistoryFilter(
+        min_score=args.min_score,
+        max_score=args.max_score,
+        go_decision=args.go_decision,
+        since=args.since,
+        until=args.until,
+        material=args.material,
+        mode=args.mode
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "summary"])
+    parser.add_argument("output", nargs="?", help="Export file (stdout for JSONL if omitted)")
+    parser.add_argument("--database", default=HISTORY_CONFIG["path"], help="SQLite history file")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=JSONL)
+    parser.add_argument("--include-state", action="store_true", help="Export the full evaluation states")
+    parser.add_argument("--min-score", type=int)
+    parser.add_argument("--max-score", type=int)
+    parser.add_argument("--go-decision", type=lambda value: value.lower() in ("1", "true", "yes"))
+    parser.add_argument("--since", type=datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.fromisoformat)
+    parser.add_argument("--material")
+    parser.add_argument("--mode")
+    args = parser.parse_args(argv)
+    if not args.database:
+        parser.error("--database is required when HISTORY_CONFIG has no path")
+
+    history = EvaluationHistory(args.database)
+    filters = _filters(args)
+    if args.command == "summary":
+        print(json.dumps(history.summary(filters), indent=2))
+        return 0
+
+    if args.format == PARQUET:
+        if not args.output:
+            parser.error("Parquet export needs an output file")
+        with open(args.output, "wb") as output:
+            count = history.export_parquet(output, filters, args.include_state)
+    else:
+        output = open(args.output, "wb") if args.output else sys.stdout.buffer
+        count = 0
+        try:
+            for chunk in history.export_jsonl(filters, args.include_state):
+                output.write(chunk)
+                count += chunk.count(b"\n")
+        finally:
+            if args.output:
+                output.close()
+    print(f"Exported {count} evaluations", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
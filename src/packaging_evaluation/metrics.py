@@ -0,0 +1,54 @@
+"""Lightweight in-process runtime metrics exposed by the API apps."""
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class EventLoopLagMonitor:
+    """Samples how late the event loop wakes up from a fixed-interval sleep.
+
+    A busy or blocked loop delays every coroutine by the same amount, so this
+    lag is a direct measure of how much CPU-bound work (validation,
+    serialization, parsing) is crowding out request handling.
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 600):
+        self.interval = interval
+        self.samples: Deque[float] = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def start(self):
+        """Start sampling on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop sampling."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self, recent: int = 10) -> Dict[str, float]:
+        """Lag statistics in milliseconds over the whole window and the most recent samples."""
+        samples = sorted(self.samples)
+        latest = list(self.samples)[-recent:]
+        if not samples:
+            return {"samples": 0, "recent_max_ms": 0.0, "mean_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        return {
+            "samples": len(samples),
+            "recent_max_ms": round(1000 * max(latest), 3),
+            "mean_ms": round(1000 * sum(samples) / len(samples), 3),
+            "p99_ms": round(1000 * samples[min(len(samples) - 1, int(0.99 * len(samples)))], 3),
+            "max_ms": round(1000 * samples[-1], 3),
+        }
@@ -0,0 +1,161 @@
+"""Pluggable serializers for state snapshots and API responses.
+
+`json` (the standard library) is always available. `orjson` and `msgpack`
+are used when their packages are installed (`ormsgpack` or `msgpack` for
+the latter), and zstd compression when `zstandard` is installed.
+"""
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Set, Type, TypeVar
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ormsgpack as msgpack
+except ImportError:
+    try:
+        import msgpack
+    except ImportError:
+        msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+Model = TypeVar("Model", bound=BaseModel)
+
+
+class Serializer(ABC):
+    """Encodes plain Python data (dicts, lists, str, numbers, bools, None) to bytes.
+
+    Subclasses set `name` and `media_type` and implement both methods; an
+    incomplete subclass cannot be instantiated.
+    """
+    name = ""
+    media_type = ""
+
+    @abstractmethod
+    def encode(self, data: Any) -> bytes:
+        """Encode data to bytes."""
+
+    @abstractmethod
+    def decode(self, payload: bytes) -> Any:
+        """Decode bytes produced by `encode`."""
+
+
+class JSONSerializer(Serializer):
+    name = "json"
+    media_type = "application/json"
+
+    def encode(self, data: Any) -> bytes:
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def decode(self, payload: bytes) -> Any:
+        return json.loads(payload)
+
+
+class ORJSONSerializer(Serializer):
+    name = "orjson"
+    media_type = "application/json"
+
+    def encode(self, data: Any) -> bytes:
+        return orjson.dumps(data)
+
+    def decode(self, payload: bytes) -> Any:
+        return orjson.loads(payload)
+
+
+class MsgpackSerializer(Serializer):
+    name = "msgpack"
+    media_type = "application/msgpack"
+
+    def encode(self, data: Any) -> bytes:
+        return msgpack.packb(data)
+
+    def decode(self, payload: bytes) -> Any:
+        return msgpack.unpackb(payload)
+
+
+# Available serializers by name; orjson replaces the standard library for JSON when installed
+SERIALIZERS: Dict[str, Serializer] = {"json": JSONSerializer()}
+if orjson is not None:
+    SERIALIZERS["orjson"] = ORJSONSerializer()
+if msgpack is not None:
+    SERIALIZERS["msgpack"] = MsgpackSerializer()
+
+DEFAULT_SERIALIZER = SERIALIZERS.get("orjson", SERIALIZERS["json"])
+
+# Media types accepted in `Accept` headers, mapped to the serializer answering them
+MEDIA_TYPES = {"application/json": DEFAULT_SERIALIZER}
+if msgpack is not None:
+    MEDIA_TYPES["application/msgpack"] = SERIALIZERS["msgpack"]
+    MEDIA_TYPES["application/x-msgpack"] = SERIALIZERS["msgpack"]
+
+
+def _weighted(header: str) -> List[str]:
+    """Values of an `Accept`-style header, best first, dropping those with q=0."""
+    values = []
+    for position, part in enumerate(header.split(",")):
+        value, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if value and quality > 0:
+            values.append((-quality, position, value.lower()))
+    return [value for _, _, value in sorted(values)]
+
+
+def negotiate(accept: Optional[str]) -> Serializer:
+    """The serializer for an `Accept` header, defaulting to JSON."""
+    for media_type in _weighted(accept or ""):
+        if media_type in MEDIA_TYPES:
+            return MEDIA_TYPES[media_type]
+        if media_type in ("*/*", "application/*"):
+            break
+    return DEFAULT_SERIALIZER
+
+
+def accepts_zstd(accept_encoding: Optional[str]) -> bool:
+    """Whether an `Accept-Encoding` header allows zstd and it is available."""
+    return zstandard is not None and "zstd" in _weighted(accept_encoding or "")
+
+
+def compress(payload: bytes, level: int = 3) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(payload)
+
+
+def decompress(payload: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(payload)
+
+
+def dump_model(
+    model: BaseModel,
+    serializer: Serializer = DEFAULT_SERIALIZER,
+    compressed: bool = False,
+    exclude: Optional[Set[str]] = None
+) -> bytes:
+    """Snapshot of a model (such as an evaluation state) in the given format, without the `exclude` fields."""
+    payload = serializer.encode(model.model_dump(mode="json", exclude=exclude))
+    return compress(payload) if compressed else payload
+
+
+def load_model(
+    schema: Type[Model],
+    payload: bytes,
+    serializer: Serializer = DEFAULT_SERIALIZER,
+    compressed: bool = False
+) -> Model:
+    """Model from a snapshot written by `dump_model`."""
+    if compressed:
+        payload = decompress(payload)
+    return schema.model_validate(serializer.decode(payload))
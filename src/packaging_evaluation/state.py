@@ -1,6 +1,19 @@
-from typing import List, Dict, Optional, Any, Union
+import operator
+from functools import lru_cache
+from typing import Annotated, Callable, List, Dict, Optional, Any, Union
 from pydantic import BaseModel, Field
 
+# Fields changed by a node, by name; merged into the state through the field reducers
+StateUpdate = Dict[str, Any]
+
+def latest(current: Any, update: Any) -> Any:
+    """Reducer keeping the newest value, but never replacing an assessment with None."""
+    return current if update is None else update
+
+def message_from(agent: str, content: str) -> Dict[str, str]:
+    """A conversation message, appended to the state by the `messages` reducer."""
+    return {"agent": agent, "content": content}
+
 class Component(BaseModel):
     """A component of the packaging concept."""
     name: str = Field(description="Name of the component")
@@ -31,6 +44,30 @@ class OperationalAssessment(BaseModel):
     overall_feasible: bool = Field(description="Whether the concept is operationally feasible")
     operational_summary: str = Field(description="Summary of operational impact")
 
+class SupplyChainAnalysis(BaseModel):
+    """Supply chain sub-analysis of the operational assessment."""
+    supply_chain_impact: str = Field(description="Impact on supply chain (Low/Medium/High)")
+    feasible: bool = Field(description="Whether the materials can be sourced at scale")
+    notes: str = Field(description="Sourcing, supplier and logistics notes")
+
+class ProductionAnalysis(BaseModel):
+    """Production changes sub-analysis of the operational assessment."""
+    production_changes_needed: List[str] = Field(description="Changes needed to production processes")
+    feasible: bool = Field(description="Whether the changes are achievable on existing or obtainable lines")
+    notes: str = Field(description="Production process notes")
+
+class CostAnalysis(BaseModel):
+    """Cost sub-analysis of the operational assessment."""
+    cost_impact: str = Field(description="Estimated cost impact")
+    feasible: bool = Field(description="Whether the cost impact is acceptable")
+    notes: str = Field(description="Cost driver notes")
+
+class OperationalAnalyses(BaseModel):
+    """Operational sub-analyses that only depend on the components."""
+    supply_chain: SupplyChainAnalysis
+    production: ProductionAnalysis
+    cost: CostAnalysis
+
 class ReflectionNotes(BaseModel):
     """Reflection on assessments."""
     blind_spots: List[str] = Field(description="Blind spots identified in the assessments")
@@ -57,6 +94,18 @@ class FinalEvaluation(BaseModel):
     action_items: List[str] = Field(description="Recommended next steps")
     executive_summary: str = Field(description="Brief executive summary")
 
+class TriageEvaluation(BaseModel):
+    """Quick single-pass evaluation used to screen concept backlogs."""
+    components: List[Component] = Field(description="Main components of the packaging concept")
+    feasibility_score: int = Field(description="Overall feasibility score (1-10, with 10 being most feasible)")
+    feasibility_summary: str = Field(description="Two or three sentence summary of overall feasibility")
+    rationale: str = Field(description="Short expert rationale explaining the reasons behind the feasibility score")
+    key_challenges: List[str] = Field(description="The top three challenges or barriers")
+    go_decision: bool = Field(description="Whether to proceed with the concept")
+    confidence: float = Field(description="Confidence in this quick assessment (0.0-1.0)")
+    escalate: bool = Field(description="Whether the concept needs a full evaluation, e.g. novel materials or a borderline case")
+    escalation_reason: str = Field(description="Why the concept should or should not get a full evaluation")
+
 class ImageAnalysis(BaseModel):
     """Analysis of packaging concept images."""
     observations: List[str] = Field(description="Key observations from the concept image")
@@ -80,16 +129,19 @@ class PackagingEvaluationState(BaseModel):
     # Internal state (automatically managed)
     components: List[Component] = Field(default_factory=list)
     image_analysis: Optional[ImageAnalysis] = None
-    technical_assessment: Optional[TechnicalAssessment] = None
-    operational_assessment: Optional[OperationalAssessment] = None
-    reflection_notes: Optional[ReflectionNotes] = None
-    final_evaluation: Optional[FinalEvaluation] = None
+    technical_assessment: Annotated[Optional[TechnicalAssessment], latest] = None
+    operational_assessment: Annotated[Optional[OperationalAssessment], latest] = None
+    operational_analyses: Optional[OperationalAnalyses] = None
+    reflection_notes: Annotated[Optional[ReflectionNotes], latest] = None
+    final_evaluation: Annotated[Optional[FinalEvaluation], latest] = None
     evaluation_score: Optional[float] = None
     final_recommendation: str = ""
     current_node: str = "image_analyzer" if concept_images else "concept_breaker"
     process_complete: bool = False
-    messages: List[Dict[str, str]] = Field(default_factory=list)
+    messages: Annotated[List[Dict[str, str]], operator.add] = Field(default_factory=list)
     reflection_counter: int = Field(default=0, description="Number of times reflection has been performed")
+    reused_from: Optional[str] = Field(default=None, description="Id of the prior evaluation reused for a near-duplicate concept")
+    escalate: bool = Field(default=False, description="Whether a triage evaluation flagged the concept for the full pipeline")
     
     # Add new fields for HITL
     user_feedback: Optional[UserFeedback] = None
@@ -98,4 +150,27 @@ class PackagingEvaluationState(BaseModel):
     
     def add_message(self, agent: str, content: str):
         """Add a message to the conversation history."""
-        self.messages.append({"agent": agent, "content": content})
\ No newline at end of file
+        self.messages.append(message_from(agent, content))
+    
+    @classmethod
+    @lru_cache(maxsize=None)
+    def reducers(cls) -> Dict[str, Callable[[Any, Any], Any]]:
+        """Reducers of the fields annotated with one; the graph uses them as channel reducers."""
+        return {
+            name: field.metadata[-1]
+            for name, field in cls.model_fields.items()
+            if field.metadata and callable(field.metadata[-1])
+        }
+    
+    def apply(self, update: StateUpdate) -> "PackagingEvaluationState":
+        """New state with a node's update merged in through the field reducers.
+        
+        Node updates are trusted, so this skips validation and shares the
+        unchanged fields with the current state instead of copying them.
+        """
+        reducers = self.reducers()
+        values = {
+            name: reducers[name](getattr(self, name), value) if name in reducers else value
+            for name, value in update.items()
+        }
+        return self.model_copy(update=values)
\ No newline at end of file
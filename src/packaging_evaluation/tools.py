@@ -1,39 +1,216 @@
 """Enhanced agent implementations for the packaging evaluation system."""
-import json
-from typing import Dict, Any, List
+import asyncio
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from pydantic import BaseModel, Field
 
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from src.packaging_evaluation.cascade import cascade_invoke
+from src.packaging_evaluation.cassette import RecordingChatModel, wrap_chat_model
+from src.packaging_evaluation.component_store import ComponentAssessmentStore, match_assessments
+from src.packaging_evaluation.configuration import (
+    AGENT_CONFIG,
+    CASCADE_CONFIG,
+    COMPONENT_STORE_CONFIG,
+    REFLECTION_GATE_CONFIG,
+    TRIAGE_CONFIG
+)
 from src.packaging_evaluation.state import (
     PackagingEvaluationState,
+    StateUpdate,
+    message_from,
     Component,
     TechnicalAssessment,
     OperationalAssessment,
     ReflectionNotes,
+    SupplyChainAnalysis,
+    ProductionAnalysis,
+    CostAnalysis,
+    OperationalAnalyses,
     FinalEvaluation,
-    ImageAnalysis,
-    UserFeedback
+    TriageEvaluation,
+    ImageAnalysis
 )
 
-# Initialize the GPT-4o model (which can handle both text and images)
-llm = ChatOpenAI(model="gpt-4o", temperature=0.2)
+# Chat models, created on first use (or by the API's startup warmup) so that importing
+# this module does not import langchain_openai; benchmarks assign their own
+llm: Optional[Any] = None
+small_llm: Optional[Any] = None
+_models_lock = threading.Lock()
+
+def chat_model() -> Any:
+    """The GPT-4o model (which can handle both text and images),
+    recorded to or replayed from a cassette when LLM_CASSETTE_MODE is set."""
+    global llm
+    with _models_lock:
+        if llm is None:
+            from langchain_openai import ChatOpenAI
+            
+            llm = wrap_chat_model(lambda: ChatOpenAI(model="gpt-4o", temperature=0.2))
+        return llm
+
+def small_chat_model() -> Optional[Any]:
+    """Smaller model tried first by nodes with a cascade policy in AGENT_CONFIG, if enabled."""
+    global small_llm
+    with _models_lock:
+        if small_llm is None and CASCADE_CONFIG["enabled"]:
+            from langchain_openai import ChatOpenAI
+            
+            small_llm = wrap_chat_model(
+                lambda: ChatOpenAI(model=CASCADE_CONFIG["small_model"], temperature=CASCADE_CONFIG["temperature"])
+            )
+        return small_llm
+
+@lru_cache(maxsize=None)
+def prompt_template(template: str):
+    """Chat prompt template, parsed once; langchain_core is imported on first use."""
+    from langchain_core.prompts import ChatPromptTemplate
+    
+    return ChatPromptTemplate.from_template(template)
+
+def create_clients():
+    """Create the chat models and import langchain ahead of the first evaluation."""
+    chat_model()
+    small_chat_model()
+    from langchain_core.prompts import ChatPromptTemplate  # noqa: F401
+
+async def open_connections(connections: int = 1):
+    """Open connections to the model API with a free request (listing models), so the
+    first evaluations skip the TCP and TLS handshakes. Cassette models have none to open."""
+    clients = {}
+    for model in (chat_model(), small_chat_model()):
+        if isinstance(model, RecordingChatModel):
+            model = model.model
+        client = getattr(model, "root_async_client", None)
+        if client is not None:
+            clients[id(client)] = client
+    await asyncio.gather(*(
+        client.models.list() for client in clients.values() for _ in range(connections)
+    ))
+
+# Component assessments shared across evaluations, consulted by technical_feasibility
+component_store = (
+    ComponentAssessmentStore(COMPONENT_STORE_CONFIG["path"], COMPONENT_STORE_CONFIG["max_age"])
+    if COMPONENT_STORE_CONFIG["enabled"] else None
+)
+
+# Receives (node, fields parsed so far) while a streaming node generates its output;
+# set by callers that show progress, such as the API's run tasks
+partial_output_sink: ContextVar[Optional[Callable[[str, Dict[str, Any]], None]]] = ContextVar(
+    "partial_output_sink", default=None
+)
 
 class ComponentList(BaseModel):
     """A list of packaging components."""
     components: List[Component] = Field(description="List of packaging components")
 
-async def image_analysis(state: PackagingEvaluationState) -> PackagingEvaluationState:
+async def gather_or_cancel(*coroutines):
+    """Like `asyncio.gather`, but when one call fails the others are cancelled instead of left running."""
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+async def structured_call(node: str, schema, messages: List[Any], validate=None):
+    """Run a structured model call for a node, through the model cascade if the node has a policy."""
+    policy = AGENT_CONFIG.get(node, {}).get("cascade")
+    small = small_chat_model() if policy else None
+    if small is not None:
+        return await cascade_invoke(node, schema, messages, small, chat_model(), policy["min_confidence"], validate)
+    return await chat_model().with_structured_output(schema).ainvoke(messages)
+
+async def streamed_call(node: str, schema, messages: List[Any], lead_fields: Tuple[str, ...] = (), validate=None):
+    """Run a structured model call, reporting incrementally parsed fields to the partial output sink.
+
+    `lead_fields` are generated first, so they can be shown while the rest is
+    still being written. Models that cannot stream (fakes, cassette replay),
+    and nodes with a cascade policy, report their whole output once.
+    """
+    from langchain_core.language_models import BaseChatModel
+    
+    model = chat_model()
+    sink = partial_output_sink.get()
+    cascaded = AGENT_CONFIG.get(node, {}).get("cascade") and small_chat_model() is not None
+    if sink is None or cascaded or not isinstance(model, BaseChatModel):
+        result = await structured_call(node, schema, messages, validate)
+        if sink is not None:
+            sink(node, result.model_dump())
+        return result
+    
+    # A JSON schema (rather than the model class) makes the parser yield partial objects
+    json_schema = schema.model_json_schema()
+    properties = json_schema["properties"]
+    json_schema["properties"] = {
+        **{name: properties[name] for name in lead_fields},
+        **{name: value for name, value in properties.items() if name not in lead_fields}
+    }
+    fields = {}
+    async for fields in model.with_structured_output(json_schema).astream(messages):
+        if fields:
+            sink(node, fields)
+    return schema.model_validate(fields)
+
+def validate_components(result: ComponentList) -> Optional[str]:
+    """Consistency problems in a concept breakdown, if any."""
+    if not result.components:
+        return "No components"
+    names = [c.name.strip().lower() for c in result.components]
+    if len(set(names)) != len(names):
+        return "Duplicate component names"
+    if any(not c.material.strip() or not c.function.strip() for c in result.components):
+        return "Component without material or function"
+    return None
+
+def validate_operations(result: OperationalAssessment) -> Optional[str]:
+    """Consistency problems in an operational assessment, if any."""
+    if result.supply_chain_impact.strip().split(" ")[0].strip(".,:").lower() not in ("low", "medium", "high"):
+        return "Supply chain impact is not Low/Medium/High"
+    if not result.operational_summary.strip():
+        return "Empty summary"
+    return None
+
+def validate_technical(result: TechnicalAssessment, components: List[Component]) -> Optional[str]:
+    """Consistency problems in a technical assessment of the components, if any."""
+    if len(result.component_assessments) != len(components):
+        return "Component assessment count does not match the components"
+    if any(not 0.0 <= a.technical_score <= 1.0 for a in result.component_assessments):
+        return "Technical score out of range"
+    return None
+
+def validate_final(result: FinalEvaluation) -> Optional[str]:
+    """Consistency problems in a final evaluation, if any."""
+    if not 1 <= result.feasibility_score <= 10:
+        return "Feasibility score out of range"
+    return None
+
+def validate_reflection(result: ReflectionNotes, state: PackagingEvaluationState) -> Optional[str]:
+    """Consistency problems in reflection notes on the state's assessments, if any."""
+    technical = state.technical_assessment
+    if result.assessment_approved and technical is not None and validate_technical(technical, state.components):
+        return "Approved an inconsistent technical assessment"
+    if result.requires_iteration and result.assessment_approved:
+        return "Approved while requiring iteration"
+    if result.requires_iteration and not (result.questions or result.blind_spots):
+        return "Iteration requested without questions or blind spots"
+    if not 0 <= result.iteration_count <= 3:
+        return "Iteration count out of range"
+    return None
+
+async def image_analysis(state: PackagingEvaluationState) -> StateUpdate:
     """
     Analyzes packaging concept images using GPT-4o's multimodal capabilities.
     Extracts visual information from concept images.
     """
     # Skip if no images are provided
     if not state.concept_images:
-        state.current_node = "concept_breaker"
-        return state
+        return {"current_node": "concept_breaker"}
     
-    prompt = ChatPromptTemplate.from_template("""
+    prompt = prompt_template("""
     # Packaging Concept Image Analysis
     
     You are a specialized packaging engineer with expertise in materials, manufacturing processes, and structural design.
@@ -60,7 +237,7 @@ async def image_analysis(state: PackagingEvaluationState) -> PackagingEvaluation
     """)
     
     # Create a structured output model for image analysis
-    structured_llm = llm.with_structured_output(ImageAnalysis)
+    structured_llm = chat_model().with_structured_output(ImageAnalysis)
     
     # Format the messages with text and images
     text_message = prompt.format_messages(packaging_concept=state.packaging_concept)[0].content
@@ -86,24 +263,20 @@ async def image_analysis(state: PackagingEvaluationState) -> PackagingEvaluation
     # Run the model with structured output
     analysis = await structured_llm.ainvoke([message])
     
-    # Update state with image analysis
-    state.image_analysis = analysis
-    
-    # Add a message about the analysis
-    state.add_message("image_analyzer", 
-                     f"Image analysis complete. Identified {len(analysis.identified_components)} components. " + 
-                     f"{analysis.analysis_summary}")
-    
-    # Move to next node
-    state.current_node = "concept_breaker"
-    
-    return state
+    # Update state with image analysis and a message about it, and move to next node
+    return {
+        "image_analysis": analysis,
+        "messages": [message_from("image_analyzer",
+                                  f"Image analysis complete. Identified {len(analysis.identified_components)} components. " +
+                                  f"{analysis.analysis_summary}")],
+        "current_node": "concept_breaker"
+    }
 
-async def concept_breaker(state: PackagingEvaluationState) -> PackagingEvaluationState:
+async def concept_breaker(state: PackagingEvaluationState) -> StateUpdate:
     """
     Breaks down the packaging concept into its components and analyzes each component.
     """
-    prompt = ChatPromptTemplate.from_template("""
+    prompt = prompt_template("""
     # Packaging Concept Breakdown
     
     You are a specialized packaging engineer with expertise in materials, manufacturing processes, and structural design.
@@ -130,9 +303,6 @@ async def concept_breaker(state: PackagingEvaluationState) -> PackagingEvaluatio
     Provide a comprehensive breakdown of the packaging concept.
     """)
     
-    # Create a structured output model for component list
-    structured_llm = llm.with_structured_output(ComponentList)
-    
     # Format the messages
     text_message = prompt.format_messages(
         packaging_concept=state.packaging_concept,
@@ -145,22 +315,20 @@ async def concept_breaker(state: PackagingEvaluationState) -> PackagingEvaluatio
         "content": text_message
     }
     
-    # Run the model with structured output
-    components = await structured_llm.ainvoke([message])
-    
-    # Update state with components
-    state.components = components.components
-    
-    # Add a message about the breakdown
-    state.add_message("concept_breaker", 
-                     f"Concept breakdown complete. Identified {len(components.components)} components.")
-    
-    # Move to next node
-    state.current_node = "human_feedback"
-    
-    return state
+    # Run the model with structured output, small model first
+    components = await structured_call("concept_breaker", ComponentList, [message], validate_components)
+    
+    # Update state with components and a message about the breakdown, and move to next node;
+    # operational sub-analyses of earlier components no longer apply
+    return {
+        "components": components.components,
+        "operational_analyses": None,
+        "messages": [message_from("concept_breaker",
+                                  f"Concept breakdown complete. Identified {len(components.components)} components.")],
+        "current_node": "human_feedback"
+    }
 
-async def human_feedback(state: PackagingEvaluationState) -> PackagingEvaluationState:
+async def human_feedback(state: PackagingEvaluationState) -> StateUpdate:
     """
     Request and process human feedback on component and material assumptions.
     This node pauses the evaluation for human input.
@@ -190,19 +358,17 @@ feedback_notes: [your notes]
 suggested_changes: [list of specific changes]
 """
         
-        # Add message requesting feedback
-        state.add_message("human_feedback", feedback_prompt)
-        
-        # Set state to await human input
-        state.awaiting_human_input = True
-        state.current_node = "human_feedback"  # Stay in this node while waiting
-    else:
-        # If we already have feedback, move to process_feedback
-        state.current_node = "process_feedback"
-    
-    return state
+        # Add message requesting feedback and set state to await human input
+        return {
+            "messages": [message_from("human_feedback", feedback_prompt)],
+            "awaiting_human_input": True,
+            "current_node": "human_feedback"  # Stay in this node while waiting
+        }
+    
+    # If we already have feedback, move to process_feedback
+    return {"current_node": "process_feedback"}
 
-async def process_feedback(state: PackagingEvaluationState) -> PackagingEvaluationState:
+async def process_feedback(state: PackagingEvaluationState) -> StateUpdate:
     """
     Process the received user feedback and determine next steps.
     """
@@ -210,28 +376,32 @@ async def process_feedback(state: PackagingEvaluationState) -> PackagingEvaluati
         raise ValueError("No user feedback available to process")
     
     # Add message about received feedback
-    state.add_message("feedback_processor",
-                     f"Processing feedback. {'Changes requested' if not state.user_feedback.is_correct else 'Components confirmed correct'}")
+    messages = [message_from("feedback_processor",
+                             f"Processing feedback. {'Changes requested' if not state.user_feedback.is_correct else 'Components confirmed correct'}")]
     
     if state.user_feedback.is_correct:
         # If feedback confirms assumptions, proceed to technical feasibility
-        state.current_node = "technical_feasibility"
+        next_node = "technical_feasibility"
     else:
         # If changes are needed, go back to concept breaker with feedback
-        state.add_message("feedback_processor",
-                         f"Adjusting components based on feedback: {', '.join(state.user_feedback.suggested_changes)}")
-        state.current_node = "concept_breaker"
+        messages.append(message_from("feedback_processor",
+                                     f"Adjusting components based on feedback: {', '.join(state.user_feedback.suggested_changes)}"))
+        next_node = "concept_breaker"
     
     # Clear the feedback to prevent loops
-    state.user_feedback = None
-    
-    return state
+    return {"messages": messages, "current_node": next_node, "user_feedback": None}
 
-async def technical_feasibility(state: PackagingEvaluationState) -> PackagingEvaluationState:
+async def assess_components(
+    components: List[Component],
+    reflection: Optional[ReflectionNotes] = None
+) -> Tuple[TechnicalAssessment, int]:
     """
-    Assess the technical feasibility of the packaging concept.
+    Technical assessment of the components, and how many were reused from earlier assessments.
+    
+    When reflection asked for another iteration, every component is assessed
+    again with the reflection's questions, and the stored assessments are replaced.
     """
-    prompt = ChatPromptTemplate.from_template("""
+    prompt = prompt_template("""
     # Technical Feasibility Assessment
     
     You are a specialized packaging engineer with expertise in materials, manufacturing processes, and structural design.
@@ -251,44 +421,193 @@ async def technical_feasibility(state: PackagingEvaluationState) -> PackagingEva
     Provide a comprehensive technical feasibility assessment.
     """)
     
-    # Create a structured output model for technical assessment
-    structured_llm = llm.with_structured_output(TechnicalAssessment)
-    
-    # Format the components for the prompt
-    components_text = "\n".join([
-        f"- {c.name} (Material: {c.material}, Function: {c.function})"
-        for c in state.components
-    ])
+    # Reuse stored assessments for components seen in earlier evaluations,
+    # so only novel components are sent to the model
+    known = {}
+    novel = []
+    for i, c in enumerate(components):
+        cached = component_store.get(c) if component_store is not None and reflection is None else None
+        if cached is not None:
+            known[i] = cached
+        else:
+            novel.append((i, c))
     
-    # Format the messages
-    text_message = prompt.format_messages(components=components_text)[0].content
+    if novel or not components:
+        # Format the components for the prompt
+        components_text = "\n".join([
+            f"- {c.name} (Material: {c.material}, Function: {c.function})"
+            for _, c in novel
+        ])
+        if known:
+            components_text += "\n\nAlready assessed (for context only, do not assess again):\n" + "\n".join([
+                f"- {a.component_name}: {'feasible' if a.feasible else 'not feasible'} (score {a.technical_score})"
+                for a in known.values()
+            ])
+        if reflection is not None and (reflection.questions or reflection.blind_spots):
+            components_text += "\n\nAddress these points raised by the review of the previous assessment:\n" + "\n".join([
+                f"- {point}" for point in reflection.questions + reflection.blind_spots
+            ])
+        
+        # Format the messages
+        text_message = prompt.format_messages(components=components_text)[0].content
+        
+        # Create the message
+        message = {
+            "role": "user",
+            "content": text_message
+        }
+        
+        # Run the model with structured output, small model first if the node has a policy
+        novel_assessment = await structured_call(
+            "technical_feasibility", TechnicalAssessment, [message],
+            lambda result: validate_technical(result, [c for _, c in novel])
+        )
+        
+        # Remember the new component assessments for later evaluations
+        matched = match_assessments([c for _, c in novel], novel_assessment.component_assessments)
+        for j, (i, c) in enumerate(novel):
+            if j in matched:
+                known[i] = matched[j]
+                if component_store is not None:
+                    component_store.put(c, matched[j])
+        # Keep any assessments the model returned that could not be paired with a component
+        paired = {id(a) for a in matched.values()}
+        unmatched = [a for a in novel_assessment.component_assessments if id(a) not in paired]
+        
+        assessment = TechnicalAssessment(
+            overall_feasible=novel_assessment.overall_feasible and all(a.feasible for a in known.values()),
+            component_assessments=[known[i] for i in sorted(known)] + unmatched,
+            technical_summary=novel_assessment.technical_summary
+        )
+    else:
+        # Every component was assessed before: no model call needed
+        component_assessments = [known[i] for i in sorted(known)]
+        challenges = [challenge for a in component_assessments for challenge in a.challenges]
+        assessment = TechnicalAssessment(
+            overall_feasible=all(a.feasible for a in component_assessments),
+            component_assessments=component_assessments,
+            technical_summary=(
+                f"All {len(component_assessments)} components match previously assessed components. "
+                + " ".join(f"{a.component_name}: {a.notes}" for a in component_assessments)
+                + (f" Key challenges: {'; '.join(challenges)}." if challenges else "")
+            )
+        )
+    
+    return assessment, len(components) - len(novel)
+
+async def technical_feasibility(state: PackagingEvaluationState) -> StateUpdate:
+    """
+    Assess the technical feasibility of the packaging concept.
+    """
+    update = {}
+    # A re-run requested by reflection must not get back the stored assessments it questioned
+    reflection = state.reflection_notes if state.reflection_counter > 0 else None
+    if AGENT_CONFIG["operations"].get("pipelined") and state.operational_analyses is None:
+        # The operational sub-analyses only need the components, so they run
+        # concurrently with the technical assessment and operations just merges
+        (assessment, reused), update["operational_analyses"] = await gather_or_cancel(
+            assess_components(state.components, reflection),
+            operational_analyses(state.components)
+        )
+    else:
+        # Not pipelined, or sub-analyses of the same components kept from before a reflection re-run
+        assessment, reused = await assess_components(state.components, reflection)
+    
+    # Update state with technical assessment and a message about it, and move to next node
+    update.update({
+        "technical_assessment": assessment,
+        "messages": [message_from("technical_feasibility",
+                                  f"Technical feasibility assessment complete. Overall feasibility: {assessment.overall_feasible}"
+                                  + (f" ({reused} of {len(state.components)} components reused from earlier assessments)"
+                                     if reused else ""))],
+        "current_node": "operations"
+    })
+    return update
+
+# Focus of each operational sub-analysis, by schema
+OPERATIONAL_SUBANALYSES = {
+    SupplyChainAnalysis: "Evaluate the supply chain impact: availability of the materials, suppliers, lead times and logistics.",
+    ProductionAnalysis: "Identify the changes needed to production processes: new equipment, tooling, line speed and assembly steps.",
+    CostAnalysis: "Estimate the cost impact: material, conversion and tooling costs compared to conventional packaging.",
+}
+
+async def operational_analyses(components: List[Component]) -> OperationalAnalyses:
+    """
+    Run the operational sub-analyses that only depend on the components, concurrently.
+    """
+    prompt = prompt_template("""
+    # Operational Impact Sub-Analysis
     
-    # Create the message
-    message = {
-        "role": "user",
-        "content": text_message
-    }
+    You are a specialized packaging engineer with expertise in manufacturing operations and supply chain.
     
-    # Run the model with structured output
-    assessment = await structured_llm.ainvoke([message])
+    ## Your Task
+    {focus}
     
-    # Update state with technical assessment
-    state.technical_assessment = assessment
+    ## Components
+    {components}
     
-    # Add a message about the assessment
-    state.add_message("technical_feasibility", 
-                     f"Technical feasibility assessment complete. Overall feasibility: {assessment.overall_feasible}")
+    Base the analysis on the components and materials; technical feasibility is assessed separately.
+    """)
     
-    # Move to next node
-    state.current_node = "operations"
+    # Format the components for the prompt
+    components_text = "\n".join([
+        f"- {c.name} (Material: {c.material}, Function: {c.function})"
+        for c in components
+    ])
     
-    return state
+    # Run the sub-analyses with structured output, small model first
+    supply_chain, production, cost = await gather_or_cancel(*(
+        structured_call(
+            "operations",
+            schema,
+            [{"role": "user", "content": prompt.format_messages(focus=focus, components=components_text)[0].content}]
+        )
+        for schema, focus in OPERATIONAL_SUBANALYSES.items()
+    ))
+    return OperationalAnalyses(supply_chain=supply_chain, production=production, cost=cost)
+
+def merge_operational_analyses(
+    analyses: OperationalAnalyses,
+    technical: Optional[TechnicalAssessment]
+) -> OperationalAssessment:
+    """
+    Combine the sub-analyses with the technical results into an operational assessment.
+    """
+    # Challenges of components that are not technically feasible yet become production work
+    blocking = [
+        f"{a.component_name}: {challenge}"
+        for a in (technical.component_assessments if technical else [])
+        if not a.feasible
+        for challenge in a.challenges
+    ]
+    summary = " ".join([analyses.supply_chain.notes, analyses.production.notes, analyses.cost.notes])
+    if technical is not None and not technical.overall_feasible:
+        summary += " The operational impact assumes the open technical challenges are resolved."
+    return OperationalAssessment(
+        supply_chain_impact=analyses.supply_chain.supply_chain_impact,
+        production_changes_needed=analyses.production.production_changes_needed + blocking,
+        cost_impact=analyses.cost.cost_impact,
+        overall_feasible=(analyses.supply_chain.feasible and analyses.production.feasible and analyses.cost.feasible
+                          and (technical is None or technical.overall_feasible)),
+        operational_summary=summary
+    )
 
-async def operations(state: PackagingEvaluationState) -> PackagingEvaluationState:
+async def operations(state: PackagingEvaluationState) -> StateUpdate:
     """
     Assess the operational impact of the packaging concept.
     """
-    prompt = ChatPromptTemplate.from_template("""
+    # Merge the sub-analyses run alongside technical_feasibility; reflection
+    # drops them when it asks for another operational assessment
+    if state.operational_analyses is not None:
+        assessment = merge_operational_analyses(state.operational_analyses, state.technical_assessment)
+        return {
+            "operational_assessment": assessment,
+            "messages": [message_from("operations",
+                                      f"Operational impact assessment complete. Overall feasibility: {assessment.overall_feasible}")],
+            "current_node": "reflection"
+        }
+    
+    prompt = prompt_template("""
     # Operational Impact Assessment
     
     You are a specialized packaging engineer with expertise in manufacturing operations and supply chain.
@@ -311,9 +630,6 @@ async def operations(state: PackagingEvaluationState) -> PackagingEvaluationStat
     Provide a comprehensive operational impact assessment.
     """)
     
-    # Create a structured output model for operational assessment
-    structured_llm = llm.with_structured_output(OperationalAssessment)
-    
     # Format the components and technical assessment for the prompt
     components_text = "\n".join([
         f"- {c.name} (Material: {c.material}, Function: {c.function})"
@@ -334,36 +650,75 @@ async def operations(state: PackagingEvaluationState) -> PackagingEvaluationStat
         "content": text_message
     }
     
-    # Run the model with structured output
-    assessment = await structured_llm.ainvoke([message])
-    
-    # Update state with operational assessment
-    state.operational_assessment = assessment
+    # Run the model with structured output, small model first
+    assessment = await structured_call("operations", OperationalAssessment, [message], validate_operations)
     
-    # Add a message about the assessment
-    state.add_message("operations", 
-                     f"Operational impact assessment complete. Overall feasibility: {assessment.overall_feasible}")
-    
-    # Move to next node
-    state.current_node = "reflection"
-    
-    return state
+    # Update state with operational assessment and a message about it, and move to next node
+    return {
+        "operational_assessment": assessment,
+        "messages": [message_from("operations",
+                                  f"Operational impact assessment complete. Overall feasibility: {assessment.overall_feasible}")],
+        "current_node": "reflection"
+    }
+
+# How often the reflection gate skipped the model call, and which rule stopped it otherwise
+reflection_gate_stats: Counter = Counter()
+
+def reflection_gate(state: PackagingEvaluationState) -> Optional[str]:
+    """The first gate rule the assessments fail, or None if reflection can be skipped."""
+    config = REFLECTION_GATE_CONFIG
+    technical, operational = state.technical_assessment, state.operational_assessment
+    if technical is None or operational is None:
+        return "missing_assessment"
+    if config["require_agreement"] and technical.overall_feasible != operational.overall_feasible:
+        return "feasibility_disagreement"
+    if len(technical.component_assessments) < len(state.components):
+        return "unassessed_components"
+    if any(a.technical_score < config["min_technical_score"] for a in technical.component_assessments):
+        return "low_technical_score"
+    if sum(len(a.challenges) for a in technical.component_assessments) > config["max_challenges"]:
+        return "challenges"
+    if len(operational.production_changes_needed) > config["max_production_changes"]:
+        return "production_changes"
+    return None
 
-async def reflection(state: PackagingEvaluationState) -> PackagingEvaluationState:
+async def reflection(state: PackagingEvaluationState) -> StateUpdate:
     """
     Reflect on the assessments and determine if further iteration is needed.
     """
     # Increment reflection counter
-    state.reflection_counter += 1
+    counter = state.reflection_counter + 1
     
     # If we've reached the maximum number of reflections, move to final score
-    if state.reflection_counter >= 3:
-        state.add_message("reflection", 
-                         "Maximum number of reflections reached (3). Moving to final evaluation.")
-        state.current_node = "final_score"
-        return state
-    
-    prompt = ChatPromptTemplate.from_template("""
+    if counter >= 3:
+        return {
+            "reflection_counter": counter,
+            "messages": [message_from("reflection",
+                                      "Maximum number of reflections reached (3). Moving to final evaluation.")],
+            "current_node": "final_score"
+        }
+    
+    # Skip the model call when the assessments are consistent and unambiguous
+    if REFLECTION_GATE_CONFIG["enabled"]:
+        failed_rule = reflection_gate(state)
+        reflection_gate_stats[failed_rule or "skipped"] += 1
+        if failed_rule is None:
+            return {
+                "reflection_counter": counter,
+                "reflection_notes": ReflectionNotes(
+                    blind_spots=[],
+                    questions=[],
+                    requires_iteration=False,
+                    reflection_summary="Technical and operational assessments are consistent and unambiguous; no blind spots to review.",
+                    assessment_approved=True,
+                    iteration_count=counter
+                ),
+                "messages": [message_from("reflection",
+                                          f"Reflection {counter}/3 skipped: assessments are consistent. Moving to final evaluation.")],
+                "current_node": "final_score"
+            }
+    
+    prompt = prompt_template("""
     # Assessment Reflection
     
     You are a specialized packaging engineer reviewing the technical and operational assessments.
@@ -386,9 +741,6 @@ async def reflection(state: PackagingEvaluationState) -> PackagingEvaluationStat
     Provide a comprehensive reflection on the assessments.
     """)
     
-    # Create a structured output model for reflection notes
-    structured_llm = llm.with_structured_output(ReflectionNotes)
-    
     # Format the assessments for the prompt
     technical_text = state.technical_assessment.technical_summary if state.technical_assessment else "No technical assessment available"
     operational_text = state.operational_assessment.operational_summary if state.operational_assessment else "No operational assessment available"
@@ -405,32 +757,38 @@ async def reflection(state: PackagingEvaluationState) -> PackagingEvaluationStat
         "content": text_message
     }
     
-    # Run the model with structured output
-    reflection = await structured_llm.ainvoke([message])
-    
-    # Update state with reflection notes
-    state.reflection_notes = reflection
-    
-    # Add a message about the reflection
-    state.add_message("reflection", 
-                     f"Reflection {state.reflection_counter}/3 complete. Requires iteration: {reflection.requires_iteration}")
+    # Run the model with structured output, small model first
+    reflection = await structured_call(
+        "reflection", ReflectionNotes, [message], lambda result: validate_reflection(result, state)
+    )
     
     # Determine next node based on reflection
-    if reflection.requires_iteration and state.reflection_counter < 3:
+    if reflection.requires_iteration and counter < 3:
         if reflection.questions:
-            state.current_node = "technical_feasibility"
+            next_node = "technical_feasibility"
         else:
-            state.current_node = "operations"
+            next_node = "operations"
     else:
-        state.current_node = "final_score"
-    
-    return state
+        next_node = "final_score"
+    
+    # Update state with reflection notes and a message about the reflection
+    update = {
+        "reflection_counter": counter,
+        "reflection_notes": reflection,
+        "messages": [message_from("reflection",
+                                  f"Reflection {counter}/3 complete. Requires iteration: {reflection.requires_iteration}")],
+        "current_node": next_node
+    }
+    if next_node == "operations":
+        # Operations is reassessed in full, with the technical results in its prompt
+        update["operational_analyses"] = None
+    return update
 
-async def final_score(state: PackagingEvaluationState) -> PackagingEvaluationState:
+async def final_score(state: PackagingEvaluationState) -> StateUpdate:
     """
     Generate the final evaluation score and recommendations.
     """
-    prompt = ChatPromptTemplate.from_template("""
+    prompt = prompt_template("""
     # Final Evaluation
     
     You are a specialized packaging engineer providing the final evaluation of the concept.
@@ -457,9 +815,6 @@ async def final_score(state: PackagingEvaluationState) -> PackagingEvaluationSta
     Provide a comprehensive final evaluation.
     """)
     
-    # Create a structured output model for final evaluation
-    structured_llm = llm.with_structured_output(FinalEvaluation)
-    
     # Format the assessments and reflection for the prompt
     technical_text = state.technical_assessment.technical_summary if state.technical_assessment else "No technical assessment available"
     operational_text = state.operational_assessment.operational_summary if state.operational_assessment else "No operational assessment available"
@@ -478,20 +833,108 @@ async def final_score(state: PackagingEvaluationState) -> PackagingEvaluationSta
         "content": text_message
     }
     
-    # Run the model with structured output
-    evaluation = await structured_llm.ainvoke([message])
+    # Run the model with structured output, streaming the score and summary first
+    evaluation = await streamed_call(
+        "final_score", FinalEvaluation, [message],
+        lead_fields=("feasibility_score", "go_decision", "executive_summary"),
+        validate=validate_final
+    )
+    
+    # Update state with final evaluation and a message about it
+    return {
+        "final_evaluation": evaluation,
+        "evaluation_score": evaluation.feasibility_score,
+        "final_recommendation": evaluation.executive_summary,
+        "process_complete": True,
+        "messages": [message_from("final_score",
+                                  f"Final evaluation complete. Score: {evaluation.feasibility_score}/10. "
+                                  f"Go decision: {evaluation.go_decision}")]
+    }
+
+def triage_escalation_reason(triage: TriageEvaluation) -> str:
+    """Why a triage result needs the full pipeline, or an empty string if it does not."""
+    low, high = TRIAGE_CONFIG["escalate_scores"]
+    if triage.escalate:
+        return triage.escalation_reason or "Flagged by the model"
+    if low <= triage.feasibility_score <= high:
+        return f"Borderline score ({triage.feasibility_score}/10)"
+    if triage.confidence < TRIAGE_CONFIG["min_confidence"]:
+        return f"Low confidence ({triage.confidence:.2f})"
+    if triage.go_decision != (triage.feasibility_score > high):
+        return "Go decision inconsistent with the score"
+    return ""
+
+async def triage(state: PackagingEvaluationState) -> StateUpdate:
+    """
+    Quick evaluation in a single model call, combining concept breakdown and assessment.
+    Skips human feedback and flags concepts that should get the full evaluation.
+    """
+    prompt = prompt_template("""
+    # Packaging Concept Triage
     
-    # Update state with final evaluation
-    state.final_evaluation = evaluation
-    state.evaluation_score = evaluation.feasibility_score
-    state.final_recommendation = evaluation.executive_summary
-    state.process_complete = True
+    You are a specialized packaging engineer screening a large backlog of early-stage packaging concepts.
     
-    # Add a message about the final evaluation
-    state.add_message("final_score", 
-                     f"Final evaluation complete. Score: {evaluation.feasibility_score}/10. "
-                     f"Go decision: {evaluation.go_decision}")
+    ## Your Task
+    Give a quick but sound feasibility verdict on the concept, and decide whether it deserves a full evaluation.
     
-    return state
-
-
+    ## Packaging Concept
+    {packaging_concept}
+    
+    ## Guidelines
+    - Break the concept down into its main components (name, material, function, requirements)
+    - Provide an overall feasibility score (1-10) with a short rationale, and a go/no-go decision
+    - List only the top three challenges
+    - Rate your confidence in this quick assessment (0.0-1.0)
+    - Escalate concepts with novel materials or processes, borderline feasibility or missing information
+    
+    Keep the summary short; a full evaluation follows for escalated concepts.
+    """)
+    
+    # Create a structured output model for the triage evaluation
+    structured_llm = chat_model().with_structured_output(TriageEvaluation)
+    
+    # Format the messages
+    text_message = prompt.format_messages(packaging_concept=state.packaging_concept)[0].content
+    
+    # Create a list of content parts (text + images)
+    content_parts = [
+        {"type": "text", "text": text_message}
+    ]
+    for image_url in state.concept_images:
+        content_parts.append({
+            "type": "image_url",
+            "image_url": {"url": image_url}
+        })
+    
+    # Create the message
+    message = {
+        "role": "user",
+        "content": content_parts
+    }
+    
+    # Run the model with structured output
+    result = await structured_llm.ainvoke([message])
+    escalation_reason = triage_escalation_reason(result)
+    
+    # Update state with a compact final evaluation and a message about the triage
+    return {
+        "components": result.components,
+        "final_evaluation": FinalEvaluation(
+            feasibility_score=result.feasibility_score,
+            feasibility_summary=result.feasibility_summary,
+            expert_rationale=result.rationale,
+            key_strengths=[],
+            key_challenges=result.key_challenges[:3],
+            improvement_recommendations=[],
+            go_decision=result.go_decision,
+            action_items=["Run the full evaluation"] if escalation_reason else [],
+            executive_summary=result.feasibility_summary
+        ),
+        "evaluation_score": result.feasibility_score,
+        "final_recommendation": result.feasibility_summary,
+        "escalate": bool(escalation_reason),
+        "process_complete": True,
+        "messages": [message_from("triage",
+                                  f"Triage complete. Score: {result.feasibility_score}/10. Go decision: {result.go_decision}. "
+                                  + (f"Escalated: {escalation_reason}" if escalation_reason else "Not escalated."))]
+    }
@@ -0,0 +1,128 @@
+"""Batch triage of a backlog of packaging concepts.
+
+Reads a JSONL file with one concept per line (`packaging_concept`, optional
+`concept_images` and `id`), triages the concepts concurrently with a single
+model call each, and writes one result per line as soon as it is available:
+
+    python -m src.packaging_evaluation.triage concepts.jsonl \\
+        --output triage_results.jsonl --escalated escalated.jsonl --concurrency 16
+
+Concepts flagged for escalation are also written, in the input format, to
+the `--escalated` file so they can be sent through the full pipeline. Lines
+that are not valid JSON are written as error results like failed concepts.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+from src.packaging_evaluation.configuration import TRIAGE_CONFIG
+from src.packaging_evaluation.state import PackagingEvaluationState
+from src.packaging_evaluation import tools
+
+
+async def triage_concept(concept: Dict[str, Any]) -> Dict[str, Any]:
+    """Triage one concept record, returning its compact result."""
+    state = PackagingEvaluationState(
+        packaging_concept=concept["packaging_concept"],
+        concept_images=concept.get("concept_images", []),
+        current_node="triage"
+    )
+    state = state.apply(await tools.triage(state))
+    evaluation = state.final_evaluation
+    return {
+        "id": concept.get("id"),
+        "feasibility_score": evaluation.feasibility_score,
+        "go_decision": evaluation.go_decision,
+        "key_challenges": evaluation.key_challenges,
+        "summary": evaluation.feasibility_summary,
+        "escalate": state.escalate,
+        "components": [component.model_dump() for component in state.components],
+    }
+
+
+def read_concepts(f: TextIO) -> Iterator[Dict[str, Any]]:
+    """Concept records from a JSONL stream, numbering those without an id.
+
+    A line that is not a JSON object is yielded as a record with its `error`
+    instead of raising, so one bad line does not stop the workers sharing
+    the iterator.
+    """
+    for line_number, line in enumerate(f, start=1):
+        if line.strip():
+            try:
+                concept = json.loads(line)
+                if not isinstance(concept, dict):
+                    raise ValueError(f"expected a JSON object, got {type(concept).__name__}")
+            except ValueError as e:
+                yield {"id": line_number, "error": f"Invalid JSON on line {line_number}: {e}"}
+                continue
+            concept.setdefault("id", line_number)
+            yield concept
+
+
+async def triage_batch(
+    concepts: Iterator[Dict[str, Any]],
+    output: TextIO,
+    escalated: Optional[TextIO] = None,
+    concurrency: int = TRIAGE_CONFIG["concurrency"]
+) -> Dict[str, Any]:
+    """Triage concepts with a fixed number of workers, streaming results to `output`.
+
+    Failed concepts are written with an `error` instead of aborting the batch.
+    """
+    counts = {"processed": 0, "escalated": 0, "errors": 0}
+    start = time.perf_counter()
+
+    async def worker():
+        # Workers share the iterator, so the input is read lazily
+        for concept in concepts:
+            try:
+                if "error" in concept:
+                    raise ValueError(concept["error"])
+                result = await triage_concept(concept)
+            except Exception as e:
+                result = {"id": concept.get("id"), "error": str(e)}
+                counts["errors"] += 1
+            counts["processed"] += 1
+            output.write(json.dumps(result) + "\n")
+            if result.get("escalate"):
+                counts["escalated"] += 1
+                if escalated is not None:
+                    escalated.write(json.dumps(concept) + "\n")
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    counts["seconds"] = round(elapsed, 2)
+    counts["concepts_per_s"] = round(counts["processed"] / elapsed, 2) if elapsed else 0.0
+    return counts
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of concepts")
+    parser.add_argument("--output", default="triage_results.jsonl")
+    parser.add_argument("--escalated", help="JSONL file for the concepts that need a full evaluation")
+    parser.add_argument("--concurrency", type=int, default=TRIAGE_CONFIG["concurrency"])
+    args = parser.parse_args(argv)
+
+    with open(args.input, encoding="utf-8") as f, open(args.output, "w", encoding="utf-8") as output:
+        escalated = open(args.escalated, "w", encoding="utf-8") if args.escalated else None
+        try:
+            counts = await triage_batch(read_concepts(f), output, escalated, args.concurrency)
+        finally:
+            if escalated is not None:
+                escalated.close()
+
+    print(
+        f"Triaged {counts['processed']} concepts in {counts['seconds']}s ({counts['concepts_per_s']}/s): "
+        f"{counts['escalated']} escalated, {counts['errors']} errors",
+        file=sys.stderr
+    )
+    return 1 if counts["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
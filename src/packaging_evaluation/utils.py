@@ -6,24 +6,27 @@ def format_evaluation_results(state: PackagingEvaluationState) -> str:
     """Format the evaluation results into a readable string."""
     result = "\n=== PACKAGING EVALUATION RESULTS ===\n"
     result += f"Concept: {state.packaging_concept}\n"
-    result += f"Score: {state.final_score:.2f}/1.0\n"
+    if state.evaluation_score is not None:
+        result += f"Score: {state.evaluation_score:.0f}/10\n"
     result += f"Recommendation: {state.final_recommendation}\n\n"
     
     result += "=== COMPONENTS ===\n"
     for component in state.components:
-        result += f"- {component['name']} ({component['material']}): {component['function']}\n"
+        result += f"- {component.name} ({component.material}): {component.function}\n"
     
     result += "\n=== TECHNICAL ASSESSMENT ===\n"
-    result += f"Overall: {'Feasible' if state.technical_assessment.get('overall_feasible', False) else 'Not Feasible'}\n"
+    technical = state.technical_assessment
+    result += f"Overall: {'Feasible' if technical is not None and technical.overall_feasible else 'Not Feasible'}\n"
     
     result += "\n=== OPERATIONAL ASSESSMENT ===\n"
-    result += f"Supply Chain Impact: {state.operational_assessment.get('supply_chain_impact', 'Unknown')}\n"
-    result += f"Cost Impact: {state.operational_assessment.get('cost_impact', 'Unknown')}\n"
+    operational = state.operational_assessment
+    result += f"Supply Chain Impact: {operational.supply_chain_impact if operational is not None else 'Unknown'}\n"
+    result += f"Cost Impact: {operational.cost_impact if operational is not None else 'Unknown'}\n"
     
     result += "\n=== REFLECTION NOTES ===\n"
-    if state.reflection_notes.get('blind_spots'):
+    if state.reflection_notes is not None and state.reflection_notes.blind_spots:
         result += "Blind Spots:\n"
-        for spot in state.reflection_notes.get('blind_spots', []):
+        for spot in state.reflection_notes.blind_spots:
             result += f"- {spot}\n"
     
     result += "\n=== AGENT MESSAGES ===\n"
@@ -33,16 +36,23 @@ def format_evaluation_results(state: PackagingEvaluationState) -> str:
     return result
 
 def save_evaluation_to_json(state: PackagingEvaluationState, filename: str) -> None:
-    """Save evaluation results to a JSON file."""
+    """Save evaluation results to a JSON file.
+    
+    For many evaluations, the evaluation history (`history.py`) stores and
+    exports them without writing a file per evaluation.
+    """
     data = {
         "concept": state.packaging_concept,
-        "score": state.final_score,
+        "score": state.evaluation_score,
         "recommendation": state.final_recommendation,
-        "components": state.components,
-        "technical_assessment": state.technical_assessment,
-        "operational_assessment": state.operational_assessment,
-        "reflection_notes": state.reflection_notes,
-        "messages": state.messages
+        **state.model_dump(include={
+            "components",
+            "technical_assessment",
+            "operational_assessment",
+            "reflection_notes",
+            "final_evaluation",
+            "messages"
+        })
     }
     
     with open(filename, 'w') as f:
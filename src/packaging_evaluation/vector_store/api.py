@@ -1,15 +1,86 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from typing import List, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import logging
 import os
 from pathlib import Path
 import shutil
 from datetime import datetime
 
+from ..configuration import HYBRID_SEARCH_CONFIG, WARMUP_CONFIG
+from ..metrics import EventLoopLagMonitor
+from ..warmup import Warmup
 from .document_processor import DocumentProcessor, DocumentMetadata
 from .client import VectorStoreClient
+from .search_cache import cache_key
 
-app = FastAPI(title="Packaging Knowledge Base API")
+logger = logging.getLogger(__name__)
+
+# Runtime metrics reported by /metrics
+loop_lag_monitor = EventLoopLagMonitor()
+
+# Initialize clients; the Supabase and embeddings clients are created on first use
+document_processor = DocumentProcessor()
+vector_store = VectorStoreClient()
+
+def _open_database_connection():
+    vector_store.supabase.table("knowledge_base").select("id").limit(1).execute()
+
+def _import_pdf_reader():
+    import fitz  # noqa: F401
+
+# Create the clients in the background after startup; /ready reports when they exist
+warmup = Warmup(timeout=WARMUP_CONFIG["timeout"])
+if WARMUP_CONFIG["enabled"]:
+    warmup.add("supabase_client", lambda: vector_store.supabase, blocking=True)
+    warmup.add("embeddings_client", lambda: vector_store.embeddings, blocking=True)
+    warmup.add("pdf_reader", _import_pdf_reader, blocking=True, required=False)
+    warmup.add("keyword_index", lambda: vector_store.keyword_index, blocking=True, required=False)
+    warmup.add("search_cache", lambda: vector_store.search_cache, blocking=True, required=False)
+    if WARMUP_CONFIG["open_connections"]:
+        warmup.add("database_connection", _open_database_connection, blocking=True, required=False)
+
+def _build_keyword_index():
+    """Fill a keyword index that was never built from the knowledge base (first start)."""
+    index = vector_store.keyword_index
+    # Workers sharing the index file start together; only the first to finish swaps its build in
+    count = index.rebuild(vector_store, unless_built=True) if index is not None else None
+    if count is not None:
+        if vector_store.search_cache is not None:
+            vector_store.search_cache.bump()
+        logger.info("Built the keyword index from %d knowledge base entries", count)
+
+async def _build_keyword_index_in_background():
+    try:
+        await asyncio.to_thread(_build_keyword_index)
+    except Exception as e:
+        logger.warning("Keyword index build failed, /search stays in vector mode: %s", e)
+
+def default_search_mode() -> str:
+    """The configured /search mode, or vector search while the keyword index is not built."""
+    mode = HYBRID_SEARCH_CONFIG["default_mode"]
+    if mode != "vector":
+        index = vector_store.keyword_index
+        if index is None or not index.built:
+            return "vector"
+    return mode
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop_lag_monitor.start()
+    warmup.start()
+    # Not part of the warmup: building a large index can take longer than readiness allows
+    build = asyncio.create_task(_build_keyword_index_in_background()) if HYBRID_SEARCH_CONFIG["build_on_start"] else None
+    yield
+    if build is not None:
+        build.cancel()
+    await warmup.stop()
+    await loop_lag_monitor.stop()
+
+app = FastAPI(title="Packaging Knowledge Base API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -20,10 +91,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize clients
-document_processor = DocumentProcessor()
-vector_store = VectorStoreClient()
-
 # Create upload directory if it doesn't exist
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
@@ -82,12 +149,47 @@ async def search_documents(
     query: str,
     agent_type: Optional[str] = None,
     tags: Optional[List[str]] = None,
-    limit: int = 5
+    limit: int = 5,
+    mode: Optional[str] = None,
+    match_threshold: float = 0.7
 ):
-    """Search for documents in the vector store."""
+    """Search for documents in the vector store.
+    
+    `mode` is `vector` (embedding similarity), `keyword` (BM25 on the local
+    keyword index) or `hybrid` (both, fused by rank); it defaults to
+    `HYBRID_SEARCH_CONFIG["default_mode"]` once the keyword index is built,
+    and to `vector` before. Each result's `score` is the one it was ranked by:
+    the similarity, the BM25 score or the fused RRF score. Results are cached
+    until the knowledge base changes (`SEARCH_CACHE_CONFIG`).
+    """
+    mode = mode or default_search_mode()
+    searches = {
+        "vector": lambda: vector_store.search_similar(query, limit, match_threshold),
+        "keyword": lambda: vector_store.search_keyword(query, limit),
+        "hybrid": lambda: vector_store.search_hybrid(query, limit, match_threshold)
+    }
+    if mode not in searches:
+        raise HTTPException(status_code=400, detail=f"Unknown search mode: {mode} (expected one of {', '.join(searches)})")
     try:
+        # Serve the results of the same search if the knowledge base has not changed since
+        cache = vector_store.search_cache
+        if cache is not None:
+            key = cache_key(
+                query,
+                mode=mode,
+                agent_type=agent_type,
+                tags=tags or [],
+                limit=limit,
+                match_threshold=match_threshold,
+                storage=vector_store.storage
+            )
+            cached = cache.get(key)
+            if cached is not None:
+                return {"results": cached}
+            version = cache.version()
+        
         # Search in vector store
-        results = await vector_store.search_similar(query, limit)
+        results = await searches[mode]()
         
         # Filter results if agent_type or tags are specified
         if agent_type or tags:
@@ -100,17 +202,20 @@ async def search_documents(
                 filtered_results.append(result)
             results = filtered_results
         
-        return {
-            "results": [
-                {
-                    "id": result.id,
-                    "content": result.content,
-                    "metadata": result.metadata,
-                    "similarity": result.metadata.get("similarity", 0)
-                }
-                for result in results
-            ]
-        }
+        results = [
+            {
+                "id": result.id,
+                "content": result.content,
+                "metadata": result.metadata,
+                # Entries found only by keyword have no similarity
+                "similarity": result.metadata.get("similarity"),
+                "score": result.metadata.get("rrf_score", result.metadata.get("bm25", result.metadata.get("similarity")))
+            }
+            for result in results
+        ]
+        if cache is not None:
+            cache.put(key, results, version)
+        return {"results": results}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -161,4 +266,18 @@ async def list_documents(
         return {"documents": list(documents.values())}
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+@app.get("/ready")
+async def ready():
+    """Readiness for load balancers: 503 until the startup warmup has created the clients."""
+    return JSONResponse(warmup.snapshot(), status_code=200 if warmup.ready else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime metrics for load testing and capacity planning."""
+    cache = vector_store.search_cache
+    return {
+        "event_loop_lag": loop_lag_monitor.snapshot(),
+        "search_cache": cache.stats() if cache is not None else None
+    }
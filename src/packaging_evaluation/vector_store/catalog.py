@@ -0,0 +1,219 @@
+"""Bulk import of machine, material and process specs into the knowledge base.
+
+Streams spec records from a JSONL or CSV file, validates them against the
+spec models, and embeds and upserts them by id in batches with a fixed
+number of concurrent workers:
+
+    python -m src.packaging_evaluation.vector_store.catalog machines.csv \\
+        --kind machine --errors rejected.jsonl --batch-size 100 --concurrency 4
+
+The kind of spec (`machine`, `material` or `process`) is given by `--kind`
+or by a `kind` field on each record. In CSV files, list fields hold their
+items separated by ";" or a JSON array. Records that fail validation are
+written to the `--errors` file instead of aborting the import, and records
+already stored unchanged are skipped, so a catalog refresh only embeds the
+specs that changed.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple, Type, Union, get_origin
+
+from pydantic import BaseModel, ValidationError
+
+from ..configuration import CATALOG_IMPORT_CONFIG
+from .client import VectorStoreClient
+from .models import KnowledgeEntry, MachineSpec, MaterialSpec, ProcessSpec
+
+# Spec model of each kind of knowledge entry
+SPEC_MODELS: Dict[str, Type[BaseModel]] = {
+    "machine": MachineSpec,
+    "material": MaterialSpec,
+    "process": ProcessSpec,
+}
+
+# A raw record: a CSV row, or a JSONL line parsed when it is validated
+RawRecord = Union[str, Dict[str, Any]]
+
+# Namespace of the knowledge base ids derived from spec ids that are not UUIDs
+SPEC_ID_NAMESPACE = uuid.UUID("5c1e0d6a-3f4b-4c39-9a57-2f0c8e6b7d41")
+
+
+def entry_id(kind: str, spec_id: str) -> str:
+    """Knowledge base id of a spec: its own id if it is a UUID, else one derived from it."""
+    try:
+        return str(uuid.UUID(spec_id))
+    except ValueError:
+        return str(uuid.uuid5(SPEC_ID_NAMESPACE, f"{kind}:{spec_id}"))
+
+
+def spec_entry(kind: str, spec: BaseModel) -> KnowledgeEntry:
+    """Knowledge entry of a spec, with the same metadata as `VectorStoreClient.add_machine` and co."""
+    metadata = spec.model_dump(exclude={"id", "specifications", "embedding"})
+    metadata["spec_id"] = spec.id
+    return KnowledgeEntry(id=entry_id(kind, spec.id), type=kind, content=spec.specifications, metadata=metadata)
+
+
+def _list_fields(model: Type[BaseModel]) -> List[str]:
+    return [name for name, field in model.model_fields.items() if get_origin(field.annotation) is list]
+
+
+def _parse_list(value: Any) -> Any:
+    """A list field from a CSV cell: a JSON array or items separated by ";"."""
+    if not isinstance(value, str):
+        return value
+    value = value.strip()
+    if value.startswith("["):
+        return json.loads(value)
+    return [item.strip() for item in value.split(";") if item.strip()]
+
+
+def read_records(f: TextIO, format: str) -> Iterator[Tuple[int, RawRecord]]:
+    """Raw records of a JSONL or CSV stream, with their line numbers.
+
+    JSONL lines are yielded unparsed, so that a malformed line is rejected
+    with the other invalid records instead of stopping the workers sharing
+    the iterator.
+    """
+    if format == "csv":
+        reader = csv.DictReader(f)
+        for record in reader:
+            yield reader.line_num, {key: value for key, value in record.items() if key is not None}
+    else:
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                yield line_number, line.strip()
+
+
+def validate_record(record: RawRecord, kind: Optional[str] = None) -> Tuple[str, BaseModel]:
+    """The kind and validated spec of a record or JSONL line; raises ValueError if it is invalid."""
+    if isinstance(record, str):
+        record = json.loads(record)
+    if not isinstance(record, dict):
+        raise ValueError(f"Expected a JSON object, got {type(record).__name__}")
+    record = dict(record)
+    kind = record.pop("kind", None) or kind
+    if kind not in SPEC_MODELS:
+        raise ValueError(f"Unknown spec kind: {kind!r} (expected one of {', '.join(SPEC_MODELS)})")
+    model = SPEC_MODELS[kind]
+    list_fields = _list_fields(model)
+    # Empty CSV cells are empty lists, or missing values for the other fields
+    record = {key: value for key, value in record.items() if value not in ("", None) or key in list_fields}
+    for name in list_fields:
+        if name in record:
+            record[name] = _parse_list(record[name] or "")
+    # Embeddings are computed on import, never taken from the file
+    record.pop("embedding", None)
+    return kind, model.model_validate(record)
+
+
+def _batches(
+    records: Iterator[Tuple[int, RawRecord]],
+    kind: Optional[str],
+    batch_size: int,
+    counts: Dict[str, Any],
+    errors: Optional[TextIO]
+) -> Iterator[List[KnowledgeEntry]]:
+    """Batches of knowledge entries from raw records, writing the invalid ones to `errors`."""
+    batch: Dict[str, KnowledgeEntry] = {}
+    for line_number, record in records:
+        counts["read"] += 1
+        try:
+            entry = spec_entry(*validate_record(record, kind))
+        except (ValueError, TypeError, ValidationError) as e:
+            counts["invalid"] += 1
+            if errors is not None:
+                errors.write(json.dumps({"line": line_number, "error": str(e), "record": record}) + "\n")
+            continue
+        # A later record with the same id replaces the earlier one
+        batch[entry.id] = entry
+        if len(batch) >= batch_size:
+            yield list(batch.values())
+            batch = {}
+    if batch:
+        yield list(batch.values())
+
+
+async def import_catalog(
+    records: Iterator[Tuple[int, RawRecord]],
+    client: VectorStoreClient,
+    kind: Optional[str] = None,
+    errors: Optional[TextIO] = None,
+    batch_size: int = CATALOG_IMPORT_CONFIG["batch_size"],
+    concurrency: int = CATALOG_IMPORT_CONFIG["concurrency"],
+    skip_unchanged: bool = True
+) -> Dict[str, Any]:
+    """Validate, embed and upsert spec records in batches with a fixed number of workers.
+
+    Invalid records and failed batches are counted (and written to `errors`)
+    instead of aborting the import.
+    """
+    counts = {"read": 0, "imported": 0, "unchanged": 0, "invalid": 0, "failed": 0}
+    start = time.perf_counter()
+    batches = _batches(records, kind, batch_size, counts, errors)
+
+    async def worker():
+        # Workers share the generator, so the input is read lazily
+        for batch in batches:
+            try:
+                imported, unchanged = await client.upsert_knowledge_entries(batch, skip_unchanged=skip_unchanged)
+            except Exception as e:
+                counts["failed"] += len(batch)
+                if errors is not None:
+                    for entry in batch:
+                        errors.write(json.dumps({"spec_id": entry.metadata["spec_id"], "error": str(e)}) + "\n")
+                continue
+            counts["imported"] += imported
+            counts["unchanged"] += unchanged
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    counts["seconds"] = round(elapsed, 2)
+    counts["records_per_s"] = round(counts["read"] / elapsed, 2) if elapsed else 0.0
+    return counts
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL or CSV file of specs")
+    parser.add_argument("--kind", choices=sorted(SPEC_MODELS), help="Kind of every spec, unless a record has a `kind`")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input format (default: from the file extension)")
+    parser.add_argument("--errors", help="JSONL file for the rejected records")
+    parser.add_argument("--batch-size", type=int, default=CATALOG_IMPORT_CONFIG["batch_size"])
+    parser.add_argument("--concurrency", type=int, default=CATALOG_IMPORT_CONFIG["concurrency"])
+    parser.add_argument("--force", action="store_true", help="Re-embed and upsert unchanged specs too")
+    args = parser.parse_args(argv)
+
+    format = args.format or ("csv" if Path(args.input).suffix.lower() == ".csv" else "jsonl")
+    with open(args.input, encoding="utf-8", newline="") as f:
+        errors = open(args.errors, "w", encoding="utf-8") if args.errors else None
+        try:
+            counts = await import_catalog(
+                read_records(f, format),
+                VectorStoreClient(),
+                kind=args.kind,
+                errors=errors,
+                batch_size=args.batch_size,
+                concurrency=args.concurrency,
+                skip_unchanged=not args.force
+            )
+        finally:
+            if errors is not None:
+                errors.close()
+
+    print(
+        f"Read {counts['read']} specs in {counts['seconds']}s ({counts['records_per_s']}/s): "
+        f"{counts['imported']} imported, {counts['unchanged']} unchanged, "
+        f"{counts['invalid']} invalid, {counts['failed']} failed",
+        file=sys.stderr
+    )
+    return 1 if counts["invalid"] or counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,30 +1,137 @@
-from typing import List, Optional, Dict, Any
+from typing import TYPE_CHECKING, List, Optional, Dict, Any, Sequence, Tuple
+import asyncio
+import hashlib
 import os
-from supabase import create_client, Client
-from langchain_openai import OpenAIEmbeddings
+import threading
+from ..cassette import wrap_embeddings
+from ..configuration import ANN_CONFIG, EMBEDDING_CONFIG, HYBRID_SEARCH_CONFIG, SEARCH_CACHE_CONFIG
+from .keyword_index import KeywordIndex
 from .models import KnowledgeEntry, MachineSpec, MaterialSpec, ProcessSpec
+from .quantization import BINARY, FLOAT16, FLOAT32, STORAGE_TYPES, binary_quantize
+from .search_cache import SearchCache
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+def reciprocal_rank_fusion(rankings: Sequence[List[KnowledgeEntry]], k: int = 60) -> List[KnowledgeEntry]:
+    """Entries of several rankings ordered by the sum of 1 / (k + rank) over the rankings listing them.
+    
+    Scores of the different retrievers are not comparable, so only ranks are
+    used; the fused score is kept as `rrf_score` in the metadata.
+    """
+    scores: Dict[str, float] = {}
+    entries: Dict[str, KnowledgeEntry] = {}
+    for ranking in rankings:
+        for rank, entry in enumerate(ranking, start=1):
+            scores[entry.id] = scores.get(entry.id, 0.0) + 1.0 / (k + rank)
+            if entry.id in entries:
+                # Keep the scores of each retriever
+                entry = entry.model_copy(update={"metadata": {**entries[entry.id].metadata, **entry.metadata}})
+            entries[entry.id] = entry
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [
+        entries[entry_id].model_copy(update={"metadata": {**entries[entry_id].metadata, "rrf_score": scores[entry_id]}})
+        for entry_id in ordered
+    ]
 
 class VectorStoreClient:
     """Client for interacting with the vector store."""
     
-    def __init__(self):
-        """Initialize the vector store client."""
-        # Initialize Supabase client
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_KEY")
+    def __init__(
+        self,
+        supabase: Optional["Client"] = None,
+        embeddings: Optional[Any] = None,
+        storage: Optional[str] = None,
+        rescore: Optional[bool] = None,
+        keyword_index: Optional[KeywordIndex] = None,
+        search_cache: Optional[SearchCache] = None
+    ):
+        """Initialize the vector store client.
         
-        if not supabase_url or not supabase_key:
-            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
-        
-        self.supabase: Client = create_client(supabase_url, supabase_key)
-        
-        # Initialize OpenAI embeddings
-        self.embeddings = OpenAIEmbeddings()
+        Both clients can be injected (e.g. a local store and fake embeddings for
+        offline benchmarks); otherwise they are created from the environment on
+        first use, so constructing this client is cheap and never fails.
+        `storage` and `rescore` default to `EMBEDDING_CONFIG`, the keyword
+        index to the one of `HYBRID_SEARCH_CONFIG` and the search cache to the
+        one of `SEARCH_CACHE_CONFIG`.
+        """
+        self._supabase = supabase
+        self._embeddings = embeddings
+        self._keyword_index = keyword_index
+        self._search_cache = search_cache
+        self._lock = threading.Lock()
+        self.storage = storage or EMBEDDING_CONFIG["storage"]
+        self.rescore = EMBEDDING_CONFIG["rescore"] if rescore is None else rescore
+        if self.storage not in STORAGE_TYPES:
+            raise ValueError(f"Unknown embedding storage: {self.storage}")
+    
+    @property
+    def supabase(self) -> "Client":
+        with self._lock:
+            if self._supabase is None:
+                # Initialize Supabase client
+                from supabase import create_client
+                
+                supabase_url = os.getenv("SUPABASE_URL")
+                supabase_key = os.getenv("SUPABASE_KEY")
+                
+                if not supabase_url or not supabase_key:
+                    raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
+                
+                self._supabase = create_client(supabase_url, supabase_key)
+            return self._supabase
+    
+    @property
+    def embeddings(self) -> Any:
+        with self._lock:
+            if self._embeddings is None:
+                # Initialize OpenAI embeddings (recorded or replayed when LLM_CASSETTE_MODE is set)
+                from langchain_openai import OpenAIEmbeddings
+                
+                self._embeddings = wrap_embeddings(lambda: OpenAIEmbeddings(
+                    model=EMBEDDING_CONFIG["model"],
+                    dimensions=EMBEDDING_CONFIG["dimensions"]
+                ))
+            return self._embeddings
+    
+    @property
+    def keyword_index(self) -> Optional[KeywordIndex]:
+        """Local BM25 index of the entries written through this client, if enabled."""
+        with self._lock:
+            if self._keyword_index is None and HYBRID_SEARCH_CONFIG["keyword_index"]:
+                self._keyword_index = KeywordIndex(HYBRID_SEARCH_CONFIG["path"])
+            return self._keyword_index
+    
+    @property
+    def search_cache(self) -> Optional[SearchCache]:
+        """Cache of search results, invalidated by every write through this client, if enabled."""
+        with self._lock:
+            if self._search_cache is None and SEARCH_CACHE_CONFIG["enabled"]:
+                self._search_cache = SearchCache(SEARCH_CACHE_CONFIG["max_entries"], SEARCH_CACHE_CONFIG["path"])
+            return self._search_cache
+    
+    def _knowledge_changed(self):
+        """Invalidate the search results cached before a write or delete."""
+        if self.search_cache is not None:
+            self.search_cache.bump()
+    
+    def _embedding_columns(self, embedding: List[float]) -> Dict[str, Any]:
+        """Columns storing an embedding, for the configured storage."""
+        columns = {}
+        # Full-precision vectors are kept for exact search and for rescoring
+        if self.storage == FLOAT32 or self.rescore:
+            columns["embedding"] = embedding
+        if self.storage == FLOAT16:
+            columns["embedding_half"] = embedding
+        elif self.storage == BINARY:
+            columns["embedding_bits"] = binary_quantize(embedding)
+        return columns
     
     async def add_knowledge_entry(self, entry: KnowledgeEntry) -> KnowledgeEntry:
         """Add a new knowledge entry to the vector store."""
         # Generate embedding for the content
-        embedding = await self.embeddings.ainvoke(entry.content)
+        embedding = await self.embeddings.aembed_query(entry.content)
         
         # Prepare data for insertion
         data = {
@@ -32,7 +139,7 @@ class VectorStoreClient:
             "type": entry.type,
             "content": entry.content,
             "metadata": entry.metadata,
-            "embedding": embedding,
+            **self._embedding_columns(embedding),
             "created_at": entry.created_at.isoformat(),
             "updated_at": entry.updated_at.isoformat()
         }
@@ -40,24 +147,164 @@ class VectorStoreClient:
         # Insert into Supabase
         result = self.supabase.table("knowledge_base").insert(data).execute()
         
+        # Index the entry for keyword search, off the event loop
+        if self.keyword_index is not None:
+            await asyncio.to_thread(self.keyword_index.add, [entry])
+        self._knowledge_changed()
+        
         return KnowledgeEntry(**result.data[0])
     
-    async def search_similar(self, query: str, limit: int = 5) -> List[KnowledgeEntry]:
+    async def upsert_knowledge_entries(self, entries: List[KnowledgeEntry], skip_unchanged: bool = True) -> Tuple[int, int]:
+        """Add or replace knowledge entries by id, with one embedding call and one request.
+        
+        Entries stored with the same content and metadata are skipped when
+        `skip_unchanged` (a hash of the content is kept in the metadata), so
+        re-importing an unchanged catalog costs no embeddings. Returns the
+        number of entries upserted and the number skipped.
+        """
+        # Keep a hash of the content with the metadata to detect unchanged entries
+        entries = [
+            entry.model_copy(update={"metadata": {
+                **entry.metadata,
+                "content_hash": hashlib.sha256(entry.content.encode("utf-8")).hexdigest()
+            }})
+            for entry in entries
+        ]
+        
+        # Drop the entries already stored unchanged; database calls are blocking,
+        # so they run in a thread and concurrent batches overlap
+        skipped = 0
+        if skip_unchanged and entries:
+            result = await asyncio.to_thread(self.supabase.table("knowledge_base").select("id", "metadata").in_(
+                "id", [entry.id for entry in entries]
+            ).execute)
+            stored = {row["id"]: row["metadata"] for row in result.data}
+            changed = [entry for entry in entries if stored.get(entry.id) != entry.metadata]
+            skipped, entries = len(entries) - len(changed), changed
+        if not entries:
+            return 0, skipped
+        
+        # Generate the embeddings in one batched call
+        embeddings = await self.embeddings.aembed_documents([entry.content for entry in entries])
+        await asyncio.to_thread(self.write_knowledge_entries, entries, embeddings)
+        return len(entries), skipped
+    
+    def write_knowledge_entries(self, entries: List[KnowledgeEntry], embeddings: List[List[float]]) -> None:
+        """Upsert entries with their precomputed embeddings by id, in one request; blocking."""
+        # Upsert without sending back the rows; created_at keeps its stored value
+        # for existing entries and the database trigger sets updated_at
+        rows = [
+            {
+                "id": entry.id,
+                "type": entry.type,
+                "content": entry.content,
+                "metadata": entry.metadata,
+                **self._embedding_columns(embedding)
+            }
+            for entry, embedding in zip(entries, embeddings)
+        ]
+        self.supabase.table("knowledge_base").upsert(rows, returning="minimal").execute()
+        
+        # Index the entries for keyword search
+        if self.keyword_index is not None:
+            self.keyword_index.add(entries)
+        self._knowledge_changed()
+    
+    def delete_knowledge_entries(self, ids: List[str]) -> None:
+        """Delete entries by id, from the knowledge base and the keyword index; blocking."""
+        if not ids:
+            return
+        self.supabase.table("knowledge_base").delete().in_("id", list(ids)).execute()
+        if self.keyword_index is not None:
+            self.keyword_index.remove(ids)
+        self._knowledge_changed()
+    
+    async def search_similar(self, query: str, limit: int = 5, match_threshold: float = 0.7) -> List[KnowledgeEntry]:
         """Search for similar knowledge entries using vector similarity."""
         # Generate embedding for the query
-        query_embedding = await self.embeddings.ainvoke(query)
+        query_embedding = await self.embeddings.aembed_query(query)
+        return await self.search_by_embedding(query_embedding, limit, match_threshold)
+    
+    async def search_keyword(self, query: str, limit: int = 5) -> List[KnowledgeEntry]:
+        """Search the local keyword index (BM25), for exact terms such as identifiers."""
+        if self.keyword_index is None:
+            return []
+        return await asyncio.to_thread(self.keyword_index.search, query, limit)
+    
+    async def search_hybrid(self, query: str, limit: int = 5, match_threshold: float = 0.7) -> List[KnowledgeEntry]:
+        """Keyword and vector search run concurrently, fused with reciprocal rank fusion."""
+        candidates = max(limit, HYBRID_SEARCH_CONFIG["candidates"])
+        vector_results, keyword_results = await asyncio.gather(
+            self.search_similar(query, candidates, match_threshold),
+            self.search_keyword(query, candidates)
+        )
+        return reciprocal_rank_fusion([vector_results, keyword_results], HYBRID_SEARCH_CONFIG["rrf_k"])[:limit]
+    
+    async def search_by_embedding(
+        self,
+        query_embedding: List[float],
+        limit: int = 5,
+        match_threshold: float = 0.7,
+        storage: Optional[str] = None,
+        rescore: Optional[bool] = None,
+        ef_search: Optional[int] = None,
+        exact: bool = False
+    ) -> List[KnowledgeEntry]:
+        """Search with a query embedding, on the configured storage unless `storage` is given.
+        
+        Compact storage ranks on float16 or binary vectors; with rescoring, the
+        best `EMBEDDING_CONFIG["rescore_candidates"]` times `limit` candidates
+        are re-ranked on their full-precision vectors. `ef_search` (default
+        `ANN_CONFIG["ef_search"]`) sets the HNSW index's recall/latency trade-off;
+        it needs migration 003 and is only sent when set. `exact` scans every
+        full-precision vector instead (migration 004), as a reference for recall.
+        """
+        ef_search = ef_search or ANN_CONFIG["ef_search"]
+        storage = storage or self.storage
+        rescore = self.rescore if rescore is None else rescore
+        # The match functions only take ef_search from migration 003 on
+        options = {"ef_search": ef_search} if ef_search else {}
         
         # Perform vector similarity search in Supabase
-        result = self.supabase.rpc(
-            "match_knowledge",
-            {
-                "query_embedding": query_embedding,
-                "match_threshold": 0.7,
-                "match_count": limit
-            }
-        ).execute()
+        if exact:
+            result = self.supabase.rpc(
+                "match_knowledge_exact",
+                {
+                    "query_embedding": query_embedding,
+                    "match_threshold": match_threshold,
+                    "match_count": limit
+                }
+            ).execute()
+        elif storage == FLOAT32:
+            result = self.supabase.rpc(
+                "match_knowledge",
+                {
+                    "query_embedding": query_embedding,
+                    "match_threshold": match_threshold,
+                    "match_count": limit,
+                    **options
+                }
+            ).execute()
+        else:
+            result = self.supabase.rpc(
+                "match_knowledge_compact",
+                {
+                    "query_embedding": query_embedding,
+                    "storage": storage,
+                    "match_threshold": match_threshold,
+                    "match_count": limit,
+                    "candidate_count": limit * EMBEDDING_CONFIG["rescore_candidates"] if rescore else limit,
+                    "rescore": rescore,
+                    **options
+                }
+            ).execute()
         
-        return [KnowledgeEntry(**item) for item in result.data]
+        # match_knowledge returns the similarity as a separate column; keep it
+        # with the entry metadata where the API layer expects it
+        return [
+            KnowledgeEntry(**{**item, "metadata": {**item["metadata"], "similarity": item["similarity"]}})
+            for item in result.data
+        ]
     
     async def add_machine(self, machine: MachineSpec) -> MachineSpec:
         """Add a new machine specification to the vector store."""
@@ -1,12 +1,19 @@
 from typing import List, Optional, Dict, Any
 import os
 from pathlib import Path
-import fitz  # PyMuPDF
 from pydantic import BaseModel, Field
 from datetime import datetime
 import hashlib
+import uuid
 from .models import KnowledgeEntry
 
+# Namespace of the knowledge base ids of document chunks, derived from the file hash and chunk index
+CHUNK_ID_NAMESPACE = uuid.UUID("9b0f6c42-7d1e-4a85-b3c6-51e8a2d4f907")
+
+def chunk_id(file_hash: str, index: int) -> str:
+    """Knowledge base id (a UUID) of a document chunk, stable across re-ingestion of the same file."""
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{file_hash}:{index}"))
+
 class DocumentMetadata(BaseModel):
     """Metadata for a document."""
     filename: str
@@ -37,6 +44,8 @@ class DocumentProcessor:
     
     def _extract_text_from_pdf(self, file_path: str) -> List[str]:
         """Extract text from a PDF file."""
+        import fitz  # PyMuPDF, imported on first use as it is slow to load
+        
         doc = fitz.open(file_path)
         text_chunks = []
         
@@ -112,7 +121,7 @@ class DocumentProcessor:
         entries = []
         for i, chunk in enumerate(text_chunks):
             entry = KnowledgeEntry(
-                id=f"{file_hash}_{i}",
+                id=chunk_id(file_hash, i),
                 type="document",
                 content=chunk,
                 metadata={
@@ -123,6 +132,7 @@ class DocumentProcessor:
                     "tags": metadata.tags,
                     "agent_type": metadata.agent_type,
                     "description": metadata.description,
+                    "file_hash": file_hash,
                     "chunk_index": i,
                     "total_chunks": len(text_chunks)
                 }
@@ -0,0 +1,335 @@
+"""Bulk ingestion of a document library: a directory tree or a zip archive.
+
+    python -m src.packaging_evaluation.vector_store.ingest manuals/ \\
+        --agent-type technical --tags manuals --manifest ingest_manifest.jsonl
+
+PDF and text files go through a pipeline of three stages, so that parsing,
+embedding and writing overlap:
+
+1. parsing: `DocumentProcessor` chunks files in a pool of processes;
+2. embedding: chunks of any number of files are embedded in batches, a few
+   batches at a time;
+3. writing: embedded chunks are upserted by id in batches.
+
+A file is recorded in the manifest (one JSON line per file, keyed by its
+content hash) once all of its chunks are written. Files already in the
+manifest are skipped, so an interrupted ingestion resumes where it stopped
+and re-running it on a grown library only ingests the new files.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set
+
+from ..configuration import INGEST_CONFIG
+from .client import VectorStoreClient
+from .document_processor import DocumentMetadata, DocumentProcessor
+from .models import KnowledgeEntry
+
+logger = logging.getLogger(__name__)
+
+# File types `DocumentProcessor` can parse
+SUPPORTED_SUFFIXES = (".pdf", ".txt")
+
+
+def discover(source: Path) -> Iterator[Dict[str, Any]]:
+    """Supported files of a directory tree or zip archive, in name order."""
+    if source.is_dir():
+        for path in sorted(source.rglob("*")):
+            if path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES:
+                yield {"name": path.relative_to(source).as_posix(), "path": str(path), "member": None}
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            names = sorted(
+                info.filename for info in archive.infolist()
+                if not info.is_dir() and Path(info.filename).suffix.lower() in SUPPORTED_SUFFIXES
+            )
+        for name in names:
+            yield {"name": name, "path": str(source), "member": name}
+    else:
+        raise ValueError(f"Not a directory or zip archive: {source}")
+
+
+def _hashed(source: Path) -> Iterator[Dict[str, Any]]:
+    """Files of `source` with their size and content hash."""
+    archive = zipfile.ZipFile(source) if not source.is_dir() else None
+    try:
+        for document in discover(source):
+            sha256_hash = hashlib.sha256()
+            size = 0
+            with (archive.open(document["member"]) if archive else open(document["path"], "rb")) as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    sha256_hash.update(block)
+                    size += len(block)
+            yield {**document, "sha256": sha256_hash.hexdigest(), "size": size}
+    finally:
+        if archive is not None:
+            archive.close()
+
+
+def parse_document(
+    document: Dict[str, Any],
+    agent_type: str,
+    tags: Sequence[str],
+    description: Optional[str],
+    chunk_size: int,
+    chunk_overlap: int
+) -> List[KnowledgeEntry]:
+    """Chunks of one file as knowledge entries; runs in a parsing process."""
+    processor = DocumentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    metadata = DocumentMetadata(
+        filename=document["name"],
+        file_type=Path(document["name"]).suffix.lower(),
+        file_size=document["size"],
+        tags=list(tags),
+        agent_type=agent_type,
+        description=description
+    )
+    if document["member"] is None:
+        return processor.process_document(document["path"], metadata)
+
+    # Archive members are parsed from a temporary copy
+    with zipfile.ZipFile(document["path"]) as archive, tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / Path(document["member"]).name
+        with archive.open(document["member"]) as member, open(path, "wb") as f:
+            shutil.copyfileobj(member, f)
+        return processor.process_document(str(path), metadata)
+
+
+def load_manifest(path: Optional[str]) -> Set[str]:
+    """Content hashes of the files recorded in a manifest."""
+    if path is None or not Path(path).exists():
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {json.loads(line)["sha256"] for line in f if line.strip()}
+
+
+async def ingest_library(
+    source: Path,
+    client: VectorStoreClient,
+    manifest: Optional[str] = INGEST_CONFIG["manifest"],
+    agent_type: str = "technical",
+    tags: Sequence[str] = (),
+    description: Optional[str] = None,
+    parse_workers: int = INGEST_CONFIG["parse_workers"],
+    embed_batch_size: int = INGEST_CONFIG["embed_batch_size"],
+    embed_concurrency: int = INGEST_CONFIG["embed_concurrency"],
+    write_batch_size: int = INGEST_CONFIG["write_batch_size"],
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    progress_interval: float = INGEST_CONFIG["progress_interval"]
+) -> Dict[str, Any]:
+    """Parse, embed and write every new file of a library, recording the finished ones in `manifest`.
+
+    Files that fail to parse, embed or write are counted and logged instead
+    of aborting the ingestion; they are not recorded, so the next run
+    retries them.
+    """
+    if not source.is_dir() and not zipfile.is_zipfile(source):
+        raise ValueError(f"Not a directory or zip archive: {source}")
+    counts = {"files": 0, "skipped": 0, "failed": 0, "chunks": 0}
+    start = time.perf_counter()
+    done = load_manifest(manifest)
+    loop = asyncio.get_running_loop()
+
+    # Bounded queues between the stages, so a slow stage holds back the ones before it
+    parsed: asyncio.Queue = asyncio.Queue(maxsize=2 * parse_workers)
+    embedding: asyncio.Queue = asyncio.Queue(maxsize=2 * embed_concurrency)
+    writing: asyncio.Queue = asyncio.Queue(maxsize=2 * embed_concurrency)
+
+    # Chunks not yet written per file, and the files that failed
+    pending: Dict[str, int] = {}
+    failed: Set[str] = set()
+    manifest_file = open(manifest, "a", encoding="utf-8") if manifest else None
+
+    def snapshot() -> Dict[str, Any]:
+        elapsed = time.perf_counter() - start
+        return {
+            **counts,
+            "seconds": round(elapsed, 2),
+            "files_per_s": round(counts["files"] / elapsed, 2) if elapsed else 0.0,
+            "chunks_per_s": round(counts["chunks"] / elapsed, 2) if elapsed else 0.0,
+        }
+
+    def finish(document: Dict[str, Any]):
+        counts["files"] += 1
+        if manifest_file is not None:
+            manifest_file.write(json.dumps({
+                "sha256": document["sha256"],
+                "name": document["name"],
+                "chunks": document["chunks"],
+                "ingested_at": datetime.now(timezone.utc).isoformat()
+            }) + "\n")
+            manifest_file.flush()
+
+    def fail(documents: List[Dict[str, Any]], error: Exception):
+        for document in documents:
+            if document["sha256"] not in failed:
+                failed.add(document["sha256"])
+                counts["failed"] += 1
+                logger.warning("Failed to ingest %s: %s", document["name"], error)
+
+    async def parse(pool: ProcessPoolExecutor):
+        # Hash files in a thread and keep a few parses queued per process
+        documents = _hashed(source)
+        slots = asyncio.Semaphore(2 * parse_workers)
+        tasks = []
+        seen = set(done)
+
+        async def parse_one(document: Dict[str, Any]):
+            try:
+                entries = await loop.run_in_executor(pool, partial(
+                    parse_document, document, agent_type, tags, description, chunk_size, chunk_overlap
+                ))
+            except Exception as e:
+                fail([document], e)
+            else:
+                await parsed.put((document, entries))
+            finally:
+                slots.release()
+
+        while (document := await asyncio.to_thread(next, documents, None)) is not None:
+            # Files already ingested, or seen earlier in this run under another name
+            if document["sha256"] in seen:
+                counts["skipped"] += 1
+                continue
+            seen.add(document["sha256"])
+            await slots.acquire()
+            tasks.append(asyncio.create_task(parse_one(document)))
+        await asyncio.gather(*tasks)
+        await parsed.put(None)
+
+    async def batch():
+        # Chunks of several files share embedding batches
+        chunks = []
+        while (item := await parsed.get()) is not None:
+            document, entries = item
+            document["chunks"] = pending[document["sha256"]] = len(entries)
+            if not entries:
+                finish(document)
+            for entry in entries:
+                chunks.append((document, entry))
+                if len(chunks) >= embed_batch_size:
+                    await embedding.put(chunks)
+                    chunks = []
+        if chunks:
+            await embedding.put(chunks)
+        for _ in range(embed_concurrency):
+            await embedding.put(None)
+
+    async def embed():
+        while (chunks := await embedding.get()) is not None:
+            try:
+                vectors = await client.embeddings.aembed_documents([entry.content for _, entry in chunks])
+            except Exception as e:
+                fail([document for document, _ in chunks], e)
+                continue
+            await writing.put(list(zip(chunks, vectors)))
+
+    async def write():
+        rows = []
+
+        async def flush():
+            try:
+                await asyncio.to_thread(
+                    client.write_knowledge_entries,
+                    [entry for (_, entry), _ in rows],
+                    [vector for _, vector in rows]
+                )
+            except Exception as e:
+                fail([document for (document, _), _ in rows], e)
+                return
+            counts["chunks"] += len(rows)
+            # A file is finished once its last chunk is written
+            for (document, _), _ in rows:
+                pending[document["sha256"]] -= 1
+                if pending[document["sha256"]] == 0 and document["sha256"] not in failed:
+                    finish(document)
+
+        while (embedded := await writing.get()) is not None:
+            rows.extend(embedded)
+            if len(rows) >= write_batch_size:
+                await flush()
+                rows = []
+        if rows:
+            await flush()
+
+    async def embed_all():
+        await asyncio.gather(*(embed() for _ in range(embed_concurrency)))
+        await writing.put(None)
+
+    async def report():
+        while True:
+            await asyncio.sleep(progress_interval)
+            progress(snapshot())
+
+    reporter = asyncio.create_task(report()) if progress is not None else None
+    try:
+        with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+            await asyncio.gather(parse(pool), batch(), embed_all(), write())
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+        if manifest_file is not None:
+            manifest_file.close()
+    return snapshot()
+
+
+def _print_progress(counts: Dict[str, Any]):
+    print(
+        f"{counts['files']} files, {counts['chunks']} chunks in {counts['seconds']}s "
+        f"({counts['files_per_s']} files/s, {counts['chunks_per_s']} chunks/s), "
+        f"{counts['skipped']} skipped, {counts['failed']} failed",
+        file=sys.stderr
+    )
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Directory or zip archive of PDF and text files")
+    parser.add_argument("--agent-type", default="technical")
+    parser.add_argument("--tags", nargs="*", default=[])
+    parser.add_argument("--description")
+    parser.add_argument("--manifest", default=INGEST_CONFIG["manifest"], help="JSONL file of the ingested files")
+    parser.add_argument("--parse-workers", type=int, default=INGEST_CONFIG["parse_workers"])
+    parser.add_argument("--embed-batch-size", type=int, default=INGEST_CONFIG["embed_batch_size"])
+    parser.add_argument("--embed-concurrency", type=int, default=INGEST_CONFIG["embed_concurrency"])
+    parser.add_argument("--write-batch-size", type=int, default=INGEST_CONFIG["write_batch_size"])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    counts = await ingest_library(
+        Path(args.source),
+        VectorStoreClient(),
+        manifest=args.manifest,
+        agent_type=args.agent_type,
+        tags=args.tags,
+        description=args.description,
+        parse_workers=args.parse_workers,
+        embed_batch_size=args.embed_batch_size,
+        embed_concurrency=args.embed_concurrency,
+        write_batch_size=args.write_batch_size,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        progress=_print_progress
+    )
+    _print_progress(counts)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
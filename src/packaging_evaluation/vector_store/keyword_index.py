@@ -0,0 +1,258 @@
+"""Local BM25 keyword index of the knowledge base.
+
+Embeddings match meaning rather than spelling, so lookups of exact
+identifiers (resin grades, machine model numbers, ISO test codes) do poorly
+on vector search alone. `VectorStoreClient` indexes every entry it writes in
+a SQLite FTS5 table, ranked with BM25, and its hybrid search fuses both
+rankings.
+
+Entries written by other deployments, or before the index existed, are
+added by rebuilding it from the knowledge base, which the API also does on
+its first start:
+
+    python -m src.packaging_evaluation.vector_store.keyword_index rebuild
+"""
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..configuration import HYBRID_SEARCH_CONFIG
+from .models import KnowledgeEntry
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    type TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries USING fts5(content, keywords);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Entries read by a rebuild, private to its connection until swapped in
+STAGING_SCHEMA = """
+DROP TABLE IF EXISTS temp.staged;
+CREATE TEMP TABLE staged (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    content TEXT NOT NULL,
+    keywords TEXT NOT NULL
+);
+"""
+
+# Metadata added by searches and imports, not indexed
+_UNINDEXED_KEYS = ("similarity", "bm25", "rrf_score", "content_hash", "file_hash")
+
+
+def _keywords(metadata: Dict[str, Any]) -> str:
+    """Text values of the metadata (names, types, tags, capabilities...), indexed with the content."""
+    values = []
+    for key, value in metadata.items():
+        if key in _UNINDEXED_KEYS:
+            continue
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, str):
+                values.append(item)
+    return " ".join(values)
+
+
+def match_query(query: str) -> str:
+    """FTS5 query for free text: any of its terms, each term as a phrase of its tokens.
+
+    An identifier such as `ISO 11607-1` or `HD6719-BA` is split into tokens by
+    the index; matching its tokens as a phrase ranks exact occurrences first.
+    """
+    terms = [term for term in query.split() if re.search(r"\w", term)]
+    return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _document(entry: KnowledgeEntry) -> Tuple[str, str, str, str, str]:
+    """Id, type, metadata JSON, content and keywords of an entry, as indexed."""
+    metadata = {key: value for key, value in entry.metadata.items() if key not in _UNINDEXED_KEYS}
+    return entry.id, entry.type, json.dumps(metadata), entry.content, _keywords(metadata)
+
+
+class KeywordIndex:
+    """BM25 index of knowledge entries in SQLite, in memory only if `path` is None.
+
+    Methods are blocking and thread-safe: call them from a thread in async code.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        uri = f"file:{path}" if path else f"file:keywords-{uuid.uuid4().hex}?mode=memory&cache=shared"
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        with self._lock:
+            if path:
+                self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def add(self, entries: Iterable[KnowledgeEntry]):
+        """Index entries, replacing those with the same id."""
+        with self._lock, self._connection:
+            for entry_id, entry_type, metadata, content, keywords in map(_document, entries):
+                rowid = self._connection.execute(
+                    "INSERT INTO documents (id, type, metadata) VALUES (?, ?, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET type = excluded.type, metadata = excluded.metadata "
+                    "RETURNING rowid",
+                    (entry_id, entry_type, metadata)
+                ).fetchone()[0]
+                # FTS5 rows are replaced by rowid, which is indexed
+                self._connection.execute("DELETE FROM entries WHERE rowid = ?", (rowid,))
+                self._connection.execute(
+                    "INSERT INTO entries (rowid, content, keywords) VALUES (?, ?, ?)",
+                    (rowid, content, keywords)
+                )
+
+    def remove(self, ids: Iterable[str]):
+        """Remove entries from the index."""
+        with self._lock, self._connection:
+            for entry_id in ids:
+                row = self._connection.execute("DELETE FROM documents WHERE id = ? RETURNING rowid", (entry_id,)).fetchone()
+                if row is not None:
+                    self._connection.execute("DELETE FROM entries WHERE rowid = ?", row)
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM documents")
+            self._connection.execute("DELETE FROM entries")
+            self._connection.execute("DELETE FROM meta WHERE key = 'built_at'")
+
+    def _built(self) -> bool:
+        return self._connection.execute("SELECT 1 FROM meta WHERE key = 'built_at'").fetchone() is not None
+
+    @property
+    def built(self) -> bool:
+        """Whether the index was rebuilt from the whole knowledge base, not only fed by writes."""
+        with self._lock:
+            return self._built()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT count(*) FROM documents").fetchone()[0]
+
+    def search(self, query: str, limit: int = 5) -> List[KnowledgeEntry]:
+        """Best BM25 matches of any query term, with their score as `bm25` in the metadata."""
+        match = match_query(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT d.id, d.type, entries.content, d.metadata, bm25(entries) "
+                "FROM entries JOIN documents d ON d.rowid = entries.rowid "
+                "WHERE entries MATCH ? ORDER BY bm25(entries) LIMIT ?",
+                (match, limit)
+            ).fetchall()
+        # SQLite's bm25() is negative, lower being better
+        return [
+            KnowledgeEntry(
+                id=entry_id,
+                type=entry_type,
+                content=content,
+                metadata={**json.loads(metadata), "bm25": -rank}
+            )
+            for entry_id, entry_type, content, metadata, rank in rows
+        ]
+
+    def rebuild(self, client: Any, batch_size: int = 1000, unless_built: bool = False) -> Optional[int]:
+        """Replace the index with every entry of the knowledge base, returning their number.
+
+        Entries are staged in a temporary table and swapped in by one
+        transaction, so searches (and other processes sharing the file) never
+        see a partial index. With `unless_built`, returns None without
+        replacing anything if the index is, or meanwhile gets, built.
+        """
+        if unless_built and self.built:
+            return None
+        with self._lock:
+            self._connection.executescript(STAGING_SCHEMA)
+        try:
+            count = 0
+            while True:
+                result = client.supabase.table("knowledge_base").select("id", "type", "content", "metadata").order(
+                    "id"
+                ).range(count, count + batch_size - 1).execute()
+                with self._lock, self._connection:
+                    self._connection.executemany(
+                        "INSERT OR REPLACE INTO temp.staged VALUES (?, ?, ?, ?, ?)",
+                        [_document(KnowledgeEntry(**row)) for row in result.data]
+                    )
+                count += len(result.data)
+                if len(result.data) < batch_size:
+                    break
+
+            with self._lock, self._connection:
+                # Take the write lock before checking, so concurrent builds run one after the other
+                self._connection.execute("BEGIN IMMEDIATE")
+                if unless_built and self._built():
+                    return None
+                self._connection.execute("DELETE FROM documents")
+                self._connection.execute("DELETE FROM entries")
+                self._connection.execute(
+                    "INSERT INTO documents (rowid, id, type, metadata) SELECT rowid, id, type, metadata FROM temp.staged"
+                )
+                self._connection.execute(
+                    "INSERT INTO entries (rowid, content, keywords) SELECT rowid, content, keywords FROM temp.staged"
+                )
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('built_at', ?)",
+                    (datetime.now(timezone.utc).isoformat(),)
+                )
+            return count
+        finally:
+            with self._lock:
+                self._connection.execute("DROP TABLE IF EXISTS temp.staged")
+
+def main(argv=None) -> int:
+    # Imported here as the client uses this module
+    from .client import VectorStoreClient
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild", help="Index every entry of the knowledge base")
+    rebuild.add_argument("--path", default=HYBRID_SEARCH_CONFIG["path"])
+    rebuild.add_argument("--batch-size", type=int, default=1000)
+    search = commands.add_parser("search", help="Keyword search of the index")
+    search.add_argument("query")
+    search.add_argument("--path", default=HYBRID_SEARCH_CONFIG["path"])
+    search.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    index = KeywordIndex(args.path)
+    try:
+        if args.command == "rebuild":
+            client = VectorStoreClient(keyword_index=index)
+            count = index.rebuild(client, args.batch_size)
+            # Keyword and hybrid results cached before the rebuild are stale
+            if client.search_cache is not None:
+                client.search_cache.bump()
+            print(f"Indexed {count} entries in {args.path}", file=sys.stderr)
+        else:
+            for entry in index.search(args.query, args.limit):
+                print(json.dumps({"id": entry.id, "bm25": round(entry.metadata["bm25"], 3), "content": entry.content[:200]}))
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+-- Compact embedding storage (EMBEDDING_CONFIG["storage"]): float16 vectors as halfvec
+-- and binary-quantized vectors as bit strings, each with an HNSW index. Needs pgvector 0.7+.
+-- The dimensions (here 1536) must match EMBEDDING_CONFIG["dimensions"]; when embeddings are
+-- shortened, change them here and in the `embedding` column of migration 001.
+alter table knowledge_base add column if not exists embedding_half halfvec(1536);
+alter table knowledge_base add column if not exists embedding_bits bit(1536);
+
+create index if not exists knowledge_base_embedding_half_idx
+    on knowledge_base using hnsw (embedding_half halfvec_cosine_ops);
+create index if not exists knowledge_base_embedding_bits_idx
+    on knowledge_base using hnsw (embedding_bits bit_hamming_ops);
+
+-- Similarity search on the compact vectors. The best `candidate_count` rows are found
+-- through the index; with `rescore`, they are re-ranked on their full-precision
+-- vectors. Binary similarities estimate the cosine from the Hamming distance.
+create or replace function match_knowledge_compact(
+    query_embedding vector,
+    storage text,
+    match_threshold float,
+    match_count int,
+    candidate_count int,
+    rescore boolean
+)
+returns table (
+    id uuid,
+    type text,
+    content text,
+    metadata jsonb,
+    similarity float
+)
+language plpgsql
+as $$
+begin
+    if storage = 'float16' then
+        return query
+        with candidates as (
+            select
+                kb.id, kb.type, kb.content, kb.metadata, kb.embedding,
+                1 - (kb.embedding_half <=> query_embedding::halfvec) as compact_similarity
+            from knowledge_base kb
+            where kb.embedding_half is not null
+            order by kb.embedding_half <=> query_embedding::halfvec
+            limit candidate_count
+        )
+        select c.id, c.type, c.content, c.metadata, s.similarity
+        from candidates c
+        cross join lateral (
+            select case
+                when rescore and c.embedding is not null then 1 - (c.embedding <=> query_embedding)
+                else c.compact_similarity
+            end as similarity
+        ) s
+        where s.similarity > match_threshold
+        order by s.similarity desc
+        limit match_count;
+    elsif storage = 'binary' then
+        return query
+        with candidates as (
+            select
+                kb.id, kb.type, kb.content, kb.metadata, kb.embedding,
+                cos(pi() * (kb.embedding_bits <~> binary_quantize(query_embedding)) / vector_dims(query_embedding))
+                    as compact_similarity
+            from knowledge_base kb
+            where kb.embedding_bits is not null
+            order by kb.embedding_bits <~> binary_quantize(query_embedding)
+            limit candidate_count
+        )
+        select c.id, c.type, c.content, c.metadata, s.similarity
+        from candidates c
+        cross join lateral (
+            select case
+                when rescore and c.embedding is not null then 1 - (c.embedding <=> query_embedding)
+                else c.compact_similarity
+            end as similarity
+        ) s
+        where s.similarity > match_threshold
+        order by s.similarity desc
+        limit match_count;
+    else
+        raise exception 'Unknown embedding storage: %', storage;
+    end if;
+end;
+$$;
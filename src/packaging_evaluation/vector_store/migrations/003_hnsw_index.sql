@@ -0,0 +1,115 @@
+-- Approximate nearest-neighbour search with HNSW indexes (pgvector 0.5+). HNSW indexes are
+-- updated on every insert, need no training data (unlike the IVFFlat index of migration 001,
+-- which was built on an empty table) and are persisted with the table.
+-- Build parameters: `m` (links per node) and `ef_construction` (candidates while linking);
+-- higher values give better recall at the cost of build time and index size.
+drop index if exists knowledge_base_embedding_idx;
+create index if not exists knowledge_base_embedding_hnsw_idx
+    on knowledge_base using hnsw (embedding vector_cosine_ops) with (m = 16, ef_construction = 64);
+
+-- Search functions take `ef_search` (ANN_CONFIG["ef_search"]): the candidates kept while
+-- searching, trading latency for recall. An index scan returns at most `ef_search` rows,
+-- so it is raised to the number of rows requested, up to pgvector's maximum of 1000.
+drop function if exists match_knowledge(vector, float, int);
+create or replace function match_knowledge(
+    query_embedding vector(1536),
+    match_threshold float,
+    match_count int,
+    ef_search int default 40
+)
+returns table (
+    id uuid,
+    type text,
+    content text,
+    metadata jsonb,
+    similarity float
+)
+language plpgsql
+as $$
+begin
+    perform set_config('hnsw.ef_search', least(greatest(ef_search, match_count), 1000)::text, true);
+    return query
+    select
+        knowledge_base.id,
+        knowledge_base.type,
+        knowledge_base.content,
+        knowledge_base.metadata,
+        1 - (knowledge_base.embedding <=> query_embedding) as similarity
+    from knowledge_base
+    where 1 - (knowledge_base.embedding <=> query_embedding) > match_threshold
+    order by knowledge_base.embedding <=> query_embedding
+    limit match_count;
+end;
+$$;
+
+drop function if exists match_knowledge_compact(vector, text, float, int, int, boolean);
+create or replace function match_knowledge_compact(
+    query_embedding vector,
+    storage text,
+    match_threshold float,
+    match_count int,
+    candidate_count int,
+    rescore boolean,
+    ef_search int default 40
+)
+returns table (
+    id uuid,
+    type text,
+    content text,
+    metadata jsonb,
+    similarity float
+)
+language plpgsql
+as $$
+begin
+    perform set_config('hnsw.ef_search', least(greatest(ef_search, candidate_count), 1000)::text, true);
+    if storage = 'float16' then
+        return query
+        with candidates as (
+            select
+                kb.id, kb.type, kb.content, kb.metadata, kb.embedding,
+                1 - (kb.embedding_half <=> query_embedding::halfvec) as compact_similarity
+            from knowledge_base kb
+            where kb.embedding_half is not null
+            order by kb.embedding_half <=> query_embedding::halfvec
+            limit candidate_count
+        )
+        select c.id, c.type, c.content, c.metadata, s.similarity
+        from candidates c
+        cross join lateral (
+            select case
+                when rescore and c.embedding is not null then 1 - (c.embedding <=> query_embedding)
+                else c.compact_similarity
+            end as similarity
+        ) s
+        where s.similarity > match_threshold
+        order by s.similarity desc
+        limit match_count;
+    elsif storage = 'binary' then
+        return query
+        with candidates as (
+            select
+                kb.id, kb.type, kb.content, kb.metadata, kb.embedding,
+                cos(pi() * (kb.embedding_bits <~> binary_quantize(query_embedding)) / vector_dims(query_embedding))
+                    as compact_similarity
+            from knowledge_base kb
+            where kb.embedding_bits is not null
+            order by kb.embedding_bits <~> binary_quantize(query_embedding)
+            limit candidate_count
+        )
+        select c.id, c.type, c.content, c.metadata, s.similarity
+        from candidates c
+        cross join lateral (
+            select case
+                when rescore and c.embedding is not null then 1 - (c.embedding <=> query_embedding)
+                else c.compact_similarity
+            end as similarity
+        ) s
+        where s.similarity > match_threshold
+        order by s.similarity desc
+        limit match_count;
+    else
+        raise exception 'Unknown embedding storage: %', storage;
+    end if;
+end;
+$$;
@@ -0,0 +1,33 @@
+-- Exact similarity search on the full-precision vectors, bypassing the HNSW index of
+-- migration 003. It is slow on large knowledge bases and only meant as the reference when
+-- measuring the recall of compact storage (`python -m ...vector_store.quantization`).
+create or replace function match_knowledge_exact(
+    query_embedding vector(1536),
+    match_threshold float,
+    match_count int
+)
+returns table (
+    id uuid,
+    type text,
+    content text,
+    metadata jsonb,
+    similarity float
+)
+language plpgsql
+as $$
+begin
+    -- Scoped to the transaction of the call: the planner falls back to a sequential scan
+    perform set_config('enable_indexscan', 'off', true);
+    return query
+    select
+        knowledge_base.id,
+        knowledge_base.type,
+        knowledge_base.content,
+        knowledge_base.metadata,
+        1 - (knowledge_base.embedding <=> query_embedding) as similarity
+    from knowledge_base
+    where 1 - (knowledge_base.embedding <=> query_embedding) > match_threshold
+    order by knowledge_base.embedding <=> query_embedding
+    limit match_count;
+end;
+$$;
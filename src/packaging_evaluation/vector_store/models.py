@@ -10,7 +10,7 @@ class MachineSpec(BaseModel):
     capabilities: List[str] = Field(description="List of capabilities")
     constraints: List[str] = Field(description="List of constraints")
     specifications: str = Field(description="Detailed technical specifications")
-    embedding: Optional[List[float]] = Field(description="Vector embedding of the specifications")
+    embedding: Optional[List[float]] = Field(default=None, description="Vector embedding of the specifications")
 
 class MaterialSpec(BaseModel):
     """Specifications for a material."""
@@ -20,7 +20,7 @@ class MaterialSpec(BaseModel):
     properties: List[str] = Field(description="List of material properties")
     constraints: List[str] = Field(description="List of constraints")
     specifications: str = Field(description="Detailed technical specifications")
-    embedding: Optional[List[float]] = Field(description="Vector embedding of the specifications")
+    embedding: Optional[List[float]] = Field(default=None, description="Vector embedding of the specifications")
 
 class ProcessSpec(BaseModel):
     """Specifications for a manufacturing process."""
@@ -30,7 +30,7 @@ class ProcessSpec(BaseModel):
     requirements: List[str] = Field(description="List of requirements")
     constraints: List[str] = Field(description="List of constraints")
     specifications: str = Field(description="Detailed technical specifications")
-    embedding: Optional[List[float]] = Field(description="Vector embedding of the specifications")
+    embedding: Optional[List[float]] = Field(default=None, description="Vector embedding of the specifications")
 
 class KnowledgeEntry(BaseModel):
     """A knowledge entry in the vector store."""
@@ -38,6 +38,6 @@ class KnowledgeEntry(BaseModel):
     type: str = Field(description="Type of knowledge (machine/material/process)")
     content: str = Field(description="The actual content")
     metadata: dict = Field(description="Additional metadata")
-    embedding: Optional[List[float]] = Field(description="Vector embedding of the content")
+    embedding: Optional[List[float]] = Field(default=None, description="Vector embedding of the content")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow) 
\ No newline at end of file
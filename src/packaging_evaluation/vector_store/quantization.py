@@ -0,0 +1,112 @@
+"""Compact embedding storage and the recall it costs.
+
+The knowledge base can store embeddings in three ways (`EMBEDDING_CONFIG["storage"]`):
+
+- `float32`: pgvector `vector`, 4 bytes per dimension;
+- `float16`: pgvector `halfvec`, 2 bytes per dimension;
+- `binary`: pgvector `bit`, 1 bit per dimension (the sign of each value).
+
+Compact vectors are searched through an HNSW index (migration 002). With
+rescoring, full-precision vectors are kept too and the best candidates of
+the compact search are re-ranked with them.
+
+Recall@k of the configured storage against exact search on the current
+knowledge base (a sequential scan, migration 004), for one query per line of
+a text file:
+
+    python -m src.packaging_evaluation.vector_store.quantization queries.txt --k 10
+"""
+import argparse
+import asyncio
+import struct
+import sys
+from typing import List, Sequence
+
+from ..configuration import EMBEDDING_CONFIG
+
+# Storage types of the knowledge base embeddings
+FLOAT32 = "float32"
+FLOAT16 = "float16"
+BINARY = "binary"
+STORAGE_TYPES = (FLOAT32, FLOAT16, BINARY)
+
+# Bytes pgvector adds to each stored vector
+_VECTOR_HEADER_BYTES = 8
+
+
+def to_float16(vector: Sequence[float]) -> List[float]:
+    """A vector rounded to float16 precision, as pgvector stores it in a `halfvec`."""
+    return list(struct.unpack(f"<{len(vector)}e", struct.pack(f"<{len(vector)}e", *vector)))
+
+
+def binary_quantize(vector: Sequence[float]) -> str:
+    """A vector as a bit string (1 for positive values), like pgvector's `binary_quantize`."""
+    return "".join("1" if value > 0 else "0" for value in vector)
+
+
+def bytes_per_vector(dimensions: int, storage: str, rescore: bool = False) -> int:
+    """Storage of one embedding, including the full-precision copy kept for rescoring."""
+    sizes = {
+        FLOAT32: 4 * dimensions,
+        FLOAT16: 2 * dimensions,
+        BINARY: (dimensions + 7) // 8,
+    }
+    size = sizes[storage] + _VECTOR_HEADER_BYTES
+    if rescore and storage != FLOAT32:
+        size += sizes[FLOAT32] + _VECTOR_HEADER_BYTES
+    return size
+
+
+def recall_at_k(expected: Sequence[Sequence[str]], found: Sequence[Sequence[str]], k: int) -> float:
+    """Mean share of the exact top-k ids found in the top k, over the queries with results."""
+    recalls = [
+        len(set(exact[:k]) & set(approximate[:k])) / len(exact[:k])
+        for exact, approximate in zip(expected, found)
+        if exact
+    ]
+    return round(sum(recalls) / len(recalls), 4) if recalls else 1.0
+
+
+async def main(argv=None) -> int:
+    # Imported here as the client uses this module
+    from .client import VectorStoreClient
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("queries", help="Text file with one query per line")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--storage", choices=[FLOAT16, BINARY], default=None,
+                        help="Compact storage to measure (default: the configured one)")
+    args = parser.parse_args(argv)
+
+    storage = args.storage or EMBEDDING_CONFIG["storage"]
+    if storage == FLOAT32:
+        raise SystemExit("Set --storage, or a compact EMBEDDING_CONFIG['storage'], to compare it with exact search")
+    with open(args.queries, encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+
+    # Exact search is the reference; it needs the full-precision vectors, stored when rescoring
+    client = VectorStoreClient()
+    exact, compact, rescored = [], [], []
+    for query in queries:
+        embedding = await client.embeddings.aembed_query(query)
+        for results, options in (
+            (exact, {"exact": True}),
+            (compact, {"storage": storage, "rescore": False}),
+            (rescored, {"storage": storage, "rescore": True}),
+        ):
+            entries = await client.search_by_embedding(embedding, args.k, match_threshold=-1.0, **options)
+            results.append([entry.id for entry in entries])
+
+    dimensions = len(embedding) if queries else EMBEDDING_CONFIG["dimensions"] or 1536
+    print(f"{len(queries)} queries, {dimensions} dimensions, recall@{args.k} against exact float32 search:")
+    for name, results, rescore in ((storage, compact, False), (f"{storage} + rescoring", rescored, True)):
+        print(
+            f"  {name}: recall@{args.k}={recall_at_k(exact, results, args.k)} "
+            f"({bytes_per_vector(dimensions, storage, rescore)} bytes per vector, "
+            f"{bytes_per_vector(dimensions, FLOAT32)} for float32)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,178 @@
+"""Cache of knowledge base search results, invalidated when the knowledge base changes.
+
+The same retrieval queries recur constantly (common materials, standard
+machines), and each one embeds the query and runs a similarity search.
+`SearchCache` keeps recent results in an in-process LRU, keyed by the
+normalized query and the search options (mode, filters, limit, threshold).
+
+Every write or delete through `VectorStoreClient` bumps a knowledge base
+version, and results cached under an older version are never returned.
+With a `path`, the version and the results are kept in a SQLite file too,
+so API workers share them, and imports run from the command line
+(`catalog`, `ingest`) invalidate the workers' caches.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO version (id, value) VALUES (1, 0);
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_stored_at ON results (stored_at);
+"""
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace, so trivially different queries share results."""
+    return " ".join(query.lower().split())
+
+
+def cache_key(query: str, **options: Any) -> str:
+    """Key of a search: its normalized query and options; list options (such as tags) are unordered."""
+    key = {
+        name: sorted(value) if isinstance(value, (list, tuple, set)) else value
+        for name, value in options.items()
+    }
+    key["query"] = normalize_query(query)
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """LRU of search results tagged with the knowledge base version, shared through SQLite if `path` is set.
+
+    Results must be JSON-serializable and are returned as stored: callers
+    must not modify them. Methods are thread-safe and blocking, but only do
+    point reads and writes of a local file, so they can be called from the
+    event loop.
+    """
+
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self._entries: "OrderedDict[str, Tuple[int, Any]]" = OrderedDict()
+        self._version = 0
+        self._lock = threading.Lock()
+        self._connection = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            with self._lock:
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+
+    def _current_version(self) -> int:
+        # Other processes sharing the file may have bumped it
+        if self._connection is not None:
+            self._version = self._connection.execute("SELECT value FROM version").fetchone()[0]
+        return self._version
+
+    def _remember(self, key: str, cached: Tuple[int, Any]):
+        self._entries[key] = cached
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def version(self) -> int:
+        """Current knowledge base version; pass it to `put` with the results of a search started now."""
+        with self._lock:
+            return self._current_version()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Results cached for a key under the current version, or None."""
+        with self._lock:
+            version = self._current_version()
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] != version:
+                del self._entries[key]
+                cached = None
+            # Results cached by another process
+            if cached is None and self._connection is not None:
+                row = self._connection.execute(
+                    "SELECT value FROM results WHERE key = ? AND version = ?", (key, version)
+                ).fetchone()
+                if row is not None:
+                    cached = (version, json.loads(row[0]))
+            if cached is None:
+                self.misses += 1
+                return None
+            self._remember(key, cached)
+            self.hits += 1
+            return cached[1]
+
+    def put(self, key: str, results: Any, version: int):
+        """Cache the results of a search started at `version`, unless the knowledge base changed since."""
+        with self._lock:
+            if version != self._current_version():
+                return
+            self._remember(key, (version, results))
+            if self._connection is not None:
+                with self._connection:
+                    self._connection.execute(
+                        "INSERT INTO results (key, version, value, stored_at) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT (key) DO UPDATE SET version = excluded.version, value = excluded.value, "
+                        "stored_at = excluded.stored_at",
+                        (key, version, json.dumps(results), time.time())
+                    )
+                    # The file keeps the most recently stored results
+                    self._connection.execute(
+                        "DELETE FROM results WHERE key IN "
+                        "(SELECT key FROM results ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,)
+                    )
+
+    def bump(self) -> int:
+        """Invalidate every cached result, as the knowledge base changed; returns the new version."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+            if self._connection is None:
+                self._version += 1
+                return self._version
+            with self._connection:
+                self._version = self._connection.execute(
+                    "UPDATE version SET value = value + 1 RETURNING value"
+                ).fetchall()[0][0]
+                self._connection.execute("DELETE FROM results WHERE version < ?", (self._version,))
+            return self._version
+
+    def clear(self):
+        """Drop the cached results, keeping the version."""
+        with self._lock:
+            self._entries.clear()
+            if self._connection is not None:
+                with self._connection:
+                    self._connection.execute("DELETE FROM results")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,103 @@
+"""Background startup work for the API apps, reported by their readiness endpoints."""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Step statuses
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Warmup:
+    """Runs warmup steps in the background once the app has started.
+
+    Steps create clients and import heavy modules ahead of the first request,
+    so startup itself only binds the port. Blocking steps run in a thread and
+    keep the event loop free to answer requests meanwhile. The app is ready
+    once every required step is done; optional steps (such as pre-opening
+    connections) only log their failures.
+    """
+
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+        self._steps: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, name: str, step: Callable[[], Any], blocking: bool = False, required: bool = True):
+        """Add a step: a coroutine function, or a blocking function if `blocking`."""
+        self._steps.append({
+            "name": name,
+            "step": step,
+            "blocking": blocking,
+            "required": required,
+            "status": PENDING,
+            "seconds": None,
+            "error": None,
+        })
+
+    async def _run_step(self, step: Dict[str, Any]):
+        step["status"] = RUNNING
+        start = time.perf_counter()
+        try:
+            if step["blocking"]:
+                await asyncio.wait_for(asyncio.to_thread(step["step"]), self.timeout)
+            else:
+                await asyncio.wait_for(step["step"](), self.timeout)
+        except Exception as e:
+            step["status"] = FAILED
+            step["error"] = str(e) or type(e).__name__
+            logger.log(
+                logging.ERROR if step["required"] else logging.WARNING,
+                "Warmup step %s failed: %s", step["name"], step["error"]
+            )
+        else:
+            step["status"] = DONE
+        step["seconds"] = round(time.perf_counter() - start, 3)
+
+    async def _run(self):
+        # Steps run in order: later ones may use the clients created by earlier ones
+        for step in self._steps:
+            await self._run_step(step)
+
+    def start(self):
+        """Start the steps on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Cancel the steps still running."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def wait(self):
+        """Wait until every step has run."""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    @property
+    def ready(self) -> bool:
+        return all(step["status"] == DONE for step in self._steps if step["required"])
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "steps": {
+                step["name"]: {
+                    "status": step["status"],
+                    "required": step["required"],
+                    "seconds": step["seconds"],
+                    "error": step["error"],
+                }
+                for step in self._steps
+            },
+        }
@@ -1,9 +1,37 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
+from contextlib import asynccontextmanager
 import asyncio
-from src.packaging_evaluation.state import PackagingEvaluationState
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from src.packaging_evaluation.configuration import (
+    EVALUATION_INDEX_CONFIG,
+    HISTORY_CONFIG,
+    SCHEDULER_CONFIG,
+    WARMUP_CONFIG
+)
+from src.packaging_evaluation.evaluation_index import (
+    MODES as NEAR_DUPLICATE_MODES,
+    OFF,
+    EvaluationIndex,
+    apply_prior_evaluation,
+    image_digest
+)
+from src.packaging_evaluation.cascade import cascade_stats
+from src.packaging_evaluation.history import EXPORT_FORMATS, JSONL, EvaluationHistory, HistoryFilter
+from src.packaging_evaluation.metrics import EventLoopLagMonitor
+from src.packaging_evaluation.serialization import accepts_zstd, compress, dump_model, negotiate
+from src.packaging_evaluation.state import PackagingEvaluationState, UserFeedback
+from src.packaging_evaluation.warmup import Warmup
+from src.packaging_evaluation import tools
 from src.packaging_evaluation.tools import (
     image_analysis,
     concept_breaker,
@@ -12,10 +40,98 @@ from src.packaging_evaluation.tools import (
     technical_feasibility,
     operations,
     reflection,
-    final_score
+    final_score,
+    triage
 )
+from src.web.runs import AWAITING_INPUT, RUNNING, EvaluationRun, RunRegistry
+from src.web.scheduler import PRIORITIES, EvaluationScheduler, QueueFull, Ticket
+
+logger = logging.getLogger(__name__)
+
+# Node functions by the name used in state.current_node
+NODES = {
+    "image_analyzer": image_analysis,
+    "concept_breaker": concept_breaker,
+    "human_feedback": human_feedback,
+    "process_feedback": process_feedback,
+    "technical_feasibility": technical_feasibility,
+    "operations": operations,
+    "reflection": reflection,
+    "final_score": final_score,
+    "triage": triage,
+}
+
+# Evaluation modes: the full pipeline, or a single-call triage that flags concepts to escalate
+FULL = "full"
+TRIAGE = "triage"
+EVALUATION_MODES = (FULL, TRIAGE)
+
+# How often a running evaluation checks whether its client is still connected
+DISCONNECT_POLL_INTERVAL = 0.25
+
+# How long an abandoned run keeps going, so a retrying client can re-attach
+CANCEL_GRACE_PERIOD = 0.5
+
+# The same after the last event stream of a run closes; longer, as the Streamlit app
+# reopens the stream of its run on every rerun
+STREAM_GRACE_PERIOD = 15.0
+
+# Idle time after which a run's event stream sends a keep-alive line
+STREAM_KEEPALIVE_INTERVAL = 15.0
+
+# Smallest response body worth compressing for clients accepting zstd
+COMPRESSION_MIN_BYTES = 1024
+
+runs = RunRegistry()
+
+# Priority queue and per-client limits in front of the evaluation runs
+scheduler = EvaluationScheduler(
+    max_concurrent=SCHEDULER_CONFIG["max_concurrent"],
+    reserved_interactive=SCHEDULER_CONFIG["reserved_interactive"],
+    per_client_limit=SCHEDULER_CONFIG["per_client_limit"],
+    max_queue=SCHEDULER_CONFIG["max_queue"]
+)
+
+# Completed evaluations, for the near-duplicate fast path
+evaluation_index = EvaluationIndex(EVALUATION_INDEX_CONFIG["path"]) if EVALUATION_INDEX_CONFIG["enabled"] else None
+
+# Completed evaluations, for portfolio queries and exports; the file is opened on
+# first use (by the warmup, or the first completed evaluation), not on import
+evaluation_history: Optional[EvaluationHistory] = None
+_history_lock = threading.Lock()
 
-app = FastAPI()
+def open_history() -> Optional[EvaluationHistory]:
+    """The evaluation history, opened on first call; None if it is disabled. Blocking."""
+    global evaluation_history
+    with _history_lock:
+        if evaluation_history is None and HISTORY_CONFIG["enabled"]:
+            evaluation_history = EvaluationHistory(HISTORY_CONFIG["path"])
+        return evaluation_history
+
+# Runtime metrics reported by /metrics
+loop_lag_monitor = EventLoopLagMonitor()
+
+# Clients are created lazily; the warmup creates them in the background after
+# startup so the first evaluation does not pay for it
+warmup = Warmup(timeout=WARMUP_CONFIG["timeout"])
+if WARMUP_CONFIG["enabled"]:
+    warmup.add("model_clients", tools.create_clients, blocking=True)
+    if WARMUP_CONFIG["open_connections"]:
+        warmup.add("model_connections", lambda: tools.open_connections(WARMUP_CONFIG["connections"]), required=False)
+    if evaluation_index is not None:
+        warmup.add("embeddings_client", lambda: evaluation_index.embeddings, blocking=True, required=False)
+    if HISTORY_CONFIG["enabled"]:
+        warmup.add("evaluation_history", open_history, blocking=True, required=False)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop_lag_monitor.start()
+    warmup.start()
+    yield
+    await warmup.stop()
+    await loop_lag_monitor.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -29,53 +145,310 @@ app.add_middleware(
 class EvaluationRequest(BaseModel):
     packaging_concept: str
     concept_images: List[str] = []
+    # Optional client-chosen id, so the run can be cancelled before it returns
+    run_id: Optional[str] = None
+    # Near-duplicate fast path: "off", "reuse" or "seed" (defaults to configuration)
+    near_duplicate: Optional[str] = None
+    # "full" or "triage"
+    mode: str = FULL
+    # Wait for the run to stop (completed, awaiting input, cancelled); when False the
+    # run is started and its progress can be followed on /runs/{run_id}/stream
+    wait: bool = True
 
 class EvaluationResponse(BaseModel):
+    run_id: str
+    status: str
+    # State version the response brings the client up to
+    version: int
+    # State fields (without messages) changed after the requested version, or all of them
     state: dict
     current_node: str
+    # Messages added after the requested version, or all of them
     messages: List[dict]
     process_complete: bool
 
+def _response(run: EvaluationRun, since: Optional[int] = None) -> EvaluationResponse:
+    changed, messages = run.delta(-1 if since is None else since)
+    return EvaluationResponse(
+        run_id=run.run_id,
+        status=run.status,
+        version=run.version,
+        state=changed,
+        current_node=run.state.current_node,
+        messages=messages,
+        process_complete=run.state.process_complete
+    )
+
+def _negotiated(http_request: Request, payload: BaseModel, headers: Optional[dict] = None) -> Response:
+    """Encode a response body as JSON or msgpack (per `Accept`), zstd-compressed if accepted."""
+    serializer = negotiate(http_request.headers.get("accept"))
+    body = dump_model(payload, serializer)
+    headers = {**(headers or {}), "Vary": "Accept, Accept-Encoding"}
+    if len(body) >= COMPRESSION_MIN_BYTES and accepts_zstd(http_request.headers.get("accept-encoding")):
+        body = compress(body)
+        headers["Content-Encoding"] = "zstd"
+    return Response(body, media_type=serializer.media_type, headers=headers)
+
+async def run_evaluation(run: EvaluationRun, near_duplicate: str = OFF) -> PackagingEvaluationState:
+    """Process nodes until completion or human feedback is needed, checkpointing after each node."""
+    state = run.state
+    if evaluation_index is not None and near_duplicate != OFF:
+        match = await evaluation_index.find_similar(
+            state.packaging_concept,
+            state.concept_images,
+            EVALUATION_INDEX_CONFIG["similarity_threshold"]
+        )
+        if match is not None:
+            state = apply_prior_evaluation(state, *match, mode=near_duplicate)
+            run.checkpoint(state)
+    
+    while not state.process_complete and not state.awaiting_human_input:
+        node = NODES.get(state.current_node)
+        if node is None:
+            raise HTTPException(status_code=400, detail=f"Unknown node: {state.current_node}")
+        update = await node(state)
+        state = state.apply(update)
+        run.checkpoint(state, changed=update)
+    
+    # Triage results are too coarse to be reused as full evaluations
+    if (evaluation_index is not None and state.process_complete and state.reused_from is None
+            and state.current_node != TRIAGE):
+        try:
+            await evaluation_index.add(state)
+        except Exception:
+            logger.exception("Failed to index evaluation of run %s", run.run_id)
+    
+    if state.process_complete:
+        try:
+            await asyncio.to_thread(_store_in_history, state, run.run_id)
+        except Exception:
+            logger.exception("Failed to store evaluation of run %s in the history", run.run_id)
+    return state
+
+def _store_in_history(state: PackagingEvaluationState, run_id: str):
+    history = open_history()
+    if history is not None:
+        history.add(state, run_id)
+
+async def run_scheduled(run: EvaluationRun, ticket: Ticket, near_duplicate: str = OFF) -> PackagingEvaluationState:
+    """Wait for an evaluation slot, then run the evaluation."""
+    await ticket
+    # Streaming nodes publish their partial output on the run
+    tools.partial_output_sink.set(run.publish_partial)
+    return await run_evaluation(run, near_duplicate)
+
+def _queue_full(e: QueueFull) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def _admission(http_request: Request, x_client_id: Optional[str], x_priority: Optional[str]) -> Tuple[str, str]:
+    """Client id and priority class of a request."""
+    priority = x_priority or SCHEDULER_CONFIG["default_priority"]
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"X-Priority must be one of {', '.join(PRIORITIES)}")
+    client_id = x_client_id or (http_request.client.host if http_request.client else "anonymous")
+    return client_id, priority
+
+def _schedule(run: EvaluationRun, ticket: Ticket, near_duplicate: str = OFF):
+    """Start the run's task once the scheduler admits it."""
+    run.start(run_scheduled(run, ticket, near_duplicate))
+    # Frees the slot (or the queue position) however the run ends, even if
+    # it is cancelled before it starts
+    run.task.add_done_callback(lambda _: scheduler.release(ticket))
+
+def request_digest(request: EvaluationRequest) -> str:
+    """Digest of the concept text and images, identifying duplicate submissions."""
+    digest = hashlib.sha256(f"{request.mode}:{request.packaging_concept}".encode("utf-8"))
+    for image in request.concept_images:
+        digest.update(image_digest(image).encode("ascii"))
+    return digest.hexdigest()
+
+async def _wait_for_run(task: asyncio.Task, http_request: Request) -> bool:
+    """Wait for the run's task. Returns False early if the client disconnects."""
+    while not task.done():
+        await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+        if not task.done() and await http_request.is_disconnected():
+            return False
+    return True
+
 @app.post("/evaluate", response_model=EvaluationResponse)
-async def evaluate_packaging(request: EvaluationRequest):
+async def evaluate_packaging(
+    request: EvaluationRequest,
+    http_request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    x_client_id: Optional[str] = Header(None),
+    x_priority: Optional[str] = Header(None)
+):
+    client_id, priority = _admission(http_request, x_client_id, x_priority)
+    near_duplicate = request.near_duplicate or EVALUATION_INDEX_CONFIG["default_mode"]
+    if near_duplicate not in NEAR_DUPLICATE_MODES:
+        raise HTTPException(status_code=400, detail=f"near_duplicate must be one of {', '.join(NEAR_DUPLICATE_MODES)}")
+    if request.mode not in EVALUATION_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(EVALUATION_MODES)}")
+    if request.mode == TRIAGE:
+        near_duplicate = OFF
+    
     try:
-        # Initialize state
-        state = PackagingEvaluationState(
-            packaging_concept=request.packaging_concept,
-            concept_images=request.concept_images
-        )
+        # Concurrent duplicates (double-clicks, retries) attach to the run already
+        # in flight; an idempotency key also replays the result of a finished run
+        if idempotency_key:
+            key = f"idempotency:{idempotency_key}"
+            run = runs.find(key, include_finished=True)
+        else:
+            key = f"digest:{request_digest(request)}"
+            run = runs.find(key)
         
-        # Process nodes until completion or human feedback needed
-        while not state.process_complete and not state.awaiting_human_input:
-            if state.current_node == "image_analyzer":
-                state = await image_analysis(state)
-            elif state.current_node == "concept_breaker":
-                state = await concept_breaker(state)
-            elif state.current_node == "human_feedback":
-                state = await human_feedback(state)
-            elif state.current_node == "process_feedback":
-                state = await process_feedback(state)
-            elif state.current_node == "technical_feasibility":
-                state = await technical_feasibility(state)
-            elif state.current_node == "operations":
-                state = await operations(state)
-            elif state.current_node == "reflection":
-                state = await reflection(state)
-            elif state.current_node == "final_score":
-                state = await final_score(state)
-            else:
-                raise HTTPException(status_code=400, detail=f"Unknown node: {state.current_node}")
+        if run is not None:
+            runs.coalesced += 1
+            response.headers["X-Coalesced"] = "true"
+        else:
+            # Initialize state
+            state = PackagingEvaluationState(
+                packaging_concept=request.packaging_concept,
+                concept_images=request.concept_images
+            )
+            if request.mode == TRIAGE:
+                state.current_node = TRIAGE
+            # Rejected with 429 before any run is created if the queue is full
+            try:
+                ticket = scheduler.submit(client_id, priority)
+            except QueueFull as e:
+                raise _queue_full(e)
+            try:
+                run = runs.create(state, request.run_id, key=key)
+            except ValueError as e:
+                scheduler.release(ticket)
+                raise HTTPException(status_code=409, detail=str(e))
+            _schedule(run, ticket, near_duplicate)
         
-        return EvaluationResponse(
-            state=state.dict(),
-            current_node=state.current_node,
-            messages=state.messages,
-            process_complete=state.process_complete
-        )
+        if not request.wait:
+            # Clients following the run on /runs/{run_id}/stream keep it going
+            return _negotiated(http_request, _response(run), dict(response.headers))
+        
+        # The run is cancelled shortly after its last waiting client disconnects
+        run.attach()
+        try:
+            finished = await _wait_for_run(run.task, http_request)
+        finally:
+            run.detach(CANCEL_GRACE_PERIOD)
+        
+        if finished and not run.task.cancelled() and run.task.exception() is not None:
+            raise run.task.exception()
+        
+        # Cancelled runs return the state checkpointed after the last finished node
+        return _negotiated(http_request, _response(run), dict(response.headers))
     
+    except HTTPException:
+        raise
+    except QueueFull as e:
+        # Shed from the queue by higher-priority traffic
+        raise _queue_full(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/runs/{run_id}", response_model=EvaluationResponse)
+async def get_run(run_id: str, http_request: Request, since: Optional[int] = None):
+    """Status and last checkpointed state of a run, or only what changed after version `since`."""
+    run = runs.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Unknown run: {run_id}")
+    return _negotiated(http_request, _response(run, since))
+
+@app.post("/runs/{run_id}/cancel")
+async def cancel_run(run_id: str):
+    """Cancel a running evaluation, including its in-flight model call."""
+    run = runs.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Unknown run: {run_id}")
+    if run.cancel():
+        await asyncio.wait({run.task})
+    return {"run_id": run_id, "status": run.status}
+
+@app.post("/runs/{run_id}/feedback", response_model=EvaluationResponse)
+async def submit_run_feedback(
+    run_id: str,
+    feedback: UserFeedback,
+    http_request: Request,
+    since: Optional[int] = None,
+    x_client_id: Optional[str] = Header(None),
+    x_priority: Optional[str] = Header(None)
+):
+    """Resume a run awaiting human feedback. Follow its progress on /runs/{run_id}/stream.
+    
+    Returns only what changed after version `since`, if given.
+    """
+    client_id, priority = _admission(http_request, x_client_id, x_priority)
+    run = runs.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Unknown run: {run_id}")
+    if run.status != AWAITING_INPUT:
+        raise HTTPException(status_code=409, detail=f"Run {run_id} is {run.status}, not awaiting input")
+    try:
+        ticket = scheduler.submit(client_id, priority)
+    except QueueFull as e:
+        raise _queue_full(e)
+    
+    update = {
+        "user_feedback": feedback,
+        "awaiting_human_input": False,
+        "feedback_iteration": run.state.feedback_iteration + 1
+    }
+    run.checkpoint(run.state.apply(update), changed=update)
+    _schedule(run, ticket)
+    return _negotiated(http_request, _response(run, since))
+
+def _event(event: dict) -> str:
+    return json.dumps(event) + "\n"
+
+async def _run_events(run: EvaluationRun, after: int) -> AsyncIterator[str]:
+    """Events of a run until it stops running, starting with messages after index `after`."""
+    # A streaming client counts as waiting: the run is cancelled if every client goes away
+    run.attach()
+    try:
+        sent, partial = after, None
+        while True:
+            messages = run.state.messages
+            for index in range(sent, len(messages)):
+                yield _event({"type": "message", "index": index, **messages[index]})
+            sent = len(messages)
+            
+            # Only the latest partial output is sent, so slow clients skip intermediate ones
+            if run.partial is not None and run.partial is not partial:
+                partial = run.partial
+                yield _event({"type": "partial", **partial})
+            
+            if run.status != RUNNING:
+                yield _event({
+                    "type": "done",
+                    "run_id": run.run_id,
+                    "status": run.status,
+                    "version": run.version,
+                    "current_node": run.state.current_node,
+                    "awaiting_human_input": run.state.awaiting_human_input,
+                    "process_complete": run.state.process_complete,
+                    "final_evaluation": run.state.final_evaluation.model_dump() if run.state.final_evaluation else None,
+                    "error": run.error
+                })
+                return
+            
+            if not await run.wait_for_update(STREAM_KEEPALIVE_INTERVAL):
+                yield "\n"
+    finally:
+        run.detach(STREAM_GRACE_PERIOD)
+
+@app.get("/runs/{run_id}/stream")
+async def stream_run(run_id: str, after: int = 0):
+    """Newline-delimited JSON events of a run as it progresses.
+    
+    `message` events carry node messages with their index (pass the number
+    already received as `after` to resume), `partial` events the fields a streaming node
+    has generated so far, and a final `done` event the resulting status.
+    """
+    run = runs.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Unknown run: {run_id}")
+    return StreamingResponse(_run_events(run, after), media_type="application/x-ndjson")
+
 @app.post("/submit_feedback")
 async def submit_feedback(feedback: dict):
     try:
@@ -85,6 +458,78 @@ async def submit_feedback(feedback: dict):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _history() -> EvaluationHistory:
+    history = open_history()
+    if history is None:
+        raise HTTPException(status_code=404, detail="The evaluation history is disabled")
+    return history
+
+@app.get("/evaluations")
+async def list_evaluations(filters: HistoryFilter = Depends(), limit: int = 100, offset: int = 0):
+    """Summaries of completed evaluations matching the filters, newest first."""
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+    return {"evaluations": await asyncio.to_thread(_history().query, filters, limit, offset)}
+
+@app.get("/evaluations/summary")
+async def evaluations_summary(filters: HistoryFilter = Depends()):
+    """Count, mean score, go rate, score distribution and top materials of matching evaluations."""
+    return await asyncio.to_thread(_history().summary, filters)
+
+@app.get("/evaluations/export")
+async def export_evaluations(filters: HistoryFilter = Depends(), format: str = JSONL, include_state: bool = False):
+    """Stream matching evaluations as JSONL, or download them as a Parquet file."""
+    history = _history()
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if format == JSONL:
+        # Starlette iterates the blocking generator in a thread
+        return StreamingResponse(history.export_jsonl(filters, include_state), media_type="application/x-ndjson")
+    
+    # Parquet footers are written last, so the file is built before it is sent
+    fd, path = tempfile.mkstemp(suffix=".parquet")
+    try:
+        with os.fdopen(fd, "wb") as output:
+            await asyncio.to_thread(history.export_parquet, output, filters, include_state)
+    except RuntimeError as e:
+        os.unlink(path)
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception:
+        os.unlink(path)
+        raise
+    return FileResponse(
+        path,
+        media_type="application/vnd.apache.parquet",
+        filename="evaluations.parquet",
+        background=BackgroundTask(os.unlink, path)
+    )
+
+@app.get("/evaluations/{evaluation_id}")
+async def get_evaluation(evaluation_id: str):
+    """Full stored state of a completed evaluation (without its images)."""
+    state = await asyncio.to_thread(_history().get, evaluation_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Unknown evaluation: {evaluation_id}")
+    return state.model_dump(exclude={"concept_images"})
+
+@app.get("/ready")
+async def ready():
+    """Readiness for load balancers: 503 until the startup warmup has created the clients."""
+    return JSONResponse(warmup.snapshot(), status_code=200 if warmup.ready else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime metrics for load testing and capacity planning."""
+    return {
+        "in_flight_evaluations": runs.active(),
+        "coalesced_requests": runs.coalesced,
+        "scheduler": scheduler.stats(),
+        "component_store": tools.component_store.stats() if tools.component_store is not None else None,
+        "model_cascade": cascade_stats.snapshot(),
+        "reflection_gate": dict(tools.reflection_gate_stats),
+        "event_loop_lag": loop_lag_monitor.snapshot()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
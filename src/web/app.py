@@ -1,8 +1,10 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import json
-from typing import List
+from typing import List, Optional
 import base64
+import hashlib
 from io import BytesIO
 from PIL import Image
 import os
@@ -16,6 +18,39 @@ st.set_page_config(
 
 # Constants
 API_URL = os.getenv("API_URL", "http://localhost:8000")  # Use environment variable with local fallback
+CONNECT_TIMEOUT = 5  # seconds
+READ_TIMEOUT = 60  # seconds between bytes; the event stream sends keep-alives more often
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """HTTP session shared by all script reruns and users, reusing pooled connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def request(method: str, path: str, **kwargs) -> requests.Response:
+    """Call the API with the shared session and timeouts."""
+    response = get_session().request(method, f"{API_URL}{path}", timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), **kwargs)
+    response.raise_for_status()
+    return response
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def encode_image(digest: str, _data: bytes) -> str:
+    """PNG data URI of an uploaded image, computed once per upload digest."""
+    # The leading underscore keeps Streamlit from hashing the image bytes on every lookup
+    image = Image.open(BytesIO(_data))
+    buffered = BytesIO()
+    image.save(buffered, format="PNG")
+    return f"data:image/png;base64,{base64.b64encode(buffered.getvalue()).decode()}"
+
+def encode_uploads(uploaded_files) -> List[str]:
+    concept_images = []
+    for file in uploaded_files or []:
+        data = file.getvalue()
+        concept_images.append(encode_image(hashlib.sha256(data).hexdigest(), data))
+    return concept_images
 
 def display_messages(messages: List[dict]):
     """Display the conversation messages in a chat-like interface."""
@@ -23,19 +58,68 @@ def display_messages(messages: List[dict]):
         with st.chat_message(msg["agent"]):
             st.write(msg["content"])
 
-def display_state(state: dict):
-    """Display the current state of the evaluation."""
+def display_partial_evaluation(placeholder, fields: dict):
+    """Render the final evaluation fields generated so far."""
+    with placeholder.container():
+        if "feasibility_score" in fields:
+            st.metric("Feasibility Score", f"{fields['feasibility_score']}/10")
+        if "go_decision" in fields:
+            st.write("**Go decision:** " + ("Go" if fields["go_decision"] else "No go"))
+        if fields.get("executive_summary"):
+            st.write(fields["executive_summary"])
+
+def follow_run(run_id: str) -> Optional[dict]:
+    """Render a run's new messages and streamed output until it stops; returns the final event.
+    
+    Only the rendered deltas are kept in session state: the messages and the
+    final evaluation fields, never the full evaluation state.
+    """
+    placeholder = st.empty()
+    done = None
+    after = len(st.session_state.messages)
+    with request("GET", f"/runs/{run_id}/stream", params={"after": after}, stream=True) as response:
+        for line in response.iter_lines():
+            if not line:
+                continue
+            event = json.loads(line)
+            if event["type"] == "message":
+                message = {"agent": event["agent"], "content": event["content"]}
+                st.session_state.messages.append(message)
+                display_messages([message])
+            elif event["type"] == "partial" and event["node"] == "final_score":
+                st.session_state.final_evaluation = event["fields"]
+                display_partial_evaluation(placeholder, event["fields"])
+            elif event["type"] == "done":
+                done = event
+    if done is not None:
+        st.session_state.run_status = done["status"]
+        st.session_state.awaiting_human_input = done["awaiting_human_input"]
+        if done["final_evaluation"]:
+            st.session_state.final_evaluation = done["final_evaluation"]
+        if done["status"] == "failed":
+            st.error(f"Evaluation failed: {done['error']}")
+    return done
+
+def display_state(run_id: str):
+    """Display the full state of the evaluation, fetched only on request."""
     with st.expander("Current State", expanded=False):
-        st.json(state)
+        if st.checkbox("Load full state"):
+            st.json(request("GET", f"/runs/{run_id}").json()["state"])
 
 def main():
     st.title("📦 Packaging Evaluation Tool")
     
-    # Initialize session state
-    if "evaluation_state" not in st.session_state:
-        st.session_state.evaluation_state = None
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    # Initialize session state: the run id and what has been rendered so far
+    defaults = {
+        "run_id": None,
+        "run_status": None,
+        "awaiting_human_input": False,
+        "messages": [],
+        "final_evaluation": None,
+    }
+    for key, value in defaults.items():
+        if key not in st.session_state:
+            st.session_state[key] = value
     
     # Sidebar for input
     with st.sidebar:
@@ -52,64 +136,76 @@ def main():
             accept_multiple_files=True
         )
         
-        if st.button("Start Evaluation"):
-            if not packaging_concept:
-                st.error("Please provide a packaging concept description")
-                return
-            
-            # Convert images to base64
-            concept_images = []
-            for file in uploaded_files:
-                if file is not None:
-                    image = Image.open(file)
-                    buffered = BytesIO()
-                    image.save(buffered, format="PNG")
-                    img_str = base64.b64encode(buffered.getvalue()).decode()
-                    concept_images.append(f"data:image/png;base64,{img_str}")
-            
-            # Make API request
+        start = st.button("Start Evaluation")
+    
+    # Main content area: what was rendered on earlier reruns
+    if not start:
+        display_messages(st.session_state.messages)
+        if st.session_state.final_evaluation and st.session_state.run_status != "running":
+            display_partial_evaluation(st.empty(), st.session_state.final_evaluation)
+        
+        # A rerun (any widget interaction) closes the stream of a running evaluation: follow it again
+        if st.session_state.run_id and st.session_state.run_status == "running":
             try:
-                response = requests.post(
-                    f"{API_URL}/evaluate",
-                    json={
-                        "packaging_concept": packaging_concept,
-                        "concept_images": concept_images
-                    }
-                )
-                response.raise_for_status()
-                result = response.json()
-                
-                # Update session state
-                st.session_state.evaluation_state = result["state"]
-                st.session_state.messages = result["messages"]
-                
+                follow_run(st.session_state.run_id)
             except requests.exceptions.RequestException as e:
                 st.error(f"Error: {str(e)}")
     
-    # Main content area
-    if st.session_state.evaluation_state:
-        # Display messages
-        display_messages(st.session_state.messages)
+    if start:
+        if not packaging_concept:
+            st.error("Please provide a packaging concept description")
+            return
         
+        # Start the run without waiting, then follow its progress
+        try:
+            result = request(
+                "POST",
+                "/evaluate",
+                json={
+                    "packaging_concept": packaging_concept,
+                    "concept_images": encode_uploads(uploaded_files),
+                    "wait": False
+                }
+            ).json()
+            st.session_state.run_id = result["run_id"]
+            st.session_state.run_status = result["status"]
+            st.session_state.messages = []
+            st.session_state.final_evaluation = None
+            follow_run(result["run_id"])
+        except requests.exceptions.RequestException as e:
+            st.error(f"Error: {str(e)}")
+    
+    if st.session_state.run_id:
         # Display state (collapsed by default)
-        display_state(st.session_state.evaluation_state)
+        display_state(st.session_state.run_id)
         
         # If waiting for human feedback
-        if st.session_state.evaluation_state.get("awaiting_human_input"):
+        if st.session_state.awaiting_human_input:
             st.info("Human feedback required")
             with st.form("feedback_form"):
+                is_correct = st.checkbox("The components and materials are correct")
                 feedback = st.text_area("Your Feedback")
+                suggested_changes = st.text_area("Suggested changes (one per line)")
                 submitted = st.form_submit_button("Submit Feedback")
-                if submitted:
-                    try:
-                        response = requests.post(
-                            f"{API_URL}/submit_feedback",
-                            json={"feedback": feedback}
-                        )
-                        response.raise_for_status()
-                        st.success("Feedback submitted successfully")
-                    except requests.exceptions.RequestException as e:
-                        st.error(f"Error submitting feedback: {str(e)}")
+            if submitted:
+                try:
+                    request(
+                        "POST",
+                        f"/runs/{st.session_state.run_id}/feedback",
+                        json={
+                            "is_correct": is_correct,
+                            "feedback_notes": [feedback] if feedback else [],
+                            "suggested_changes": [line for line in suggested_changes.splitlines() if line.strip()]
+                        }
+                    )
+                    st.session_state.awaiting_human_input = False
+                    st.success("Feedback submitted successfully")
+                    
+                    # Show progress as it happens, including the final evaluation as it is written
+                    follow_run(st.session_state.run_id)
+                    st.rerun()
+                except requests.exceptions.RequestException as e:
+                    st.error(f"Error submitting feedback: {str(e)}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
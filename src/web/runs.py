@@ -0,0 +1,190 @@
+"""Registry of evaluation runs, their tasks and checkpointed state."""
+import asyncio
+import time
+import uuid
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.packaging_evaluation.state import PackagingEvaluationState
+
+# Run statuses
+RUNNING = "running"
+AWAITING_INPUT = "awaiting_input"
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+class EvaluationRun:
+    """A single evaluation and the last state checkpointed after a finished node.
+
+    Every checkpoint is a new state version. The run remembers the version in
+    which each field last changed and in which each message was added, so
+    clients that already hold a version only need the difference.
+    """
+
+    def __init__(self, run_id: str, state: PackagingEvaluationState, key: Optional[str] = None):
+        self.run_id = run_id
+        self.state = state
+        self.key = key
+        self.version = 0
+        self._fields = state.model_dump(exclude={"messages"})
+        self.field_versions: Dict[str, int] = {name: 0 for name in self._fields}
+        self.message_versions: List[int] = [0] * len(state.messages)
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        self._pending_cancel: Optional[asyncio.TimerHandle] = None
+        # Incrementally parsed output of the node currently streaming, if any
+        self.partial: Optional[Dict[str, Any]] = None
+        self._updated = asyncio.Event()
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    @property
+    def status(self) -> str:
+        """Run status, derived from the outcome of its task."""
+        if self.task is None or not self.task.done():
+            return RUNNING
+        if self.task.cancelled():
+            return CANCELLED
+        if self.task.exception() is not None:
+            return FAILED
+        return COMPLETED if self.state.process_complete else AWAITING_INPUT
+
+    @property
+    def error(self) -> Optional[str]:
+        if self.status != FAILED:
+            return None
+        return str(self.task.exception())
+
+    def start(self, coro) -> asyncio.Task:
+        """Run the evaluation coroutine as a task."""
+        self.task = asyncio.create_task(coro)
+        self.task.add_done_callback(lambda _: self._notify())
+        self._notify()
+        return self.task
+
+    def checkpoint(self, state: PackagingEvaluationState, changed: Optional[Iterable[str]] = None):
+        """Record the state after a node finished (or was changed by a client) as a new version.
+        
+        `changed` names the fields a partial update touched; only those are
+        dumped and compared, instead of the whole state.
+        """
+        self.version += 1
+        if changed is None:
+            fields = state.model_dump(exclude={"messages"})
+        else:
+            names = set(changed) - {"messages"}
+            fields = state.model_dump(include=names) if names else {}
+        for name, value in fields.items():
+            if self._fields.get(name) != value:
+                self.field_versions[name] = self.version
+        self._fields = fields if changed is None else {**self._fields, **fields}
+        self.message_versions.extend([self.version] * (len(state.messages) - len(self.message_versions)))
+        self.state = state
+        self.partial = None
+        self.updated_at = time.time()
+        self._notify()
+
+    def delta(self, since: int = -1) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+        """Fields changed and messages added after version `since` (everything by default)."""
+        changed = {name: self._fields[name] for name, version in self.field_versions.items() if version > since}
+        first = bisect_right(self.message_versions, since)
+        return changed, self.state.messages[first:len(self.message_versions)]
+
+    def publish_partial(self, node: str, fields: Dict[str, Any]):
+        """Record the partially generated output of a streaming node."""
+        self.partial = {"node": node, "fields": fields}
+        self._notify()
+
+    def _notify(self):
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def wait_for_update(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the run checkpoints, streams output or finishes. Returns False on timeout."""
+        try:
+            await asyncio.wait_for(self._updated.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def attach(self):
+        """Register a client waiting for this run."""
+        self.waiters += 1
+        if self._pending_cancel is not None:
+            self._pending_cancel.cancel()
+            self._pending_cancel = None
+
+    def detach(self, grace_period: float):
+        """Unregister a waiting client; cancel after `grace_period` if none are left."""
+        self.waiters -= 1
+        if self.waiters == 0 and self.task is not None and not self.task.done():
+            self._pending_cancel = asyncio.get_running_loop().call_later(grace_period, self._cancel_if_abandoned)
+
+    def _cancel_if_abandoned(self):
+        self._pending_cancel = None
+        if self.waiters == 0:
+            self.cancel()
+
+    def cancel(self) -> bool:
+        """Cancel the running task, if any. Returns whether a task was cancelled."""
+        if self.task is None or self.task.done():
+            return False
+        self.task.cancel()
+        return True
+
+
+class RunRegistry:
+    """Keeps active runs and a bounded history of finished ones."""
+
+    def __init__(self, max_finished: int = 1000):
+        self.max_finished = max_finished
+        self.runs: "OrderedDict[str, EvaluationRun]" = OrderedDict()
+        # Request key (digest or idempotency key) -> id of the run serving it
+        self.keys: Dict[str, str] = {}
+        self.coalesced = 0
+
+    def create(
+        self,
+        state: PackagingEvaluationState,
+        run_id: Optional[str] = None,
+        key: Optional[str] = None
+    ) -> EvaluationRun:
+        """Register a new run, generating an id if the client did not supply one."""
+        run_id = run_id or uuid.uuid4().hex
+        existing = self.runs.get(run_id)
+        if existing is not None and existing.status == RUNNING:
+            raise ValueError(f"Run {run_id} is already running")
+        run = EvaluationRun(run_id, state, key)
+        self.runs[run_id] = run
+        self.runs.move_to_end(run_id)
+        if key:
+            self.keys[key] = run_id
+        self._evict()
+        return run
+
+    def get(self, run_id: str) -> Optional[EvaluationRun]:
+        return self.runs.get(run_id)
+
+    def find(self, key: str, include_finished: bool = False) -> Optional[EvaluationRun]:
+        """The run serving a request key: running, or also successfully finished if requested."""
+        run = self.runs.get(self.keys.get(key, ""))
+        if run is None:
+            self.keys.pop(key, None)
+            return None
+        if run.status == RUNNING or (include_finished and run.status in (COMPLETED, AWAITING_INPUT)):
+            return run
+        return None
+
+    def active(self) -> int:
+        """Number of runs currently executing."""
+        return sum(1 for run in self.runs.values() if run.status == RUNNING)
+
+    def _evict(self):
+        finished = [run_id for run_id, run in self.runs.items() if run.status != RUNNING]
+        for run_id in finished[:max(0, len(finished) - self.max_finished)]:
+            run = self.runs.pop(run_id)
+            if run.key and self.keys.get(run.key) == run_id:
+                del self.keys[run.key]
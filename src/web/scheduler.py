@@ -0,0 +1,165 @@
+"""Priority scheduling and admission control for evaluation runs."""
+import asyncio
+import itertools
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+# Priority classes, highest priority first
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+
+class QueueFull(Exception):
+    """Raised when an evaluation cannot be queued (or was shed from the queue)."""
+
+    def __init__(self, retry_after: int, message: str = "Evaluation queue is full"):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A request for an evaluation slot."""
+
+    def __init__(self, seq: int, client_id: str, priority: str):
+        self.seq = seq
+        self.client_id = client_id
+        self.priority = priority
+        self.rank = PRIORITIES.index(priority)
+        self.enqueued_at = time.monotonic()
+        self.admitted_at: Optional[float] = None
+        self.released = False
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def __await__(self):
+        return self.future.__await__()
+
+
+class EvaluationScheduler:
+    """Bounded priority queue in front of a fixed number of evaluation slots.
+
+    - Interactive requests are always admitted before batch requests, and
+      `reserved_interactive` slots are never given to batch work.
+    - No client runs more than `per_client_limit` evaluations at once; its
+      further requests wait in the queue.
+    - When the queue is full a new request is rejected with a retry hint,
+      unless it outranks a queued request, which is shed instead.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 16,
+        reserved_interactive: int = 4,
+        per_client_limit: int = 4,
+        max_queue: int = 64,
+        wait_window: int = 1000
+    ):
+        self.max_concurrent = max_concurrent
+        self.reserved_interactive = min(reserved_interactive, max_concurrent - 1)
+        self.per_client_limit = per_client_limit
+        self.max_queue = max_queue
+        self.queue: List[Ticket] = []
+        self.running: Dict[str, int] = {priority: 0 for priority in PRIORITIES}
+        self.running_by_client: Dict[str, int] = {}
+        self.waits: Dict[str, Deque[float]] = {priority: deque(maxlen=wait_window) for priority in PRIORITIES}
+        self.admitted = {priority: 0 for priority in PRIORITIES}
+        self.rejected = {priority: 0 for priority in PRIORITIES}
+        self.shed = {priority: 0 for priority in PRIORITIES}
+        self.mean_run_seconds = 30.0
+        self._seq = itertools.count()
+
+    def retry_after(self) -> int:
+        """Seconds until a rejected request is likely to be admitted."""
+        backlog = len(self.queue) + 1
+        return max(1, math.ceil(self.mean_run_seconds * backlog / self.max_concurrent))
+
+    def submit(self, client_id: str, priority: str) -> Ticket:
+        """Queue a request for a slot. Raises QueueFull if it cannot be queued."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        ticket = Ticket(next(self._seq), client_id, priority)
+
+        self._drop_abandoned()
+        if len(self.queue) >= self.max_queue:
+            victim = max(self.queue, key=lambda t: (t.rank, t.seq))
+            if victim.rank <= ticket.rank:
+                self.rejected[priority] += 1
+                raise QueueFull(self.retry_after())
+            # Shed the newest request of the lowest priority to make room
+            self.queue.remove(victim)
+            self.shed[victim.priority] += 1
+            victim.released = True
+            victim.future.set_exception(QueueFull(self.retry_after(), "Shed from the evaluation queue"))
+
+        self.queue.append(ticket)
+        self._dispatch()
+        return ticket
+
+    def release(self, ticket: Ticket):
+        """Give back a slot, or withdraw a request that is still queued."""
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.admitted_at is None:
+            self.queue.remove(ticket)
+            if not ticket.future.done():
+                ticket.future.cancel()
+        else:
+            self.running[ticket.priority] -= 1
+            self.running_by_client[ticket.client_id] -= 1
+            if not self.running_by_client[ticket.client_id]:
+                del self.running_by_client[ticket.client_id]
+            # Exponentially weighted mean run time, for Retry-After estimates
+            self.mean_run_seconds = 0.9 * self.mean_run_seconds + 0.1 * (time.monotonic() - ticket.admitted_at)
+        self._dispatch()
+
+    def _can_admit(self, ticket: Ticket) -> bool:
+        running = sum(self.running.values())
+        limit = self.max_concurrent if ticket.priority == INTERACTIVE else self.max_concurrent - self.reserved_interactive
+        return running < limit and self.running_by_client.get(ticket.client_id, 0) < self.per_client_limit
+
+    def _drop_abandoned(self):
+        """Remove queued requests whose waiter was cancelled before they were admitted.
+
+        Cancelling the task awaiting a ticket cancels its future at once, but
+        the task's done callback releases the ticket later.
+        """
+        for ticket in [t for t in self.queue if t.future.done()]:
+            self.queue.remove(ticket)
+            ticket.released = True
+
+    def _dispatch(self):
+        """Admit queued requests in priority order while slots are free."""
+        self._drop_abandoned()
+        for ticket in sorted(self.queue, key=lambda t: (t.rank, t.seq)):
+            if sum(self.running.values()) >= self.max_concurrent:
+                break
+            if not self._can_admit(ticket):
+                continue
+            self.queue.remove(ticket)
+            ticket.admitted_at = time.monotonic()
+            self.running[ticket.priority] += 1
+            self.running_by_client[ticket.client_id] = self.running_by_client.get(ticket.client_id, 0) + 1
+            self.admitted[ticket.priority] += 1
+            self.waits[ticket.priority].append(ticket.admitted_at - ticket.enqueued_at)
+            ticket.future.set_result(None)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Queue depth, running evaluations, admissions, shedding and wait times per priority."""
+        stats = {}
+        for priority in PRIORITIES:
+            waits = sorted(self.waits[priority])
+            stats[priority] = {
+                "queued": sum(1 for t in self.queue if t.priority == priority),
+                "running": self.running[priority],
+                "admitted": self.admitted[priority],
+                "rejected": self.rejected[priority],
+                "shed": self.shed[priority],
+                "wait_p50_ms": round(1000 * waits[len(waits) // 2], 1) if waits else 0.0,
+                "wait_p95_ms": round(1000 * waits[min(len(waits) - 1, int(0.95 * len(waits)))], 1) if waits else 0.0,
+            }
+        stats["clients_running"] = len(self.running_by_client)
+        stats["retry_after_s"] = self.retry_after()
+        return stats
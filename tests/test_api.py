@@ -0,0 +1,212 @@
+import asyncio
+import json
+from typing import Optional
+
+import httpx
+import pytest
+
+from benchmarks.fakes import FakeChatModel
+from src.packaging_evaluation import tools
+from src.web import api
+from src.web.runs import AWAITING_INPUT, CANCELLED, COMPLETED, RUNNING, RunRegistry
+from src.web.scheduler import INTERACTIVE, EvaluationScheduler
+
+CONCEPT = {"packaging_concept": "A PET bottle with a PP cap.", "near_duplicate": "off"}
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """The evaluation API with fake models, fresh runs and no stores."""
+    monkeypatch.setattr(tools, "llm", FakeChatModel(latency=0.05))
+    monkeypatch.setattr(tools, "small_llm", FakeChatModel(latency=0.05))
+    monkeypatch.setattr(tools, "component_store", None)
+    monkeypatch.setattr(api, "evaluation_index", None)
+    monkeypatch.setitem(api.HISTORY_CONFIG, "enabled", False)
+    monkeypatch.setattr(api, "evaluation_history", None)
+    monkeypatch.setattr(api, "runs", RunRegistry())
+    monkeypatch.setattr(api, "scheduler", EvaluationScheduler(max_concurrent=4, reserved_interactive=0, per_client_limit=4))
+    return api.app
+
+
+def client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api")
+
+
+class Connection:
+    """A request driven over ASGI, so the test can disconnect before the response is complete."""
+
+    def __init__(self, app, method: str, path: str, body: Optional[dict] = None):
+        self.events: "asyncio.Queue" = asyncio.Queue()
+        self._body = json.dumps(body).encode() if body is not None else b""
+        self._disconnected = asyncio.Event()
+        self._requested = False
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "headers": [(b"content-type", b"application/json")],
+            "scheme": "http",
+            "server": ("api", 80),
+            "client": ("test", 1234),
+        }
+        self._task = asyncio.create_task(app(scope, self._receive, self._send))
+
+    async def _receive(self):
+        if not self._requested:
+            self._requested = True
+            return {"type": "http.request", "body": self._body, "more_body": False}
+        await self._disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def _send(self, message):
+        for line in message.get("body", b"").splitlines():
+            if line.strip():
+                await self.events.put(json.loads(line))
+
+    async def disconnect(self):
+        self._disconnected.set()
+        await asyncio.wait_for(self._task, 5)
+
+
+async def start_run(http: httpx.AsyncClient, **request) -> str:
+    response = await http.post("/evaluate", json={**CONCEPT, "wait": False, **request})
+    assert response.status_code == 200
+    return response.json()["run_id"]
+
+
+def slow_models(monkeypatch):
+    """Models slow enough that runs are still at their first node when the test checks them."""
+    monkeypatch.setattr(tools, "llm", FakeChatModel(latency=5.0))
+    monkeypatch.setattr(tools, "small_llm", FakeChatModel(latency=5.0))
+
+
+def test_wait_false_run_is_cancelled_after_its_last_stream_closes(app, monkeypatch):
+    monkeypatch.setattr(api, "STREAM_GRACE_PERIOD", 0.1)
+    slow_models(monkeypatch)
+
+    async def scenario():
+        async with client(app) as http:
+            run_id = await start_run(http)
+            run = api.runs.get(run_id)
+            # Nobody streamed it yet: a polling client may follow it
+            await asyncio.sleep(0.15)
+            assert run.status == RUNNING
+
+            stream = Connection(app, "GET", f"/runs/{run_id}/stream")
+            await asyncio.sleep(0.05)
+            assert run.waiters == 1
+            await stream.disconnect()
+            assert run.status == RUNNING
+            await asyncio.sleep(0.2)
+            assert run.status == CANCELLED
+
+    asyncio.run(scenario())
+
+
+def test_stream_reopened_within_the_grace_period_keeps_the_run(app, monkeypatch):
+    monkeypatch.setattr(api, "STREAM_GRACE_PERIOD", 0.1)
+    slow_models(monkeypatch)
+
+    async def scenario():
+        async with client(app) as http:
+            run_id = await start_run(http)
+            run = api.runs.get(run_id)
+            stream = Connection(app, "GET", f"/runs/{run_id}/stream")
+            await asyncio.sleep(0.05)
+            await stream.disconnect()
+
+            # Like a Streamlit rerun following the run again
+            stream = Connection(app, "GET", f"/runs/{run_id}/stream")
+            await asyncio.sleep(0.2)
+            assert run.status == RUNNING
+            await stream.disconnect()
+            run.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_waiting_evaluation_is_cancelled_when_its_client_disconnects(app, monkeypatch):
+    monkeypatch.setattr(api, "CANCEL_GRACE_PERIOD", 0.05)
+    slow_models(monkeypatch)
+
+    async def scenario():
+        connection = Connection(app, "POST", "/evaluate", {**CONCEPT, "run_id": "abandoned"})
+        await asyncio.sleep(0.05)
+        run = api.runs.get("abandoned")
+        assert run.waiters == 1
+        await connection.disconnect()
+        await asyncio.sleep(0.1)
+        assert run.status == CANCELLED
+        assert api.scheduler.stats()[INTERACTIVE]["running"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancel_endpoint_stops_the_run(app, monkeypatch):
+    slow_models(monkeypatch)
+
+    async def scenario():
+        async with client(app) as http:
+            run_id = await start_run(http)
+            response = await http.post(f"/runs/{run_id}/cancel")
+            assert response.json() == {"run_id": run_id, "status": CANCELLED}
+            # Cancelled runs keep their last checkpoint
+            assert (await http.get(f"/runs/{run_id}")).json()["status"] == CANCELLED
+            assert (await http.post("/runs/unknown/cancel")).status_code == 404
+
+    asyncio.run(scenario())
+
+
+def test_feedback_resume_stream_and_since_deltas(app, monkeypatch):
+    monkeypatch.setattr(tools, "llm", FakeChatModel(overrides={
+        "ReflectionNotes": {"requires_iteration": False, "assessment_approved": True}
+    }))
+
+    async def scenario():
+        async with client(app) as http:
+            paused = (await http.post("/evaluate", json=CONCEPT)).json()
+            assert paused["status"] == AWAITING_INPUT
+            assert [message["agent"] for message in paused["messages"]] == ["concept_breaker", "human_feedback"]
+            run_id, version = paused["run_id"], paused["version"]
+            assert (await http.get(f"/runs/{run_id}", params={"since": version})).json()["state"] == {}
+
+            feedback = {"is_correct": True, "feedback_notes": [], "suggested_changes": []}
+            resumed = (await http.post(f"/runs/{run_id}/feedback", params={"since": version}, json=feedback)).json()
+            # Only the fields the feedback changed, without the messages already received
+            assert set(resumed["state"]) == {"user_feedback", "awaiting_human_input", "feedback_iteration"}
+            assert resumed["messages"] == []
+            conflict = await http.post(f"/runs/{run_id}/feedback", json=feedback)
+            assert conflict.status_code == 409
+
+            # The stream resumes after the messages already received and ends with the outcome
+            stream = await http.get(f"/runs/{run_id}/stream", params={"after": 2})
+            events = [json.loads(line) for line in stream.text.splitlines() if line.strip()]
+            assert stream.headers["content-type"] == "application/x-ndjson"
+            assert events[0]["index"] == 2 and events[0]["agent"] == "feedback_processor"
+            done = events[-1]
+            assert done["type"] == "done" and done["status"] == COMPLETED and done["final_evaluation"] is not None
+
+            delta = (await http.get(f"/runs/{run_id}", params={"since": resumed["version"]})).json()
+            assert delta["version"] == done["version"] and delta["process_complete"]
+            assert "final_evaluation" in delta["state"] and "components" not in delta["state"]
+            assert len(delta["messages"]) == len(events) - sum(event["type"] != "message" for event in events)
+
+    asyncio.run(scenario())
+
+
+def test_history_is_opened_on_first_use(app, monkeypatch, tmp_path):
+    path = tmp_path / "data" / "evaluation_history.db"
+    monkeypatch.setitem(api.HISTORY_CONFIG, "enabled", True)
+    monkeypatch.setitem(api.HISTORY_CONFIG, "path", str(path))
+    assert not path.exists()
+
+    async def scenario():
+        async with client(app) as http:
+            response = await http.get("/evaluations")
+            assert response.status_code == 200 and response.json() == {"evaluations": []}
+
+    asyncio.run(scenario())
+    assert path.exists() and api.open_history() is api.evaluation_history
+    api.evaluation_history.close()
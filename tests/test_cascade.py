@@ -0,0 +1,107 @@
+import asyncio
+
+from benchmarks.fakes import FakeChatModel, build_fake_instance
+from src.packaging_evaluation import tools
+from src.packaging_evaluation.cascade import (
+    ERROR,
+    LOW_CONFIDENCE,
+    VALIDATION,
+    CascadeStats,
+    cascade_invoke,
+    cascade_stats,
+)
+from src.packaging_evaluation.configuration import AGENT_CONFIG
+from src.packaging_evaluation.state import (
+    Component,
+    ComponentAssessment,
+    FinalEvaluation,
+    PackagingEvaluationState,
+    ReflectionNotes,
+    TechnicalAssessment,
+)
+from src.packaging_evaluation.tools import validate_final, validate_reflection, validate_technical
+
+SMALL_ANSWER = {"component_name": "Bottle", "feasible": True, "notes": "Small model.", "challenges": [], "technical_score": 0.9}
+LARGE_ANSWER = {**SMALL_ANSWER, "notes": "Large model."}
+
+
+class FailingModel(FakeChatModel):
+    def with_structured_output(self, schema, **kwargs):
+        raise ValueError("could not parse the answer")
+
+
+def invoke(small, validate=None, min_confidence=0.7):
+    stats = CascadeStats()
+    large = FakeChatModel(overrides={"ComponentAssessment": LARGE_ANSWER})
+    result = asyncio.run(cascade_invoke(
+        "assess", ComponentAssessment, ["Assess the bottle."], small, large, min_confidence, validate, stats
+    ))
+    return result, stats.snapshot()["assess"]
+
+
+def small_model(confidence: float) -> FakeChatModel:
+    return FakeChatModel(overrides={"ComponentAssessmentWithConfidence": {**SMALL_ANSWER, "confidence": confidence}})
+
+
+def test_confident_small_answer_is_kept():
+    result, stats = invoke(small_model(0.9))
+    assert result == ComponentAssessment(**SMALL_ANSWER)
+    assert (stats["calls"], stats["escalations"]) == (1, 0)
+
+
+def test_escalation_reasons():
+    for small, validate, reason in [
+        (small_model(0.5), None, LOW_CONFIDENCE),
+        # Confidence outside 0-1 is not trusted
+        (small_model(7.0), None, LOW_CONFIDENCE),
+        (small_model(0.9), lambda result: "no challenges listed", VALIDATION),
+        (FailingModel(), None, ERROR),
+    ]:
+        result, stats = invoke(small, validate)
+        assert result.notes == "Large model."
+        assert stats["reasons"] == {reason: 1}
+
+
+
+def test_consistency_checks():
+    bottle = Component(name="Bottle", material="PET", function="Holds", requirements=[])
+    cap = Component(name="Cap", material="PP", function="Closes", requirements=[])
+    technical = TechnicalAssessment(
+        overall_feasible=True, component_assessments=[ComponentAssessment(**SMALL_ANSWER)], technical_summary="Fine."
+    )
+    assert validate_technical(technical, [bottle]) is None
+    assert "count" in validate_technical(technical, [bottle, cap])
+    out_of_range = technical.model_copy(update={
+        "component_assessments": [ComponentAssessment(**{**SMALL_ANSWER, "technical_score": 8})]
+    })
+    assert "out of range" in validate_technical(out_of_range, [bottle])
+
+    final = build_fake_instance(FinalEvaluation, overrides={"feasibility_score": 7})
+    assert validate_final(final) is None
+    assert validate_final(final.model_copy(update={"feasibility_score": 0})) == "Feasibility score out of range"
+
+    state = PackagingEvaluationState(packaging_concept="A bottle.", components=[bottle, cap], technical_assessment=technical)
+    approved = build_fake_instance(ReflectionNotes, overrides={"assessment_approved": True, "requires_iteration": False, "iteration_count": 1})
+    assert validate_reflection(approved, state) == "Approved an inconsistent technical assessment"
+    assert validate_reflection(approved, state.model_copy(update={"components": [bottle]})) is None
+
+
+def test_technical_assessment_missing_a_component_is_escalated(monkeypatch):
+    monkeypatch.setitem(AGENT_CONFIG["technical_feasibility"], "cascade", {"min_confidence": 0.5})
+    monkeypatch.setattr(tools, "component_store", None)
+    small = FakeChatModel(overrides={"TechnicalAssessmentWithConfidence": {
+        "component_assessments": [ComponentAssessment(**SMALL_ANSWER)], "confidence": 0.9
+    }})
+    large = FakeChatModel(list_length=2)
+    monkeypatch.setattr(tools, "small_llm", small)
+    monkeypatch.setattr(tools, "llm", large)
+    components = [
+        Component(name="Bottle", material="PET", function="Holds", requirements=[]),
+        Component(name="Cap", material="PP", function="Closes", requirements=[]),
+    ]
+
+    before = cascade_stats.snapshot().get("technical_feasibility", {}).get("reasons", {}).get(VALIDATION, 0)
+    technical, _ = asyncio.run(tools.assess_components(components))
+    assert (small.calls, large.calls) == (1, 1)
+    assert len(technical.component_assessments) == 2
+    assert cascade_stats.snapshot()["technical_feasibility"]["reasons"][VALIDATION] == before + 1
@@ -0,0 +1,58 @@
+import asyncio
+import io
+import json
+
+from benchmarks.fakes import FakeEmbeddings, LocalSupabase
+from src.packaging_evaluation.vector_store.catalog import entry_id, import_catalog, read_records
+from src.packaging_evaluation.vector_store.client import VectorStoreClient
+from src.packaging_evaluation.vector_store.keyword_index import KeywordIndex
+from src.packaging_evaluation.vector_store.search_cache import SearchCache
+
+MACHINE = {
+    "id": "press-1",
+    "name": "Thermoformer",
+    "type": "thermoformer",
+    "capabilities": ["PET trays"],
+    "constraints": [],
+    "specifications": "Forms PET trays up to 0.8 mm."
+}
+
+
+def import_lines(lines, **options):
+    supabase = LocalSupabase()
+    client = VectorStoreClient(
+        supabase=supabase, embeddings=FakeEmbeddings(dimensions=8), keyword_index=KeywordIndex(), search_cache=SearchCache()
+    )
+    errors = io.StringIO()
+    records = read_records(io.StringIO("\n".join(lines) + "\n"), "jsonl")
+    counts = asyncio.run(import_catalog(records, client, kind="machine", errors=errors, concurrency=2, **options))
+    return counts, [json.loads(line) for line in errors.getvalue().splitlines()], supabase
+
+
+def test_malformed_lines_are_rejected_without_stopping_the_import():
+    counts, errors, supabase = import_lines([
+        json.dumps(MACHINE),
+        "{not json",
+        "null",
+        "[1, 2]",
+        json.dumps({**MACHINE, "id": "press-2", "capabilities": "vacuum; pressure"}),
+    ], batch_size=1)
+
+    assert (counts["read"], counts["imported"], counts["invalid"]) == (5, 2, 3)
+    assert [error["line"] for error in errors] == [2, 3, 4]
+    assert errors[0]["record"] == "{not json"
+    assert "Expected a JSON object, got NoneType" in errors[1]["error"]
+    rows = supabase.tables["knowledge_base"]
+    assert rows[entry_id("machine", "press-2")]["metadata"]["capabilities"] == ["vacuum", "pressure"]
+
+
+def test_records_failing_validation_are_written_to_errors():
+    counts, errors, _ = import_lines([
+        json.dumps({key: value for key, value in MACHINE.items() if key != "name"}),
+        json.dumps({**MACHINE, "kind": "tool"}),
+        json.dumps(MACHINE),
+    ])
+
+    assert (counts["imported"], counts["invalid"]) == (1, 2)
+    assert "name" in errors[0]["error"] and errors[0]["line"] == 1
+    assert "Unknown spec kind: 'tool'" in errors[1]["error"]
@@ -0,0 +1,102 @@
+import asyncio
+
+from benchmarks.fakes import FakeChatModel
+from src.packaging_evaluation import component_store as component_store_module
+from src.packaging_evaluation import tools
+from src.packaging_evaluation.component_store import (
+    ComponentAssessmentStore,
+    component_signature,
+    match_assessments,
+)
+from src.packaging_evaluation.state import Component, ComponentAssessment, ReflectionNotes
+
+BOTTLE = Component(name="Bottle", material="PET", function="Holds the liquid", requirements=["food contact", "clear"])
+
+
+def assessment(name: str = "Bottle", score: float = 0.8) -> ComponentAssessment:
+    return ComponentAssessment(component_name=name, feasible=True, notes="Fine.", challenges=[], technical_score=score)
+
+
+def assessing_model(*assessments: ComponentAssessment) -> FakeChatModel:
+    """A model answering every technical assessment with these component assessments."""
+    return FakeChatModel(overrides={"TechnicalAssessment": {"component_assessments": list(assessments)}})
+
+
+def test_signature_ignores_case_punctuation_and_requirement_order():
+    variant = Component(name="bottle!", material="  pet ", function="holds the liquid", requirements=["Clear", "Food contact"])
+    assert component_signature(variant) == component_signature(BOTTLE)
+
+
+def test_get_renames_to_the_requested_component():
+    store = ComponentAssessmentStore()
+    store.put(BOTTLE, assessment())
+    renamed = BOTTLE.model_copy(update={"name": "BOTTLE"})
+    assert store.get(renamed).component_name == "BOTTLE"
+    assert store.stats()["hits"] == 1
+
+
+def test_assessments_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(component_store_module.time, "time", lambda: now[0])
+    store = ComponentAssessmentStore(max_age=60)
+    store.put(BOTTLE, assessment())
+    now[0] += 30
+    assert store.get(BOTTLE) is not None
+    now[0] += 31
+    assert store.get(BOTTLE) is None
+    assert store.stats()["expired"] == 1
+
+
+def test_persisted_assessments_keep_their_age(tmp_path, monkeypatch):
+    path = tmp_path / "assessments.jsonl"
+    now = [1000.0]
+    monkeypatch.setattr(component_store_module.time, "time", lambda: now[0])
+    ComponentAssessmentStore(str(path)).put(BOTTLE, assessment())
+
+    now[0] += 120
+    assert ComponentAssessmentStore(str(path)).get(BOTTLE) is not None
+    assert ComponentAssessmentStore(str(path), max_age=60).get(BOTTLE) is None
+
+
+def test_match_assessments_only_by_name():
+    cap = BOTTLE.model_copy(update={"name": "Cap"})
+    assert match_assessments([BOTTLE, cap], [assessment("cap"), assessment("bottle")]) == {
+        0: assessment("bottle"),
+        1: assessment("cap"),
+    }
+    # Renamed components are not paired by position, which could swap their assessments
+    assert match_assessments([BOTTLE, cap], [assessment("Closure"), assessment("bottle")]) == {0: assessment("bottle")}
+
+
+def test_renamed_components_are_not_stored(monkeypatch):
+    monkeypatch.setattr(tools, "llm", assessing_model(assessment("Body")))
+    monkeypatch.setattr(tools, "component_store", ComponentAssessmentStore())
+    technical, _ = asyncio.run(tools.assess_components([BOTTLE]))
+    assert [a.component_name for a in technical.component_assessments] == ["Body"]
+    assert tools.component_store.stats()["size"] == 0
+
+
+def test_reflection_rerun_does_not_reuse_stored_assessments(monkeypatch):
+    model = assessing_model(assessment("Bottle"), assessment("Cap"))
+    monkeypatch.setattr(tools, "llm", model)
+    monkeypatch.setattr(tools, "component_store", ComponentAssessmentStore())
+    components = [BOTTLE, BOTTLE.model_copy(update={"name": "Cap", "material": "PP"})]
+    reflection = ReflectionNotes(
+        blind_spots=["Hot fill"],
+        questions=["Does the cap survive hot filling?"],
+        requires_iteration=True,
+        reflection_summary="Check hot filling.",
+        assessment_approved=False,
+        iteration_count=1
+    )
+
+    async def scenario():
+        _, reused = await tools.assess_components(components)
+        assert (reused, model.calls) == (0, 1)
+        _, reused = await tools.assess_components(components)
+        assert (reused, model.calls) == (2, 1)
+        # Reflection asked for another iteration: the model assesses every component again
+        _, reused = await tools.assess_components(components, reflection)
+        assert (reused, model.calls) == (0, 2)
+
+    asyncio.run(scenario())
@@ -0,0 +1,21 @@
+import uuid
+
+from src.packaging_evaluation.vector_store.document_processor import DocumentMetadata, DocumentProcessor
+
+
+def process(path):
+    metadata = DocumentMetadata(filename=path.name, file_type=".txt", file_size=path.stat().st_size, agent_type="technical")
+    return DocumentProcessor(chunk_size=100, chunk_overlap=5).process_document(str(path), metadata)
+
+
+def test_chunk_ids_are_uuids_stable_per_file_and_index(tmp_path):
+    path = tmp_path / "manual.txt"
+    path.write_text(" ".join(f"word{i}" for i in range(200)))
+
+    entries = process(path)
+    assert len(entries) > 1
+    # knowledge_base.id is a uuid column
+    assert all(str(uuid.UUID(entry.id)) == entry.id for entry in entries)
+    assert len({entry.id for entry in entries}) == len(entries)
+    # Re-ingesting the same file upserts the same rows
+    assert [entry.id for entry in process(path)] == [entry.id for entry in entries]
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings, build_fake_instance
+from src.packaging_evaluation.evaluation_index import (
+    REUSE,
+    SEED,
+    EvaluationIndex,
+    apply_prior_evaluation,
+)
+from src.packaging_evaluation.state import Component, FinalEvaluation, PackagingEvaluationState
+
+CONCEPT = "A recyclable PET bottle with a tethered PP cap and a paper label"
+IMAGE = "https://example.com/bottle.png"
+
+
+def completed_state(concept=CONCEPT, images=(IMAGE,)) -> PackagingEvaluationState:
+    return PackagingEvaluationState(
+        packaging_concept=concept,
+        concept_images=list(images),
+        components=[Component(name="Bottle", material="PET", function="Holds the liquid", requirements=[])],
+        final_evaluation=build_fake_instance(FinalEvaluation, concept, {"feasibility_score": 8}),
+        process_complete=True
+    )
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = EvaluationIndex(str(tmp_path / "index.jsonl"), embeddings=FakeEmbeddings(dimensions=64))
+    asyncio.run(index.add(completed_state()))
+    return index
+
+
+def find(index, concept=CONCEPT, images=(IMAGE,), threshold=0.9):
+    return asyncio.run(index.find_similar(concept, list(images), threshold))
+
+
+def test_rewording_matches_above_the_threshold(index):
+    reworded = "A recyclable PET bottle with a tethered PP cap and a paper sleeve label"
+    prior, similarity = find(index, reworded)
+    assert prior.packaging_concept == CONCEPT and 0.9 <= similarity < 1.0
+    assert find(index, reworded, threshold=0.99) is None
+    assert find(index, "An aluminium can with a printed shrink sleeve") is None
+
+
+def test_images_must_be_the_same_set(index):
+    assert find(index, images=()) is None
+    assert find(index, images=(IMAGE, "https://example.com/cap.png")) is None
+    assert find(index, images=("https://example.com/other.png",)) is None
+    # Candidates are filtered by image digest before the concept is embedded
+    assert index.embeddings.calls == 1
+
+
+def test_index_is_reloaded_from_its_file(index):
+    reloaded = EvaluationIndex(str(index.path), embeddings=FakeEmbeddings(dimensions=64))
+    prior, _ = find(reloaded)
+    assert prior.id == index.entries[0].id
+
+
+def test_reuse_completes_the_state(index):
+    prior, similarity = find(index)
+    state = apply_prior_evaluation(PackagingEvaluationState(packaging_concept=CONCEPT), prior, similarity, REUSE)
+    assert state.process_complete and state.reused_from == prior.id
+    assert state.final_evaluation == prior.final_evaluation and state.evaluation_score == 8
+    assert state.components == prior.components
+
+
+def test_seed_continues_at_human_feedback(index):
+    prior, similarity = find(index)
+    state = apply_prior_evaluation(PackagingEvaluationState(packaging_concept=CONCEPT), prior, similarity, SEED)
+    assert state.current_node == "human_feedback" and not state.process_complete
+    assert state.components == prior.components and state.final_evaluation is None
+    assert state.reused_from is None
+
+
+def test_unknown_mode_is_rejected(index):
+    prior, similarity = find(index)
+    with pytest.raises(ValueError):
+        apply_prior_evaluation(PackagingEvaluationState(packaging_concept=CONCEPT), prior, similarity, "merge")
+
+
+def test_only_completed_evaluations_are_indexed(index):
+    with pytest.raises(ValueError):
+        asyncio.run(index.add(PackagingEvaluationState(packaging_concept=CONCEPT)))
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from benchmarks.fakes import build_fake_instance
+from src.packaging_evaluation.history import FULL, REUSED, TRIAGE, EvaluationHistory, HistoryFilter
+from src.packaging_evaluation.state import Component, FinalEvaluation, PackagingEvaluationState
+
+
+def evaluation(score: int, materials, **update) -> PackagingEvaluationState:
+    return PackagingEvaluationState(
+        packaging_concept=f"Concept scoring {score}.",
+        concept_images=["data:image/png;base64,AAAA"],
+        components=[
+            Component(name=f"Part {i}", material=material, function="Holds", requirements=[])
+            for i, material in enumerate(materials)
+        ],
+        final_evaluation=build_fake_instance(
+            FinalEvaluation, overrides={"feasibility_score": score, "go_decision": score >= 7}
+        ),
+        **update
+    )
+
+
+@pytest.fixture
+def history():
+    history = EvaluationHistory()
+    history.add_many([
+        (evaluation(8, ["PET", "PP"]), "run-1"),
+        (evaluation(4, ["Recycled PET film"], current_node=TRIAGE), None),
+        (evaluation(9, ["Aluminium"], reused_from="earlier"), None),
+    ])
+    yield history
+    history.close()
+
+
+def test_only_completed_evaluations_are_stored(history):
+    with pytest.raises(ValueError):
+        history.add(PackagingEvaluationState(packaging_concept="Unfinished."))
+
+
+def test_queries_filter_by_score_decision_material_and_mode(history):
+    def concepts(**filters):
+        return sorted(record["packaging_concept"] for record in history.query(HistoryFilter(**filters)))
+
+    assert concepts(min_score=8) == ["Concept scoring 8.", "Concept scoring 9."]
+    assert concepts(go_decision=False) == ["Concept scoring 4."]
+    # Material filters are case-insensitive prefixes
+    assert concepts(material="pet") == ["Concept scoring 8."]
+    assert concepts(material="recycled") == ["Concept scoring 4."]
+    assert [record["mode"] for record in history.query(HistoryFilter(mode=REUSED))] == [REUSED]
+    record = history.query(HistoryFilter(mode=FULL))[0]
+    assert record["run_id"] == "run-1" and record["go_decision"] is True and record["materials"] == ["PET", "PP"]
+
+
+def test_summary_counts_each_material_once_per_evaluation(history):
+    history.add(evaluation(6, ["PET", "pet "]))
+    summary = history.summary()
+    assert summary["evaluations"] == 4
+    assert summary["mean_score"] == 6.75 and summary["go_rate"] == 0.5
+    assert summary["scores"] == {4: 1, 6: 1, 8: 1, 9: 1}
+    assert summary["materials"][0] == {"material": "pet", "evaluations": 2, "mean_score": 7.0}
+
+
+def test_export_streams_matching_evaluations_without_images(history):
+    lines = b"".join(history.export_jsonl(HistoryFilter(min_score=5), include_state=True)).splitlines()
+    records = [json.loads(line) for line in lines]
+    assert sorted(record["state"]["final_evaluation"]["feasibility_score"] for record in records) == [8, 9]
+    assert all("concept_images" not in record["state"] for record in records)
+    stored = history.get(records[0]["id"])
+    assert stored.concept_images == [] and stored.final_evaluation is not None
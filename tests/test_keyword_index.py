@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+from benchmarks.fakes import LocalSupabase
+from src.packaging_evaluation.vector_store.client import reciprocal_rank_fusion
+from src.packaging_evaluation.vector_store.keyword_index import KeywordIndex, match_query
+from src.packaging_evaluation.vector_store.models import KnowledgeEntry
+
+IDS = {
+    "pp": "4f0b9a52-2b8e-4c3e-9a51-6a5f0d6e1c01",
+    "pet": "4f0b9a52-2b8e-4c3e-9a51-6a5f0d6e1c02",
+    "iso": "4f0b9a52-2b8e-4c3e-9a51-6a5f0d6e1c03",
+}
+
+
+def entry(name: str, content: str, **metadata) -> KnowledgeEntry:
+    return KnowledgeEntry(id=IDS[name], type="material", content=content, metadata={"name": name, **metadata})
+
+
+def test_match_query_quotes_each_term_as_a_phrase():
+    assert match_query('ISO 11607-1 "sterile"') == '"ISO" OR "11607-1" OR """sterile"""'
+    assert match_query(" - / ") == ""
+
+
+def test_reciprocal_rank_fusion_rewards_entries_in_both_rankings():
+    pp, pet, iso = (entry(name, name) for name in ("pp", "pet", "iso"))
+    vector = [pp.model_copy(update={"metadata": {"similarity": 0.9}}), pet]
+    keyword = [iso, pet.model_copy(update={"metadata": {"bm25": 3.0}})]
+
+    fused = reciprocal_rank_fusion([vector, keyword], k=60)
+    assert [result.id for result in fused] == [IDS["pet"], IDS["pp"], IDS["iso"]]
+    assert fused[0].metadata["rrf_score"] == 2 / 62
+    # Each retriever's score is kept
+    assert fused[0].metadata["bm25"] == 3.0
+    assert fused[1].metadata == {"similarity": 0.9, "rrf_score": 1 / 61}
+
+
+def test_exact_identifiers_rank_first():
+    index = KeywordIndex()
+    index.add([
+        entry("pp", "Polypropylene copolymer for thin-wall trays.", tags=["HP-525"]),
+        entry("iso", "Sterile barrier systems are validated to ISO 11607-1."),
+        entry("pet", "PET bottle resin; ISO 9001 certified supplier."),
+    ])
+    assert [result.id for result in index.search("ISO 11607-1")][:2] == [IDS["iso"], IDS["pet"]]
+    # Metadata values are indexed, scores are reported as positive bm25
+    results = index.search("HP-525")
+    assert [result.id for result in results] == [IDS["pp"]] and results[0].metadata["bm25"] > 0
+
+    index.add([entry("pp", "Polypropylene homopolymer.")])
+    index.remove([IDS["iso"]])
+    assert index.search("HP-525") == []
+    assert [result.id for result in index.search("ISO 11607-1")] == [IDS["pet"]]
+    assert index.count() == 2
+
+
+def test_rebuild_indexes_the_whole_knowledge_base():
+    supabase = LocalSupabase()
+    supabase.table("knowledge_base").insert([
+        entry(name, f"{name} specification").model_dump(mode="json", exclude={"embedding"}) for name in IDS
+    ]).execute()
+    index = KeywordIndex()
+    index.add([entry("pp", "Only written through this client.")])
+    assert not index.built
+
+    assert index.rebuild(SimpleNamespace(supabase=supabase), batch_size=2) == 3
+    assert index.built and index.count() == 3
+    assert [result.id for result in index.search("pet specification", limit=1)] == [IDS["pet"]]
+    index.clear()
+    assert not index.built
+
+
+def test_workers_sharing_a_file_build_it_once(tmp_path):
+    supabase = LocalSupabase()
+    supabase.table("knowledge_base").insert([
+        entry(name, f"{name} specification").model_dump(mode="json", exclude={"embedding"}) for name in IDS
+    ]).execute()
+    path = str(tmp_path / "keyword_index.db")
+    first, second = KeywordIndex(path), KeywordIndex(path)
+
+    class Racing:
+        """Lets the second worker finish its build while the first is still reading."""
+        @property
+        def supabase(self):
+            if not second.built:
+                assert second.rebuild(SimpleNamespace(supabase=supabase), unless_built=True) == 3
+            return supabase
+
+    assert first.rebuild(Racing(), batch_size=2, unless_built=True) is None
+    assert first.built and first.count() == 3
+    assert first.rebuild(SimpleNamespace(supabase=supabase), unless_built=True) is None
+    # A forced rebuild replaces the index in place
+    assert first.rebuild(SimpleNamespace(supabase=supabase)) == 3
+    assert second.count() == 3 and [result.id for result in second.search("pp")] == [IDS["pp"]]
+
+
+def test_index_directory_is_created(tmp_path):
+    index = KeywordIndex(str(tmp_path / "data" / "keyword_index.db"))
+    index.add([entry("pp", "Polypropylene.")])
+    assert index.count() == 1 and (tmp_path / "data" / "keyword_index.db").exists()
+    index.close()
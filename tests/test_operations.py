@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeChatModel
+from src.packaging_evaluation import tools
+from src.packaging_evaluation.state import (
+    Component,
+    ComponentAssessment,
+    CostAnalysis,
+    OperationalAnalyses,
+    PackagingEvaluationState,
+    ProductionAnalysis,
+    SupplyChainAnalysis,
+    TechnicalAssessment,
+)
+
+COMPONENTS = [Component(name="Bottle", material="PET", function="Holds the liquid", requirements=[])]
+
+ANALYSES = OperationalAnalyses(
+    supply_chain=SupplyChainAnalysis(supply_chain_impact="Low", feasible=True, notes="PET is widely available."),
+    production=ProductionAnalysis(production_changes_needed=["New blow mould"], feasible=True, notes="Existing line."),
+    cost=CostAnalysis(cost_impact="+2%", feasible=True, notes="Mould amortized over a year.")
+)
+
+
+def technical(feasible: bool) -> TechnicalAssessment:
+    return TechnicalAssessment(
+        overall_feasible=feasible,
+        component_assessments=[ComponentAssessment(
+            component_name="Bottle", feasible=feasible, notes="", challenges=["Hot fill"], technical_score=0.5
+        )],
+        technical_summary=""
+    )
+
+
+@pytest.fixture
+def models(monkeypatch):
+    large, small = FakeChatModel(), FakeChatModel()
+    monkeypatch.setattr(tools, "llm", large)
+    monkeypatch.setattr(tools, "small_llm", small)
+    monkeypatch.setattr(tools, "component_store", None)
+    return large, small
+
+
+def test_merge_adds_blocking_technical_challenges():
+    merged = tools.merge_operational_analyses(ANALYSES, technical(feasible=False))
+    assert merged.production_changes_needed == ["New blow mould", "Bottle: Hot fill"]
+    assert not merged.overall_feasible
+    assert merged.operational_summary.endswith("assumes the open technical challenges are resolved.")
+
+    merged = tools.merge_operational_analyses(ANALYSES, technical(feasible=True))
+    assert merged.production_changes_needed == ["New blow mould"] and merged.overall_feasible
+    assert (merged.supply_chain_impact, merged.cost_impact) == ("Low", "+2%")
+
+
+def test_pipelined_analyses_are_reused_on_reflection_reruns(models, monkeypatch):
+    monkeypatch.setitem(tools.AGENT_CONFIG["operations"], "pipelined", True)
+    large, small = models
+    state = PackagingEvaluationState(packaging_concept="A PET bottle.", components=COMPONENTS)
+
+    update = asyncio.run(tools.technical_feasibility(state))
+    # One technical assessment and three sub-analyses, concurrently
+    assert update["operational_analyses"] is not None
+    assert large.calls + small.calls == 4
+    state = state.apply(update)
+
+    # Operations merges them without a model call
+    state = state.apply(asyncio.run(tools.operations(state)))
+    assert large.calls + small.calls == 4 and state.current_node == "reflection"
+
+    # Reflection asked for another technical assessment of the same components
+    state = state.model_copy(update={"reflection_counter": 1})
+    update = asyncio.run(tools.technical_feasibility(state))
+    assert "operational_analyses" not in update
+    assert large.calls + small.calls == 5
+
+
+def test_new_components_drop_the_analyses(models):
+    state = PackagingEvaluationState(packaging_concept="A PET bottle.", components=COMPONENTS, operational_analyses=ANALYSES)
+    assert asyncio.run(tools.concept_breaker(state))["operational_analyses"] is None
+
+
+def test_failed_call_cancels_the_concurrent_ones():
+    started = []
+
+    async def slow():
+        started.append(True)
+        await asyncio.sleep(10)
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise RuntimeError("model unavailable")
+
+    async def scenario():
+        tasks_before = asyncio.all_tasks()
+        with pytest.raises(RuntimeError):
+            await tools.gather_or_cancel(slow(), fail(), slow())
+        await asyncio.sleep(0)
+        assert len(started) == 2
+        assert asyncio.all_tasks() == tasks_before
+
+    asyncio.run(scenario())
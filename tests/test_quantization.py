@@ -0,0 +1,32 @@
+import asyncio
+
+from benchmarks.fakes import LocalSupabase
+from src.packaging_evaluation.vector_store.client import VectorStoreClient
+from src.packaging_evaluation.vector_store.quantization import BINARY, recall_at_k
+
+
+class RecordingSupabase(LocalSupabase):
+    def __init__(self):
+        super().__init__()
+        self.functions = []
+
+    def rpc(self, name, params):
+        self.functions.append(name)
+        return super().rpc(name, params)
+
+
+def test_recall_reference_bypasses_the_index():
+    supabase = RecordingSupabase()
+    client = VectorStoreClient(supabase=supabase, storage=BINARY, rescore=True)
+
+    async def scenario():
+        await client.search_by_embedding([0.1] * 8, 10, match_threshold=-1.0, exact=True)
+        await client.search_by_embedding([0.1] * 8, 10, match_threshold=-1.0, storage="float32")
+
+    asyncio.run(scenario())
+    # float32 search goes through the HNSW index once migration 003 is applied
+    assert supabase.functions == ["match_knowledge_exact", "match_knowledge"]
+
+
+def test_recall_at_k_skips_queries_without_exact_results():
+    assert recall_at_k([["a", "b"], [], ["c"]], [["b", "x"], ["y"], ["c"]], k=2) == 0.75
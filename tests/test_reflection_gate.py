@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeChatModel
+from src.packaging_evaluation import tools
+from src.packaging_evaluation.state import (
+    Component,
+    ComponentAssessment,
+    OperationalAssessment,
+    PackagingEvaluationState,
+    TechnicalAssessment,
+)
+
+COMPONENTS = [
+    Component(name="Bottle", material="PET", function="Holds the liquid", requirements=[]),
+    Component(name="Cap", material="PP", function="Closes the bottle", requirements=[]),
+]
+
+
+def consistent_state(**update) -> PackagingEvaluationState:
+    state = PackagingEvaluationState(
+        packaging_concept="A PET bottle with a PP cap.",
+        components=COMPONENTS,
+        technical_assessment=TechnicalAssessment(
+            overall_feasible=True,
+            component_assessments=[
+                ComponentAssessment(component_name=c.name, feasible=True, notes="", challenges=[], technical_score=0.9)
+                for c in COMPONENTS
+            ],
+            technical_summary="Standard materials."
+        ),
+        operational_assessment=OperationalAssessment(
+            supply_chain_impact="Low",
+            production_changes_needed=["New cap liner"],
+            cost_impact="None",
+            overall_feasible=True,
+            operational_summary="Runs on existing lines."
+        ),
+        current_node="reflection"
+    )
+    return state.model_copy(update=update)
+
+
+@pytest.fixture(autouse=True)
+def gate(monkeypatch):
+    monkeypatch.setitem(tools.REFLECTION_GATE_CONFIG, "enabled", True)
+    monkeypatch.setitem(tools.REFLECTION_GATE_CONFIG, "require_agreement", True)
+    monkeypatch.setitem(tools.REFLECTION_GATE_CONFIG, "min_technical_score", 0.8)
+    monkeypatch.setitem(tools.REFLECTION_GATE_CONFIG, "max_challenges", 0)
+    monkeypatch.setitem(tools.REFLECTION_GATE_CONFIG, "max_production_changes", 2)
+    monkeypatch.setattr(tools, "reflection_gate_stats", tools.Counter())
+    model = FakeChatModel(overrides={"ReflectionNotes": {"requires_iteration": False, "iteration_count": 1}})
+    monkeypatch.setattr(tools, "llm", model)
+    monkeypatch.setattr(tools, "small_llm", model)
+    return model
+
+
+def with_assessments(state: PackagingEvaluationState, **changes) -> PackagingEvaluationState:
+    technical = state.technical_assessment
+    assessments = [a.model_copy(update=changes) for a in technical.component_assessments]
+    return state.model_copy(update={"technical_assessment": technical.model_copy(update={"component_assessments": assessments})})
+
+
+def test_consistent_assessments_skip_the_model_call(gate):
+    update = asyncio.run(tools.reflection(consistent_state()))
+    assert gate.calls == 0
+    assert update["current_node"] == "final_score" and update["reflection_counter"] == 1
+    assert update["reflection_notes"].assessment_approved and not update["reflection_notes"].requires_iteration
+    assert tools.reflection_gate_stats == {"skipped": 1}
+
+
+@pytest.mark.parametrize("state, rule", [
+    (consistent_state(operational_assessment=None), "missing_assessment"),
+    (consistent_state(operational_assessment=consistent_state().operational_assessment.model_copy(
+        update={"overall_feasible": False})), "feasibility_disagreement"),
+    (consistent_state(components=COMPONENTS + [COMPONENTS[0].model_copy(update={"name": "Label"})]), "unassessed_components"),
+    (with_assessments(consistent_state(), technical_score=0.5), "low_technical_score"),
+    (with_assessments(consistent_state(), challenges=["Hot fill"]), "challenges"),
+    (consistent_state(operational_assessment=consistent_state().operational_assessment.model_copy(
+        update={"production_changes_needed": ["Liner", "Mould", "Labeller"]})), "production_changes"),
+])
+def test_each_rule_sends_the_assessments_to_the_model(gate, state, rule):
+    assert tools.reflection_gate(state) == rule
+    update = asyncio.run(tools.reflection(state))
+    assert gate.calls > 0
+    assert tools.reflection_gate_stats == {rule: 1}
+    assert update["reflection_counter"] == 1
+
+
+def test_disabled_gate_always_calls_the_model(gate, monkeypatch):
+    monkeypatch.setitem(tools.REFLECTION_GATE_CONFIG, "enabled", False)
+    asyncio.run(tools.reflection(consistent_state()))
+    assert gate.calls > 0 and not tools.reflection_gate_stats
+
+
+def test_iteration_limit_moves_to_the_final_score(gate):
+    update = asyncio.run(tools.reflection(with_assessments(consistent_state(reflection_counter=2), technical_score=0.1)))
+    assert update["reflection_counter"] == 3 and update["current_node"] == "final_score"
+    assert "Maximum number of reflections" in update["messages"][0]["content"]
+    assert gate.calls == 0 and not tools.reflection_gate_stats
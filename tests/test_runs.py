@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+from src.packaging_evaluation.state import PackagingEvaluationState, message_from
+from src.web.runs import AWAITING_INPUT, CANCELLED, COMPLETED, FAILED, RUNNING, EvaluationRun, RunRegistry
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def new_run(run_id: str = "run") -> EvaluationRun:
+    return EvaluationRun(run_id, PackagingEvaluationState(packaging_concept="A PET bottle."))
+
+
+async def forever():
+    await asyncio.Event().wait()
+
+
+async def finish(evaluation: EvaluationRun, complete: bool = True):
+    """Run a task that checkpoints a final state, and wait for it."""
+    async def evaluate():
+        evaluation.checkpoint(evaluation.state.model_copy(update={"process_complete": complete}))
+
+    await evaluation.start(evaluate())
+
+
+def test_abandoned_run_is_cancelled_after_the_grace_period():
+    async def scenario():
+        evaluation = new_run()
+        evaluation.start(forever())
+        evaluation.attach()
+        evaluation.detach(0.01)
+        await asyncio.sleep(0.05)
+        assert evaluation.status == CANCELLED
+
+    run(scenario())
+
+
+def test_client_reattaching_within_the_grace_period_keeps_the_run():
+    async def scenario():
+        evaluation = new_run()
+        evaluation.start(forever())
+        evaluation.attach()
+        evaluation.detach(0.01)
+        evaluation.attach()
+        await asyncio.sleep(0.05)
+        assert evaluation.status == RUNNING
+        evaluation.cancel()
+
+    run(scenario())
+
+
+def test_delta_returns_only_changes_after_a_version():
+    evaluation = new_run()
+    state = evaluation.state.model_copy(update={"current_node": "identify_components"})
+    evaluation.checkpoint(state)
+    state = state.model_copy(update={
+        "final_recommendation": "Use recycled PET.",
+        "messages": [message_from("Technical", "Looks feasible.")]
+    })
+    evaluation.checkpoint(state, changed=["final_recommendation", "messages"])
+
+    assert evaluation.version == 2
+    fields, messages = evaluation.delta(1)
+    assert fields == {"final_recommendation": "Use recycled PET."}
+    assert messages == [message_from("Technical", "Looks feasible.")]
+    fields, messages = evaluation.delta(0)
+    assert set(fields) == {"current_node", "final_recommendation"}
+    assert evaluation.delta(2) == ({}, [])
+    # Without a version, the whole state
+    assert set(evaluation.delta()[0]) == set(state.model_dump(exclude={"messages"}))
+
+
+def test_status_follows_the_task_outcome():
+    async def fail():
+        raise RuntimeError("model unavailable")
+
+    async def scenario():
+        completed, awaiting, failed = new_run("a"), new_run("b"), new_run("c")
+        await finish(completed)
+        await finish(awaiting, complete=False)
+        failed.start(fail())
+        await asyncio.wait([failed.task])
+        assert (completed.status, awaiting.status, failed.status) == (COMPLETED, AWAITING_INPUT, FAILED)
+        assert failed.error == "model unavailable"
+
+    run(scenario())
+
+
+def test_running_request_key_is_coalesced():
+    async def scenario():
+        registry = RunRegistry()
+        evaluation = registry.create(new_run().state, key="digest")
+        evaluation.start(forever())
+        assert registry.find("digest") is evaluation
+        assert registry.active() == 1
+        with pytest.raises(ValueError):
+            registry.create(new_run().state, run_id=evaluation.run_id)
+        evaluation.cancel()
+        await asyncio.sleep(0)
+        # A cancelled run does not serve new requests
+        assert registry.find("digest", include_finished=True) is None
+
+    run(scenario())
+
+
+def test_finished_runs_are_only_found_for_idempotency_keys():
+    async def scenario():
+        registry = RunRegistry()
+        evaluation = registry.create(new_run().state, key="request-1")
+        await finish(evaluation)
+        assert registry.find("request-1") is None
+        assert registry.find("request-1", include_finished=True) is evaluation
+        assert registry.find("unknown", include_finished=True) is None
+
+    run(scenario())
+
+
+def test_oldest_finished_runs_and_their_keys_are_evicted():
+    async def scenario():
+        registry = RunRegistry(max_finished=1)
+        running = registry.create(new_run().state, key="running")
+        running.start(forever())
+        first = registry.create(new_run().state, key="first")
+        await finish(first)
+        second = registry.create(new_run().state, key="second")
+        await finish(second)
+        registry.create(new_run().state)
+
+        assert registry.get(first.run_id) is None and "first" not in registry.keys
+        assert registry.get(second.run_id) is second
+        assert registry.find("running") is running
+        running.cancel()
+
+    run(scenario())
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from src.web.scheduler import BATCH, INTERACTIVE, EvaluationScheduler, QueueFull
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_admits_up_to_the_concurrency_limit():
+    async def scenario():
+        scheduler = EvaluationScheduler(max_concurrent=2, reserved_interactive=0, per_client_limit=2)
+        first = scheduler.submit("a", INTERACTIVE)
+        second = scheduler.submit("a", INTERACTIVE)
+        third = scheduler.submit("a", INTERACTIVE)
+        assert first.future.done() and second.future.done()
+        assert not third.future.done()
+
+        scheduler.release(first)
+        assert third.future.done()
+        assert scheduler.stats()[INTERACTIVE]["running"] == 2
+
+    run(scenario())
+
+
+def test_interactive_requests_are_admitted_before_batch_requests():
+    async def scenario():
+        scheduler = EvaluationScheduler(max_concurrent=2, reserved_interactive=1, per_client_limit=4)
+        running = scheduler.submit("b", BATCH)
+        queued_batch = scheduler.submit("b", BATCH)
+        # The reserved slot is not given to batch work
+        assert running.future.done() and not queued_batch.future.done()
+        reserved = scheduler.submit("c", INTERACTIVE)
+        interactive = scheduler.submit("c", INTERACTIVE)
+        assert reserved.future.done() and not interactive.future.done()
+
+        scheduler.release(running)
+        assert interactive.future.done()
+        assert not queued_batch.future.done()
+
+    run(scenario())
+
+
+def test_per_client_limit():
+    async def scenario():
+        scheduler = EvaluationScheduler(max_concurrent=4, reserved_interactive=0, per_client_limit=1)
+        scheduler.submit("a", INTERACTIVE)
+        second = scheduler.submit("a", INTERACTIVE)
+        other = scheduler.submit("b", INTERACTIVE)
+        assert not second.future.done()
+        assert other.future.done()
+
+    run(scenario())
+
+
+def test_full_queue_rejects_or_sheds():
+    async def scenario():
+        scheduler = EvaluationScheduler(max_concurrent=1, reserved_interactive=0, per_client_limit=4, max_queue=1)
+        scheduler.submit("a", INTERACTIVE)
+        batch = scheduler.submit("b", BATCH)
+        with pytest.raises(QueueFull):
+            scheduler.submit("c", BATCH)
+
+        # An interactive request takes the place of the queued batch request
+        interactive = scheduler.submit("c", INTERACTIVE)
+        with pytest.raises(QueueFull):
+            await batch
+        assert interactive in scheduler.queue
+        stats = scheduler.stats()
+        assert stats[BATCH]["rejected"] == 1 and stats[BATCH]["shed"] == 1
+
+    run(scenario())
+
+
+def test_cancelled_waiter_does_not_break_release():
+    async def scenario():
+        scheduler = EvaluationScheduler(max_concurrent=1, reserved_interactive=0, per_client_limit=1)
+        running = scheduler.submit("a", INTERACTIVE)
+        queued = scheduler.submit("a", INTERACTIVE)
+
+        async def wait():
+            await queued
+
+        # A client disconnecting cancels its waiter; the release runs in a done callback
+        waiter = asyncio.create_task(wait())
+        waiter.add_done_callback(lambda _: scheduler.release(queued))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        assert queued.future.cancelled()
+
+        scheduler.release(running)
+        await asyncio.sleep(0)
+        assert scheduler.queue == []
+        assert scheduler.stats()[INTERACTIVE]["running"] == 0
+
+        # The abandoned request holds neither a queue place nor the client's slot
+        following = scheduler.submit("a", INTERACTIVE)
+        assert following.future.done()
+
+    run(scenario())
+
+
+def test_cancelled_waiter_is_dropped_on_submit():
+    async def scenario():
+        scheduler = EvaluationScheduler(max_concurrent=1, reserved_interactive=0, per_client_limit=4, max_queue=1)
+        running = scheduler.submit("a", INTERACTIVE)
+        queued = scheduler.submit("a", INTERACTIVE)
+        queued.future.cancel()
+
+        # The cancelled request neither fills the queue nor gets admitted
+        following = scheduler.submit("b", INTERACTIVE)
+        assert scheduler.queue == [following]
+        scheduler.release(queued)
+        scheduler.release(running)
+        assert following.future.done()
+
+    run(scenario())
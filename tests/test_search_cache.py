@@ -0,0 +1,41 @@
+from src.packaging_evaluation.vector_store.search_cache import SearchCache, cache_key
+
+
+def test_key_ignores_case_whitespace_and_tag_order():
+    assert cache_key("  PET   Bottle ", mode="hybrid", tags=["a", "b"]) == cache_key("pet bottle", mode="hybrid", tags=["b", "a"])
+    assert cache_key("pet bottle", mode="hybrid") != cache_key("pet bottle", mode="vector")
+
+
+def test_results_are_invalidated_when_the_knowledge_base_changes():
+    cache = SearchCache()
+    version = cache.version()
+    cache.put("key", [{"id": "a"}], version)
+    assert cache.get("key") == [{"id": "a"}]
+
+    assert cache.bump() == version + 1
+    assert cache.get("key") is None
+    # A search started before the change must not cache its stale results
+    cache.put("key", [{"id": "stale"}], version)
+    assert cache.get("key") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_least_recently_used_results_are_evicted():
+    cache = SearchCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, key, 0)
+    cache.get("a")
+    cache.put("c", "c", 0)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("a", None, "c")
+
+
+def test_processes_sharing_a_file_share_results_and_invalidations(tmp_path):
+    path = str(tmp_path / "data" / "search-cache.db")
+    worker, importer = SearchCache(path=path), SearchCache(path=path)
+    worker.put("key", [{"id": "a"}], worker.version())
+    assert importer.get("key") == [{"id": "a"}]
+
+    importer.bump()
+    assert worker.get("key") is None
+    worker.close()
+    importer.close()
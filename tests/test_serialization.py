@@ -0,0 +1,40 @@
+import pytest
+
+from src.packaging_evaluation.serialization import (
+    SERIALIZERS,
+    Serializer,
+    dump_model,
+    load_model,
+    negotiate,
+)
+from src.packaging_evaluation.state import PackagingEvaluationState
+
+
+def test_incomplete_serializer_cannot_be_instantiated():
+    class EncodeOnly(Serializer):
+        name = "encode-only"
+
+        def encode(self, data):
+            return b""
+
+    with pytest.raises(TypeError):
+        EncodeOnly()
+
+
+@pytest.mark.parametrize("name", sorted(SERIALIZERS))
+def test_state_round_trip(name):
+    state = PackagingEvaluationState(packaging_concept="A PET bottle.", concept_images=["data:image/png;base64,AAAA"])
+    payload = dump_model(state, SERIALIZERS[name])
+    assert load_model(PackagingEvaluationState, payload, SERIALIZERS[name]) == state
+
+
+def test_negotiate_defaults_to_json():
+    assert negotiate(None).media_type == "application/json"
+    assert negotiate("text/html, */*;q=0.1").media_type == "application/json"
+    assert negotiate("application/json") is SERIALIZERS.get("orjson", SERIALIZERS["json"])
+
+
+def test_snapshot_can_exclude_fields():
+    state = PackagingEvaluationState(packaging_concept="A PET bottle.", concept_images=["data:image/png;base64,AAAA"])
+    restored = load_model(PackagingEvaluationState, dump_model(state, exclude={"concept_images"}))
+    assert restored == state.model_copy(update={"concept_images": []})
@@ -0,0 +1,13 @@
+from src.packaging_evaluation.state import ComponentAssessment, PackagingEvaluationState, latest
+
+
+def assessment(notes: str) -> ComponentAssessment:
+    return ComponentAssessment(component_name="Bottle", feasible=True, notes=notes, challenges=[], technical_score=0.9)
+
+
+def test_latest_reducer_never_replaces_a_value_with_none():
+    first = assessment("First pass.")
+    assert latest(first, None) is first
+    assert latest(None, first) is first
+    assert latest(first, assessment("Reflected.")).notes == "Reflected."
+    assert PackagingEvaluationState.reducers()["technical_assessment"] is latest
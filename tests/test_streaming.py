@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any, Dict, List
+
+from langchain_core.language_models import BaseChatModel
+
+from benchmarks.fakes import FakeChatModel, build_fake_instance
+from src.packaging_evaluation import tools
+from src.packaging_evaluation.state import FinalEvaluation
+
+LEAD_FIELDS = ("feasibility_score", "go_decision", "executive_summary")
+
+
+class StreamingChatModel(BaseChatModel):
+    """Chat model that streams a fake instance one field at a time, in the requested schema's order."""
+    schemas: List[Dict[str, Any]] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    def with_structured_output(self, schema, **kwargs):
+        self.schemas.append(schema)
+        return self
+
+    async def astream(self, messages, config=None, **kwargs):
+        values = build_fake_instance(FinalEvaluation, "stream", {"feasibility_score": 7}).model_dump()
+        fields = {}
+        for name in self.schemas[-1]["properties"]:
+            fields = {**fields, name: values[name]}
+            yield fields
+
+
+def run_final_score():
+    events = []
+
+    async def scenario():
+        tools.partial_output_sink.set(lambda node, fields: events.append((node, fields)))
+        return await tools.streamed_call("final_score", FinalEvaluation, ["Score it"], lead_fields=LEAD_FIELDS)
+
+    return asyncio.run(scenario()), events
+
+
+def test_lead_fields_are_streamed_first(monkeypatch):
+    model = StreamingChatModel(schemas=[])
+    monkeypatch.setattr(tools, "llm", model)
+    result, events = run_final_score()
+
+    properties = list(model.schemas[0]["properties"])
+    assert tuple(properties[:3]) == LEAD_FIELDS
+    assert sorted(properties) == sorted(FinalEvaluation.model_fields)
+
+    assert [node for node, _ in events] == ["final_score"] * len(properties)
+    assert [list(fields) for _, fields in events] == [properties[:i + 1] for i in range(len(properties))]
+    assert events[0][1] == {"feasibility_score": 7}
+    assert events[-1][1] == result.model_dump()
+    assert isinstance(result, FinalEvaluation)
+
+
+def test_models_that_cannot_stream_report_once(monkeypatch):
+    monkeypatch.setattr(tools, "llm", FakeChatModel())
+    result, events = run_final_score()
+    assert events == [("final_score", result.model_dump())]
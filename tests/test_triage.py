@@ -0,0 +1,36 @@
+import asyncio
+import io
+import json
+
+from benchmarks.fakes import FakeChatModel
+from src.packaging_evaluation import tools, triage
+from src.packaging_evaluation.state import PackagingEvaluationState
+
+
+def test_malformed_lines_are_recorded_without_stopping_the_batch(monkeypatch):
+    monkeypatch.setattr(tools, "llm", FakeChatModel())
+    concepts = io.StringIO(
+        json.dumps({"packaging_concept": "A PET bottle."}) + "\n"
+        + "{not json\n"
+        + "\n"
+        + json.dumps(["a list"]) + "\n"
+        + json.dumps({"id": "tray", "packaging_concept": "A PP tray."}) + "\n"
+    )
+    output = io.StringIO()
+
+    counts = asyncio.run(triage.triage_batch(triage.read_concepts(concepts), output, concurrency=2))
+
+    results = {result["id"]: result for result in map(json.loads, output.getvalue().splitlines())}
+    assert counts["processed"] == 4 and counts["errors"] == 2
+    assert "Invalid JSON on line 2" in results[2]["error"]
+    assert "expected a JSON object" in results[4]["error"]
+    assert "feasibility_score" in results[1] and "feasibility_score" in results["tray"]
+
+
+def test_triage_keeps_the_rationale_apart_from_the_escalation_reason(monkeypatch):
+    monkeypatch.setattr(tools, "llm", FakeChatModel(overrides={
+        "TriageEvaluation": {"rationale": "Standard materials.", "escalation_reason": "Novel closure."}
+    }))
+    state = PackagingEvaluationState(packaging_concept="A PET bottle.", current_node="triage")
+    update = asyncio.run(tools.triage(state))
+    assert update["final_evaluation"].expert_rationale == "Standard materials."